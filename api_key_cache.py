@@ -0,0 +1,120 @@
+import asyncio
+import hashlib
+import os
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+
+from models.db import SessionLocal, get_api_key_record
+from metrics import AUTH_LOOKUP_SECONDS, observe
+from tracing import current_span
+
+load_dotenv()
+
+# Seconds a valid key, and an unknown key, is trusted before the DB is asked again
+API_KEY_CACHE_TTL = float(os.getenv("API_KEY_CACHE_TTL", "300"))
+API_KEY_NEGATIVE_TTL = float(os.getenv("API_KEY_NEGATIVE_TTL", "30"))
+API_KEY_CACHE_MAX_ENTRIES = int(os.getenv("API_KEY_CACHE_MAX_ENTRIES", "10000"))
+
+API_KEY_INVALIDATION_CHANNEL = "tracker:api-keys:invalidate"
+
+
+class CachedAPIKey(NamedTuple):
+    id: int
+    user: str
+    permission: str
+    tier: str
+
+
+def hash_api_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+async def load_api_key(api_key: str) -> Optional[CachedAPIKey]:
+    async with SessionLocal() as db:
+        db_api_key = await get_api_key_record(db, api_key)
+    if db_api_key is None:
+        return None
+    return CachedAPIKey(
+        id=db_api_key.id,
+        user=db_api_key.user,
+        permission=db_api_key.permission,
+        tier=db_api_key.tier,
+    )
+
+
+class APIKeyCache:
+    """
+    In-process cache of API keys, indexed by their SHA-256 digest.
+
+    Valid keys are kept for API_KEY_CACHE_TTL and unknown keys for the shorter
+    API_KEY_NEGATIVE_TTL, so repeated bad keys don't reach the database
+    either. When a key is added or changed its digest is published on a Redis
+    channel and every worker drops its copy.
+    """
+
+    def __init__(self):
+        self.redis = None
+        self._entries: Dict[str, Tuple[Optional[CachedAPIKey], float]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, redis_client) -> None:
+        self.redis = redis_client
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.redis = None
+
+    async def get(self, api_key: str) -> Optional[CachedAPIKey]:
+        """Look up a key, or None if it isn't a valid API key."""
+        started = time.perf_counter()
+        digest = hash_api_key(api_key)
+        entry = self._entries.get(digest)
+        if entry is not None and entry[1] > time.monotonic():
+            current_span().set_attribute("api_key.source", "memory")
+            AUTH_LOOKUP_SECONDS.labels("memory").observe(time.perf_counter() - started)
+            return entry[0]
+
+        current_span().set_attribute("api_key.source", "database")
+        with observe(AUTH_LOOKUP_SECONDS, source="database"):
+            cached_key = await load_api_key(api_key)
+        ttl = API_KEY_CACHE_TTL if cached_key is not None else API_KEY_NEGATIVE_TTL
+        if len(self._entries) >= API_KEY_CACHE_MAX_ENTRIES:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[digest] = (cached_key, time.monotonic() + ttl)
+        return cached_key
+
+    async def invalidate(self, api_key: str) -> None:
+        """Drop a key from this worker's cache and tell the other workers."""
+        digest = hash_api_key(api_key)
+        self._entries.pop(digest, None)
+        if self.redis is None:
+            return
+        try:
+            await self.redis.publish(API_KEY_INVALIDATION_CHANNEL, digest)
+        except RedisError as e:
+            print(f"Could not publish API key invalidation: {e}")
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(API_KEY_INVALIDATION_CHANNEL)
+                    # Keys may have changed while we weren't subscribed
+                    self._entries.clear()
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._entries.pop(message["data"], None)
+            except RedisError as e:
+                print(f"API key invalidation listener failed: {e}")
+                await asyncio.sleep(1)
+
+
+api_key_cache = APIKeyCache()
@@ -0,0 +1,74 @@
+"""
+Compare two result files from the same suite and fail on regressions:
+
+    python -m benchmarks.compare results/main.json results/branch.json --threshold 10
+
+Exits with status 1 if any case got more than --threshold percent slower
+(p50 or p99), lost throughput, or allocates more at its peak.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+# Metric, and whether a higher value is better
+METRICS = (
+    ("ops_per_sec", True),
+    ("p50_ms", False),
+    ("p99_ms", False),
+    ("alloc_peak_bytes", False),
+)
+
+
+def load_results(path: Path) -> Dict[str, dict]:
+    report = json.loads(path.read_text())
+    return {result["name"]: result for result in report["results"]}
+
+
+def compare(
+    baseline: Dict[str, dict], candidate: Dict[str, dict], threshold: float
+) -> List[str]:
+    """A line for every metric that regressed by more than `threshold` percent."""
+    regressions = []
+    for name, before in baseline.items():
+        after = candidate.get(name)
+        if after is None:
+            continue
+        for metric, higher_is_better in METRICS:
+            old, new = before.get(metric), after.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            worse = -change if higher_is_better else change
+            status = "REGRESSED" if worse > threshold else "ok"
+            print(
+                f"{name:<28} {metric:<18} {old:>14,.2f} {new:>14,.2f} {change:>+8.1f}%  {status}"
+            )
+            if worse > threshold:
+                regressions.append(f"{name} {metric} {change:+.1f}%")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark runs.")
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument(
+        "--threshold", type=float, default=10.0, help="Allowed change in percent"
+    )
+    args = parser.parse_args()
+
+    regressions = compare(
+        load_results(args.baseline), load_results(args.candidate), args.threshold
+    )
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold}%:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import json
+import math
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+
+def load_fixture(name: str, directory: Path = FIXTURES_DIR) -> str:
+    return (Path(directory) / name).read_text()
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of unsorted values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+def latency_summary(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    """Throughput and latency percentiles, in operations/s and milliseconds."""
+    return {
+        "count": len(latencies),
+        "ops_per_sec": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+    }
+
+
+def measure(
+    fn: Callable[[], object], iterations: int, warmup: int = 5
+) -> Dict[str, float]:
+    """
+    Time `fn` over `iterations` calls, then run it as many times again under
+    tracemalloc for how much memory each call allocates at its peak.
+    Allocations are measured in a separate pass because tracing slows every
+    call down.
+    """
+    for _ in range(warmup):
+        fn()
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - call_started)
+    result = latency_summary(latencies, time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        peaks = []
+        for _ in range(iterations):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+    finally:
+        tracemalloc.stop()
+    result["alloc_peak_bytes"] = statistics.fmean(peaks) if peaks else 0.0
+    result["alloc_peak_bytes_max"] = max(peaks, default=0)
+    return result
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(
+    suite: str,
+    results: List[dict],
+    output: Optional[Path],
+    parameters: Optional[dict] = None,
+) -> dict:
+    """Print a summary table and write the results as JSON if asked to."""
+    report = {
+        "suite": suite,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "parameters": parameters or {},
+        "results": results,
+    }
+    print_table(results)
+    if output is not None:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+        print(f"Results written to {output}")
+    return report
+
+
+def print_table(results: List[dict]) -> None:
+    columns = ["ops_per_sec", "p50_ms", "p99_ms", "alloc_peak_bytes"]
+    width = max((len(result["name"]) for result in results), default=4)
+    print(f"{'name':<{width}}  " + "  ".join(f"{column:>20}" for column in columns))
+    for result in results:
+        cells = []
+        for column in columns:
+            value = result.get(column)
+            cells.append(f"{value:>20,.2f}" if value is not None else f"{'-':>20}")
+        print(f"{result['name']:<{width}}  " + "  ".join(cells))
@@ -0,0 +1,326 @@
+"""
+End-to-end load test of the stats endpoints against the local simulator:
+
+    python -m benchmarks.load --requests 2000 --concurrency 50 --output results/load.json
+
+By default the simulator is started in this process and the API is started
+with uvicorn, pointed at it. Redis and Postgres are still real, so REDIS_URL
+and DATABASE_URL must be set; a benchmark API key is added to the database.
+To test an API that's already running (and already pointed at a simulator,
+see `python -m simulator`), pass --api-url and --api-key instead.
+
+Lookups pick uniformly from --players distinct players, so a small pool
+measures the cache and a pool as large as --requests measures cold fetches.
+--scenario, the latencies and --set shape the simulator the same way as for
+`python -m simulator`; with none of them pages take 0.5s and Steam calls
+0.05s. What the simulator served is saved with the results.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import secrets
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import aiohttp
+
+from benchmarks.harness import FIXTURES_DIR, latency_summary, write_results
+from simulator.server import add_behaviour_arguments, simulator_url, start_simulator
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+ENDPOINTS = {
+    "valorant_profile": "/valorant/player/{username}",
+    "valorant_current": "/valorant/player/{username}/current",
+    "valorant_all": "/valorant/player/{username}/all",
+    "tft": "/tft/player/{username}",
+    "cs2": "/cs2/player/{steam_id}",
+}
+
+# Statuses that count as a successful lookup
+OK_STATUSES = (200, 304)
+
+Sample = Tuple[str, float, int, Optional[str]]
+
+
+def plan_requests(
+    endpoints: List[str], requests: int, players: int, seed: int
+) -> List[Tuple[str, str]]:
+    """(endpoint, path) for every request, endpoints in turn, random players."""
+    rng = random.Random(seed)
+    plan = []
+    for i in range(requests):
+        endpoint = endpoints[i % len(endpoints)]
+        player = rng.randrange(players)
+        path = ENDPOINTS[endpoint].format(
+            username=quote(f"Bench{player}#0001"),
+            steam_id=str(76561197960287930 + player),
+        )
+        plan.append((endpoint, path))
+    return plan
+
+
+async def run_load(
+    api_url: str,
+    api_key: str,
+    plan: List[Tuple[str, str]],
+    concurrency: int,
+) -> Tuple[List[Sample], float]:
+    """Send the planned requests from `concurrency` workers in a closed loop."""
+    samples: List[Sample] = []
+    pending = iter(plan)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=120)
+
+    async with aiohttp.ClientSession(
+        api_url, connector=connector, timeout=timeout, headers={"X-API-Key": api_key}
+    ) as session:
+
+        async def worker() -> None:
+            for endpoint, path in pending:
+                started = time.perf_counter()
+                try:
+                    async with session.get(path) as response:
+                        await response.read()
+                        status = response.status
+                        cache_status = response.headers.get("X-Cache")
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    status, cache_status = 0, None
+                samples.append(
+                    (endpoint, time.perf_counter() - started, status, cache_status)
+                )
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return samples, elapsed
+
+
+def summarize(samples: List[Sample], elapsed: float) -> List[dict]:
+    by_endpoint: Dict[str, List[Sample]] = defaultdict(list)
+    for sample in samples:
+        by_endpoint[sample[0]].append(sample)
+    by_endpoint["all"] = samples
+
+    results = []
+    for name, endpoint_samples in by_endpoint.items():
+        statuses = Counter(str(status) for _, _, status, _ in endpoint_samples)
+        results.append(
+            {
+                "name": name,
+                **latency_summary(
+                    [latency for _, latency, _, _ in endpoint_samples], elapsed
+                ),
+                "errors": sum(
+                    1
+                    for _, _, status, _ in endpoint_samples
+                    if status not in OK_STATUSES
+                ),
+                "statuses": dict(statuses),
+                "cache": dict(
+                    Counter(cache for _, _, _, cache in endpoint_samples if cache)
+                ),
+            }
+        )
+    return results
+
+
+async def create_api_key() -> str:
+    """Add an unlimited API key for the benchmark to DATABASE_URL's database."""
+    from models.db import SessionLocal, add_api_key, close_db, create_db
+
+    api_key = secrets.token_urlsafe(24)
+    await create_db()
+    async with SessionLocal() as db:
+        await add_api_key(
+            db, api_key, user="benchmark", permission="normal", tier="admin"
+        )
+    await close_db()
+    return api_key
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_api(upstream_url: str, port: int, workers: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "FLARESOLVERR_URLS": f"{upstream_url}/v1",
+        "STEAM_API_URL": upstream_url,
+        "STEAM_API_KEY": os.getenv("STEAM_API_KEY") or "simulator",
+        # The simulator hands out no clearance cookies to fetch with
+        "FLARESOLVERR_DIRECT_FETCH": "false",
+    }
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        cwd=REPO_ROOT,
+        env=env,
+    )
+
+
+async def wait_until_ready(api_url: str, process: subprocess.Popen) -> dict:
+    async with aiohttp.ClientSession() as session:
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError("The API exited during startup.")
+            try:
+                async with session.get(f"{api_url}/status") as response:
+                    if response.status == 200:
+                        return await response.json()
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError("The API didn't start within 60 seconds.")
+
+
+async def get_json(url: str) -> Optional[dict]:
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url) as response:
+                return await response.json()
+    except aiohttp.ClientError:
+        return None
+
+
+def peak_rss_kb(pid: int) -> Optional[int]:
+    """Peak resident memory of a process and its children, from /proc."""
+    pids = [pid]
+    try:
+        children = Path(f"/proc/{pid}/task/{pid}/children").read_text().split()
+        pids += [int(child) for child in children]
+        total = 0
+        for process_id in pids:
+            for line in Path(f"/proc/{process_id}/status").read_text().splitlines():
+                if line.startswith("VmHWM:"):
+                    total += int(line.split()[1])
+        return total
+    except (OSError, ValueError):
+        return None
+
+
+async def benchmark(args: argparse.Namespace) -> None:
+    endpoints = args.endpoints.split(",")
+    unknown = [endpoint for endpoint in endpoints if endpoint not in ENDPOINTS]
+    if unknown:
+        sys.exit(f"Unknown endpoints: {', '.join(unknown)}")
+    plan = plan_requests(endpoints, args.requests, args.players, args.seed or 0)
+
+    page_latency, steam_latency = args.page_latency, args.steam_latency
+    if args.scenario is None and not args.overrides:
+        page_latency = page_latency or "0.5"
+        steam_latency = steam_latency or "0.05"
+
+    simulator = process = None
+    api_url, api_key, upstream_url = args.api_url, args.api_key, args.simulator_url
+    try:
+        if api_url is None:
+            try:
+                simulator = await start_simulator(
+                    fixtures_dir=args.fixtures,
+                    page_latency=page_latency,
+                    steam_latency=steam_latency,
+                    scenario=args.scenario,
+                    overrides=args.overrides,
+                    seed=args.seed,
+                )
+            except ValueError as e:
+                sys.exit(str(e))
+            upstream_url = simulator_url(simulator)
+            api_key = api_key or await create_api_key()
+            port = free_port()
+            api_url = f"http://127.0.0.1:{port}"
+            process = spawn_api(upstream_url, port, args.workers)
+            await wait_until_ready(api_url, process)
+
+        samples, elapsed = await run_load(api_url, api_key, plan, args.concurrency)
+        results = summarize(samples, elapsed)
+        status = await get_json(f"{api_url}/status")
+        upstream_stats = None
+        if upstream_url is not None:
+            upstream_stats = await get_json(f"{upstream_url}/simulator/stats")
+        for result in results:
+            if result["name"] == "all":
+                if process is not None:
+                    result["server_peak_rss_kb"] = peak_rss_kb(process.pid)
+                if status is not None:
+                    result["event_loop_lag_peak_ms"] = status.get(
+                        "event_loop_lag_peak_ms"
+                    )
+                if upstream_stats is not None:
+                    result["simulator"] = upstream_stats
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        if simulator is not None:
+            await simulator.cleanup()
+
+    write_results(
+        "load",
+        results,
+        args.output,
+        {
+            "endpoints": endpoints,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "players": args.players,
+            "workers": args.workers,
+            "scenario": args.scenario,
+            "page_latency": page_latency,
+            "steam_latency": steam_latency,
+            "overrides": args.overrides,
+            "seed": args.seed,
+        },
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Load test the API end to end against the simulator."
+    )
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--players", type=int, default=50)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--fixtures", type=Path, default=FIXTURES_DIR)
+    add_behaviour_arguments(parser)
+    parser.add_argument("--api-url", help="Test this running API instead")
+    parser.add_argument(
+        "--simulator-url", help="The simulator that API uses, for its stats"
+    )
+    parser.add_argument("--api-key", default=os.getenv("BENCHMARK_API_KEY"))
+    parser.add_argument("--output", type=Path, help="Write results as JSON here")
+    args = parser.parse_args()
+    if args.api_url is not None and not args.api_key:
+        parser.error("--api-url needs --api-key")
+    asyncio.run(benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
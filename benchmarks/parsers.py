@@ -0,0 +1,117 @@
+"""
+Micro-benchmarks for the scrapers' CPU-bound steps, run against the fixture
+corpus with no network:
+
+    python -m benchmarks.parsers --iterations 200 --output results/parsers.json
+
+Before timing anything, the BeautifulSoup and lxml backends are checked to
+parse every fixture identically; a mismatch exits with status 1.
+"""
+
+import argparse
+import json
+import sys
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.harness import FIXTURES_DIR, load_fixture, measure, write_results
+from scrapers.cs2_scraper import build_cs2_player_stats
+from scrapers.parsers import get_parser_backend
+from scrapers.parsers.valorant_state import (
+    parse_valorant_state,
+    parse_valorant_state_seasons,
+)
+
+USERNAME = "Benchmark#0001"
+STEAM_ID = "76561197960287930"
+
+VALORANT_PAGES = ("valorant_current.html", "valorant_all.html", "valorant_dom.html")
+TFT_PAGES = ("tft.html",)
+
+
+def check_backend_parity(fixtures_dir: Path) -> List[str]:
+    """Fixtures the two HTML backends disagree on, with the differing fields."""
+    bs4_backend = get_parser_backend("bs4")
+    lxml_backend = get_parser_backend("lxml")
+    pages = [(name, "parse_valorant") for name in VALORANT_PAGES]
+    pages += [(name, "parse_tft") for name in TFT_PAGES]
+
+    mismatches = []
+    for name, parse in pages:
+        html = load_fixture(name, fixtures_dir)
+        expected = getattr(bs4_backend, parse)(html, USERNAME).model_dump()
+        actual = getattr(lxml_backend, parse)(html, USERNAME).model_dump()
+        fields = [field for field in expected if expected[field] != actual[field]]
+        if fields:
+            mismatches.append(f"{name}: {', '.join(fields)}")
+    return mismatches
+
+
+def benchmark_cases(fixtures_dir: Path) -> List[Tuple[str, Callable[[], object]]]:
+    current = load_fixture("valorant_current.html", fixtures_dir)
+    dom_only = load_fixture("valorant_dom.html", fixtures_dir)
+    tft = load_fixture("tft.html", fixtures_dir)
+    summary = json.loads(load_fixture("steam_player_summaries.json", fixtures_dir))
+    user_stats = json.loads(load_fixture("steam_user_stats.json", fixtures_dir))
+
+    cases = []
+    for backend_name in ("lxml", "bs4"):
+        backend = get_parser_backend(backend_name)
+        cases += [
+            (
+                f"valorant_dom_{backend_name}",
+                partial(backend.parse_valorant, dom_only, USERNAME),
+            ),
+            (f"tft_{backend_name}", partial(backend.parse_tft, tft, USERNAME)),
+        ]
+    cases += [
+        ("valorant_state", partial(parse_valorant_state, current, USERNAME)),
+        (
+            "valorant_state_seasons",
+            partial(parse_valorant_state_seasons, current, USERNAME),
+        ),
+        (
+            "cs2_build_player_stats",
+            partial(
+                build_cs2_player_stats,
+                STEAM_ID,
+                summary["response"]["players"][0],
+                user_stats["playerstats"]["stats"],
+            ),
+        ),
+    ]
+    return cases
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the scrapers' parse steps.")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--fixtures", type=Path, default=FIXTURES_DIR)
+    parser.add_argument("--only", help="Run only cases whose name contains this")
+    parser.add_argument("--output", type=Path, help="Write results as JSON here")
+    args = parser.parse_args()
+
+    mismatches = check_backend_parity(args.fixtures)
+    if mismatches:
+        print("The bs4 and lxml backends disagree on:")
+        for mismatch in mismatches:
+            print(f"  {mismatch}")
+        sys.exit(1)
+
+    results: List[Dict] = []
+    for name, case in benchmark_cases(args.fixtures):
+        if args.only and args.only not in name:
+            continue
+        results.append({"name": name, **measure(case, args.iterations, args.warmup)})
+    write_results(
+        "parsers",
+        results,
+        args.output,
+        {"iterations": args.iterations, "fixtures": str(args.fixtures)},
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,503 @@
+import asyncio
+import hashlib
+import os
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from functools import partial
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+)
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+
+from singleflight import SingleFlight
+from compression import (
+    COMPRESSION_MIN_SIZE,
+    COMPRESSORS,
+    ENCODINGS,
+    compress_all,
+    negotiate_encoding,
+)
+from flaresolverr_governor import background_scrape
+from metrics import CACHE_LOOKUPS, SERIALIZATION_SECONDS, observe
+from tracing import span
+
+load_dotenv()
+
+# Seconds an entry is served as fresh, per game
+CACHE_TTLS = {
+    "valorant": int(os.getenv("CACHE_TTL_VALORANT", "300")),
+    "tft": int(os.getenv("CACHE_TTL_TFT", "300")),
+    "cs2": int(os.getenv("CACHE_TTL_CS2", "600")),
+}
+
+# Seconds past its TTL an entry may still be served while it is refreshed
+CACHE_STALE_TTL = int(os.getenv("CACHE_STALE_TTL", "3600"))
+
+# Upper bound on how long a single background refresh may hold its lock
+CACHE_REFRESH_LOCK_TTL = int(os.getenv("CACHE_REFRESH_LOCK_TTL", "120"))
+
+CACHE_KEY_PREFIX = "tracker:stats"
+
+CACHE_HIT = "HIT"
+CACHE_MISS = "MISS"
+CACHE_STALE = "STALE"
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def content_etag(body: bytes) -> str:
+    """A strong ETag that only changes when the encoded stats change."""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+class CacheEntry:
+    """
+    A player's stats as stored in the cache: the JSON response body, encoded
+    once when the stats are fetched, with the ETag and fetch time sent to
+    clients. The stats model is only rebuilt when it's asked for.
+
+    `encodings` holds the body compressed with every encoding worth sending.
+    Cached entries are compressed once, when they're written; entries made
+    for a single response (None) compress only what the client asks for.
+    """
+
+    def __init__(
+        self,
+        body: bytes,
+        fetched_at: float,
+        etag: Optional[str] = None,
+        stats: Optional[BaseModel] = None,
+        encodings: Optional[Dict[str, bytes]] = None,
+    ):
+        self.body = body
+        self.fetched_at = fetched_at
+        self.etag = etag or content_etag(body)
+        self.encodings = encodings
+        self._stats = stats
+
+    @classmethod
+    def from_stats(cls, stats: BaseModel) -> "CacheEntry":
+        with observe(SERIALIZATION_SECONDS, stage="dump"):
+            body = stats.model_dump_json().encode()
+        with observe(SERIALIZATION_SECONDS, stage="compress"):
+            encodings = compress_all(body)
+        return cls(body, time.time(), stats=stats, encodings=encodings)
+
+    @classmethod
+    def from_mapping(cls, mapping: Dict[bytes, bytes]) -> "CacheEntry":
+        return cls(
+            mapping[b"body"],
+            float(mapping[b"fetched_at"]),
+            mapping[b"etag"].decode(),
+            encodings={
+                encoding: mapping[f"body:{encoding}".encode()]
+                for encoding in ENCODINGS
+                if f"body:{encoding}".encode() in mapping
+            },
+        )
+
+    def to_mapping(self) -> Dict[str, bytes]:
+        mapping = {
+            "body": self.body,
+            "fetched_at": repr(self.fetched_at),
+            "etag": self.etag,
+        }
+        for encoding, data in (self.encodings or {}).items():
+            mapping[f"body:{encoding}"] = data
+        return mapping
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """The encoding to send this entry in, or None for none."""
+        if self.encodings is not None:
+            return negotiate_encoding(accept_encoding, self.encodings)
+        if len(self.body) < COMPRESSION_MIN_SIZE:
+            return None
+        return negotiate_encoding(accept_encoding, COMPRESSORS)
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return self.body
+        if self.encodings is not None:
+            return self.encodings[encoding]
+        return COMPRESSORS[encoding](self.body)
+
+    def stats(self, model: Type[ModelT]) -> ModelT:
+        if not isinstance(self._stats, model):
+            self._stats = model.model_validate_json(self.body)
+        return self._stats
+
+    def select(self, fields: List[str]) -> "CacheEntry":
+        """An entry holding only the given top-level fields of the stats."""
+        with observe(SERIALIZATION_SECONDS, stage="select"):
+            data = orjson.loads(self.body)
+            body = orjson.dumps({field: data.get(field) for field in fields})
+        return CacheEntry(body, self.fetched_at)
+
+    @property
+    def last_modified(self) -> str:
+        return formatdate(self.fetched_at, usegmt=True)
+
+    def not_modified(
+        self, if_none_match: Optional[str], if_modified_since: Optional[str]
+    ) -> bool:
+        """
+        Whether a client holding the stats these request headers describe
+        already has this entry. If-Modified-Since only counts without an
+        If-None-Match, as in RFC 9110.
+        """
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or any(
+                tag.removeprefix("W/") == self.etag for tag in tags
+            )
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            return (
+                since.tzinfo is not None and int(self.fetched_at) <= since.timestamp()
+            )
+        return False
+
+
+class PlayerStatsCache:
+    """
+    Redis-backed cache for player stats with stale-while-revalidate.
+
+    Entries are kept for their game's TTL plus CACHE_STALE_TTL. Within the TTL
+    they are served as-is; after it they are still served, but one background
+    refresh is started (guarded by a Redis lock so only one worker refetches).
+    Misses go through a single-flight group, so concurrent lookups of the same
+    player share one upstream fetch.
+    """
+
+    def __init__(self):
+        self.redis = None
+        self.singleflight = SingleFlight()
+        self.counts: Dict[str, int] = {CACHE_HIT: 0, CACHE_MISS: 0, CACHE_STALE: 0}
+        self.listeners: List[Callable[[str, str, str, BaseModel], None]] = []
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def init(self, redis_client) -> None:
+        """`redis_client` must not decode responses, entries hold binary data."""
+        self.redis = redis_client
+        self.singleflight.init(redis_client)
+
+    async def close(self) -> None:
+        """Cancel any background refreshes still running."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.redis = None
+
+    @staticmethod
+    def cache_key(game: str, identifier: str, season: str = "default") -> str:
+        return f"{CACHE_KEY_PREFIX}:{game}:{identifier.lower()}:{season}"
+
+    async def get_or_fetch(
+        self,
+        game: str,
+        identifier: str,
+        season: str,
+        model: Type[ModelT],
+        fetch: Callable[[], Awaitable[Optional[ModelT]]],
+        admit: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> Tuple[Optional[ModelT], str]:
+        """
+        Return the cached stats for a player, fetching them on a miss.
+
+        Returns a tuple of the stats (None if the player could not be found)
+        and the cache status: HIT, MISS or STALE. `admit` is awaited with the
+        status before anything is served or fetched, and may raise to refuse
+        the lookup.
+        """
+        entry, cache_status = await self.get_entry(
+            game, identifier, season, fetch, admit
+        )
+        return (entry.stats(model) if entry is not None else None), cache_status
+
+    async def get_entry(
+        self,
+        game: str,
+        identifier: str,
+        season: str,
+        fetch: Callable[[], Awaitable[Optional[BaseModel]]],
+        admit: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> Tuple[Optional[CacheEntry], str]:
+        """
+        Like get_or_fetch, but returns the cache entry so a request can be
+        answered from its ETag without building the stats model.
+        """
+        with span(
+            "cache.lookup", game=game, player=identifier, season=season
+        ) as current:
+            entry, cache_status = await self._get_entry(
+                game, identifier, season, fetch, admit
+            )
+            current.set_attribute("cache.status", cache_status)
+            if entry is not None:
+                current.set_attribute("cache.body_size", len(entry.body))
+            return entry, cache_status
+
+    async def _get_entry(
+        self,
+        game: str,
+        identifier: str,
+        season: str,
+        fetch: Callable[[], Awaitable[Optional[BaseModel]]],
+        admit: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> Tuple[Optional[CacheEntry], str]:
+        key = self.cache_key(game, identifier, season)
+        ttl = CACHE_TTLS[game]
+        fetch = self._notifying(game, identifier, season, fetch)
+
+        entry = await self._read(key)
+        if entry is not None:
+            if time.time() - entry.fetched_at < ttl:
+                if admit is not None:
+                    await admit(CACHE_HIT)
+                self.counts[CACHE_HIT] += 1
+                CACHE_LOOKUPS.labels(game, CACHE_HIT).inc()
+                return entry, CACHE_HIT
+
+            if admit is not None:
+                await admit(CACHE_STALE)
+            self.counts[CACHE_STALE] += 1
+            CACHE_LOOKUPS.labels(game, CACHE_STALE).inc()
+            self._schedule_refresh(key, ttl, fetch)
+            return entry, CACHE_STALE
+
+        if admit is not None:
+            await admit(CACHE_MISS)
+        self.counts[CACHE_MISS] += 1
+        CACHE_LOOKUPS.labels(game, CACHE_MISS).inc()
+
+        entry = await self.singleflight.do(
+            key,
+            partial(self._fetch_and_store, key, ttl, fetch),
+            partial(self._read, key),
+        )
+        return entry, CACHE_MISS
+
+    async def get_many(
+        self, game: str, season: str, identifiers: List[str]
+    ) -> Dict[str, Tuple[Optional[CacheEntry], str]]:
+        """
+        Each player's cached entry and its status (HIT, STALE or MISS), read in
+        one round trip. Nothing is fetched, refreshed or counted.
+        """
+        misses = {identifier: (None, CACHE_MISS) for identifier in identifiers}
+        if self.redis is None or not identifiers:
+            return misses
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for identifier in identifiers:
+                    pipe.hgetall(self.cache_key(game, identifier, season))
+                mappings = await pipe.execute()
+        except RedisError as e:
+            print(f"Cache read failed for {game} batch: {e}")
+            return misses
+
+        now = time.time()
+        entries = {}
+        for identifier, mapping in zip(identifiers, mappings):
+            if not mapping:
+                entries[identifier] = (None, CACHE_MISS)
+                continue
+            entry = CacheEntry.from_mapping(mapping)
+            fresh = now - entry.fetched_at < CACHE_TTLS[game]
+            entries[identifier] = (entry, CACHE_HIT if fresh else CACHE_STALE)
+        return entries
+
+    async def store_many(
+        self, game: str, season: str, stats_by_identifier: Dict[str, BaseModel]
+    ) -> None:
+        """Store stats fetched outside of get_or_fetch, e.g. by a batch lookup."""
+        for identifier, stats in stats_by_identifier.items():
+            self._notify(game, identifier, season, stats)
+        if self.redis is None or not stats_by_identifier:
+            return
+        ttl = CACHE_TTLS[game]
+        try:
+            async with self.redis.pipeline() as pipe:
+                for identifier, stats in stats_by_identifier.items():
+                    self._queue_write(
+                        pipe,
+                        self.cache_key(game, identifier, season),
+                        ttl,
+                        CacheEntry.from_stats(stats),
+                    )
+                await pipe.execute()
+        except RedisError as e:
+            print(f"Cache write failed for {game} batch: {e}")
+
+    async def refresh(
+        self,
+        game: str,
+        identifier: str,
+        season: str,
+        fetch: Callable[[], Awaitable[Optional[ModelT]]],
+    ) -> Optional[ModelT]:
+        """Fetch a player's stats and store them whatever the entry's age."""
+        key = self.cache_key(game, identifier, season)
+        fetch = self._notifying(game, identifier, season, fetch)
+        entry = await self._fetch_and_store(key, CACHE_TTLS[game], fetch)
+        return entry._stats if entry is not None else None
+
+    async def entry_ages(
+        self, game: str, season: str, identifiers: List[str]
+    ) -> Dict[str, Optional[float]]:
+        """
+        Seconds since each player's entry was fetched, or None if it isn't
+        cached. Derived from the keys' remaining TTLs so no entry is read.
+        """
+        if self.redis is None or not identifiers:
+            return {identifier: None for identifier in identifiers}
+        lifetime = CACHE_TTLS[game] + CACHE_STALE_TTL
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for identifier in identifiers:
+                pipe.pttl(self.cache_key(game, identifier, season))
+            remaining = await pipe.execute()
+        return {
+            identifier: lifetime - pttl / 1000 if pttl >= 0 else None
+            for identifier, pttl in zip(identifiers, remaining)
+        }
+
+    def apply_headers(self, response: Response, status: str) -> None:
+        """Expose the cache status and this worker's running counts."""
+        response.headers["X-Cache"] = status
+        response.headers["X-Cache-Hits"] = str(self.counts[CACHE_HIT])
+        response.headers["X-Cache-Misses"] = str(self.counts[CACHE_MISS])
+        response.headers["X-Cache-Stale"] = str(self.counts[CACHE_STALE])
+
+    async def _read(self, key: str) -> Optional[CacheEntry]:
+        if self.redis is None:
+            return None
+        try:
+            mapping = await self.redis.hgetall(key)
+        except RedisError as e:
+            print(f"Cache read failed for {key}: {e}")
+            return None
+        if not mapping:
+            return None
+        return CacheEntry.from_mapping(mapping)
+
+    @staticmethod
+    def _queue_write(pipe, key: str, ttl: int, entry: CacheEntry) -> None:
+        # Replace the whole hash so no field of an older entry survives
+        pipe.delete(key)
+        pipe.hset(key, mapping=entry.to_mapping())
+        pipe.expire(key, ttl + CACHE_STALE_TTL)
+
+    async def _write(self, key: str, ttl: int, entry: CacheEntry) -> None:
+        if self.redis is None:
+            return
+        try:
+            async with self.redis.pipeline() as pipe:
+                self._queue_write(pipe, key, ttl, entry)
+                await pipe.execute()
+        except RedisError as e:
+            print(f"Cache write failed for {key}: {e}")
+
+    def add_listener(
+        self, listener: Callable[[str, str, str, BaseModel], None]
+    ) -> None:
+        """
+        Call `listener(game, identifier, season, stats)` with every set of
+        stats freshly fetched from upstream.
+        """
+        self.listeners.append(listener)
+
+    def _notify(
+        self, game: str, identifier: str, season: str, stats: BaseModel
+    ) -> None:
+        for listener in self.listeners:
+            try:
+                listener(game, identifier, season, stats)
+            except Exception as e:
+                print(f"Cache listener failed for {game} {identifier}: {e}")
+
+    def _notifying(
+        self,
+        game: str,
+        identifier: str,
+        season: str,
+        fetch: Callable[[], Awaitable[Optional[ModelT]]],
+    ) -> Callable[[], Awaitable[Optional[ModelT]]]:
+        async def fetch_and_notify() -> Optional[ModelT]:
+            stats = await fetch()
+            if stats is not None:
+                self._notify(game, identifier, season, stats)
+            return stats
+
+        return fetch_and_notify
+
+    async def _fetch_and_store(
+        self,
+        key: str,
+        ttl: int,
+        fetch: Callable[[], Awaitable[Optional[BaseModel]]],
+    ) -> Optional[CacheEntry]:
+        stats = await fetch()
+        if stats is None:
+            return None
+        entry = CacheEntry.from_stats(stats)
+        await self._write(key, ttl, entry)
+        return entry
+
+    def _schedule_refresh(
+        self,
+        key: str,
+        ttl: int,
+        fetch: Callable[[], Awaitable[Optional[BaseModel]]],
+    ) -> None:
+        # Only one refresh per key per worker; the Redis lock covers the others
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        task = asyncio.create_task(self._refresh(key, ttl, fetch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(
+        self,
+        key: str,
+        ttl: int,
+        fetch: Callable[[], Awaitable[Optional[BaseModel]]],
+    ) -> None:
+        lock_key = f"{key}:refresh"
+        try:
+            acquired = await self.redis.set(
+                lock_key, "1", nx=True, ex=CACHE_REFRESH_LOCK_TTL
+            )
+            if not acquired:
+                return
+            try:
+                with background_scrape():
+                    await self._fetch_and_store(key, ttl, fetch)
+            finally:
+                await self.redis.delete(lock_key)
+        except RedisError as e:
+            print(f"Cache refresh failed for {key}: {e}")
+        except Exception as e:
+            print(f"An error occurred while refreshing {key}: {e}")
+        finally:
+            self._refreshing.discard(key)
+
+
+player_stats_cache = PlayerStatsCache()
@@ -0,0 +1,163 @@
+import gzip
+import os
+import zlib
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from dotenv import load_dotenv
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+load_dotenv()
+
+# Responses smaller than this many bytes are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# Levels used for each encoding. Cached stats are compressed once per cache
+# entry, so these can favour size over speed.
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "9"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "9"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "12"))
+
+# Levels for batch, history and delta responses, which are compressed on
+# every request, so these favour speed over size
+COMPRESSION_DYNAMIC_GZIP_LEVEL = int(os.getenv("COMPRESSION_DYNAMIC_GZIP_LEVEL", "6"))
+COMPRESSION_DYNAMIC_BROTLI_QUALITY = int(
+    os.getenv("COMPRESSION_DYNAMIC_BROTLI_QUALITY", "4")
+)
+COMPRESSION_DYNAMIC_ZSTD_LEVEL = int(os.getenv("COMPRESSION_DYNAMIC_ZSTD_LEVEL", "3"))
+
+# Encodings we send, most preferred first
+ENCODINGS = ("br", "zstd", "gzip")
+
+# Encodings this worker can produce. Brotli and zstd need the brotli and
+# zstandard packages; entries they compressed elsewhere are still served.
+COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {}
+if brotli is not None:
+    COMPRESSORS["br"] = lambda body: brotli.compress(
+        body, quality=COMPRESSION_BROTLI_QUALITY
+    )
+if zstandard is not None:
+    COMPRESSORS["zstd"] = lambda body: zstandard.ZstdCompressor(
+        level=COMPRESSION_ZSTD_LEVEL
+    ).compress(body)
+COMPRESSORS["gzip"] = lambda body: gzip.compress(
+    body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0
+)
+
+DYNAMIC_COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {}
+if brotli is not None:
+    DYNAMIC_COMPRESSORS["br"] = lambda body: brotli.compress(
+        body, quality=COMPRESSION_DYNAMIC_BROTLI_QUALITY
+    )
+if zstandard is not None:
+    DYNAMIC_COMPRESSORS["zstd"] = lambda body: zstandard.ZstdCompressor(
+        level=COMPRESSION_DYNAMIC_ZSTD_LEVEL
+    ).compress(body)
+DYNAMIC_COMPRESSORS["gzip"] = lambda body: gzip.compress(
+    body, compresslevel=COMPRESSION_DYNAMIC_GZIP_LEVEL, mtime=0
+)
+
+
+def compress_all(body: bytes) -> Dict[str, bytes]:
+    """Every encoding of a body worth sending, none if it's under the threshold."""
+    if len(body) < COMPRESSION_MIN_SIZE:
+        return {}
+    encoded = {encoding: compress(body) for encoding, compress in COMPRESSORS.items()}
+    return {
+        encoding: data for encoding, data in encoded.items() if len(data) < len(body)
+    }
+
+
+def negotiate_encoding(
+    accept_encoding: Optional[str], available: Iterable[str]
+) -> Optional[str]:
+    """
+    Pick the available encoding the client's Accept-Encoding rates highest,
+    preferring ours in ENCODINGS order on ties. None means send it as is.
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if encoding in available and weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress_response(
+    body: bytes, accept_encoding: Optional[str]
+) -> Tuple[bytes, Optional[str]]:
+    """
+    Compress a body built for a single response in the encoding the client
+    prefers. The encoding is None if it's sent as is.
+    """
+    if len(body) < COMPRESSION_MIN_SIZE:
+        return body, None
+    encoding = negotiate_encoding(accept_encoding, DYNAMIC_COMPRESSORS)
+    if encoding is None:
+        return body, None
+    compressed = DYNAMIC_COMPRESSORS[encoding](body)
+    if len(compressed) >= len(body):
+        return body, None
+    return compressed, encoding
+
+
+class StreamCompressor:
+    """
+    Compresses a streamed response chunk by chunk. Every chunk is flushed so
+    the client can decode it as soon as it arrives.
+    """
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(
+                quality=COMPRESSION_DYNAMIC_BROTLI_QUALITY
+            )
+            self._compress = self._compressor.process
+            self._flush = self._compressor.flush
+            self._finish = self._compressor.finish
+        elif encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(
+                level=COMPRESSION_DYNAMIC_ZSTD_LEVEL
+            ).compressobj()
+            self._compress = self._compressor.compress
+            self._flush = lambda: self._compressor.flush(
+                zstandard.COMPRESSOBJ_FLUSH_BLOCK
+            )
+            self._finish = self._compressor.flush
+        else:
+            # wbits=31 writes a gzip header and trailer
+            self._compressor = zlib.compressobj(
+                COMPRESSION_DYNAMIC_GZIP_LEVEL, zlib.DEFLATED, 31
+            )
+            self._compress = self._compressor.compress
+            self._flush = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._compressor.flush
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compress(chunk) + self._flush()
+
+    def finish(self) -> bytes:
+        return self._finish()
@@ -0,0 +1,203 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from http_client import http_sessions
+from flaresolverr_governor import FLARESOLVERR_EXPECTED_SERVICE_TIME
+from flaresolverr_sessions import FlareSolverrSessionPool
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Comma-separated FlareSolverr endpoints, e.g. http://fs-1:8191/v1,http://fs-2:8191/v1
+FLARESOLVERR_URLS = [
+    url.strip()
+    for url in os.getenv("FLARESOLVERR_URLS", os.getenv("FLARESOLVERR_URL", "")).split(
+        ","
+    )
+    if url.strip()
+]
+
+FLARESOLVERR_HEALTH_INTERVAL = float(os.getenv("FLARESOLVERR_HEALTH_INTERVAL", "15"))
+FLARESOLVERR_FAILURE_THRESHOLD = int(os.getenv("FLARESOLVERR_FAILURE_THRESHOLD", "3"))
+FLARESOLVERR_CIRCUIT_COOLDOWN = float(os.getenv("FLARESOLVERR_CIRCUIT_COOLDOWN", "30"))
+FLARESOLVERR_LATENCY_ALPHA = float(os.getenv("FLARESOLVERR_LATENCY_ALPHA", "0.2"))
+
+SendCommand = Callable[[str, dict], Awaitable[dict]]
+
+
+class FlareSolverrInstance:
+    """One FlareSolverr backend with its load, latency and circuit state."""
+
+    def __init__(self, url: str, send: SendCommand):
+        self.url = url
+        self.name = urlsplit(url).netloc
+        self.session_pool = FlareSolverrSessionPool(lambda payload: send(url, payload))
+        self.in_flight = 0
+        # Until a page load completes, assume the expected navigation time so
+        # a cold instance's load still grows with its in-flight requests
+        self.latency_ewma = FLARESOLVERR_EXPECTED_SERVICE_TIME
+        self.latency_measured = False
+        self.consecutive_failures = 0
+        self.circuit_open_until = 0.0
+        self.draining = False
+
+    @property
+    def health_url(self) -> str:
+        parts = urlsplit(self.url)
+        return f"{parts.scheme}://{parts.netloc}/health"
+
+    @property
+    def circuit_open(self) -> bool:
+        return self.circuit_open_until > time.monotonic()
+
+    @property
+    def available(self) -> bool:
+        # Once the cooldown passes the circuit is half-open: requests are let
+        # through again and the next success or failure settles it
+        return not self.draining and not self.circuit_open
+
+    @property
+    def load(self) -> float:
+        return (self.in_flight + 1) * self.latency_ewma
+
+    def record_latency(self, latency: float) -> None:
+        """Fold the duration of one page load into the latency EWMA."""
+        if self.latency_measured:
+            self.latency_ewma += FLARESOLVERR_LATENCY_ALPHA * (
+                latency - self.latency_ewma
+            )
+        else:
+            self.latency_ewma = latency
+            self.latency_measured = True
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.circuit_open_until = 0.0
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= FLARESOLVERR_FAILURE_THRESHOLD:
+            if not self.circuit_open:
+                print(f"FlareSolverr instance {self.name} ejected after failures.")
+            self.circuit_open_until = time.monotonic() + FLARESOLVERR_CIRCUIT_COOLDOWN
+
+    def status(self) -> dict:
+        return {
+            "name": self.name,
+            "url": self.url,
+            "available": self.available,
+            "draining": self.draining,
+            "circuit_open": self.circuit_open,
+            "in_flight": self.in_flight,
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1),
+            "latency_measured": self.latency_measured,
+            "consecutive_failures": self.consecutive_failures,
+        }
+
+
+class FlareSolverrBalancer:
+    """
+    Routes FlareSolverr requests to the least-loaded healthy instance.
+
+    Load is the in-flight count weighted by the instance's latency EWMA, or
+    by FLARESOLVERR_EXPECTED_SERVICE_TIME until it has completed a page load.
+    Instances that keep failing, on requests or on periodic health probes,
+    are ejected by a circuit breaker for a cooldown, and instances can be
+    drained so they finish in-flight work but take no new requests.
+    """
+
+    def __init__(self, urls: List[str], send: SendCommand):
+        self.instances: Dict[str, FlareSolverrInstance] = {}
+        for url in urls:
+            instance = FlareSolverrInstance(url, send)
+            self.instances[instance.name] = instance
+        self._health_task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._health_task is None and self.instances:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+        for instance in self.instances.values():
+            await instance.session_pool.close()
+
+    def pick(self, exclude: tuple = ()) -> Optional[FlareSolverrInstance]:
+        candidates = [
+            instance
+            for instance in self.instances.values()
+            if instance.available and instance.name not in exclude
+        ]
+        if not candidates:
+            return None
+        # Equal loads go to the instance with fewer requests and failures
+        return min(
+            candidates,
+            key=lambda instance: (
+                instance.load,
+                instance.in_flight,
+                instance.consecutive_failures,
+            ),
+        )
+
+    @asynccontextmanager
+    async def track(self, instance: FlareSolverrInstance) -> AsyncIterator[None]:
+        """Count a request against an instance and record how it went."""
+        instance.in_flight += 1
+        try:
+            yield
+        except Exception:
+            instance.record_failure()
+            raise
+        else:
+            instance.record_success()
+        finally:
+            instance.in_flight -= 1
+
+    def drain(self, name: str) -> None:
+        """Stop routing new requests to an instance."""
+        self.instances[name].draining = True
+
+    async def close_drained(self, name: str) -> None:
+        """Destroy a draining instance's sessions once its requests finish."""
+        instance = self.instances[name]
+        while instance.in_flight and instance.draining:
+            await asyncio.sleep(0.5)
+        if instance.draining:
+            await instance.session_pool.close()
+
+    def undrain(self, name: str) -> None:
+        self.instances[name].draining = False
+
+    def status(self) -> List[dict]:
+        return [instance.status() for instance in self.instances.values()]
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.gather(
+                *(self._probe(instance) for instance in self.instances.values())
+            )
+            await asyncio.sleep(FLARESOLVERR_HEALTH_INTERVAL)
+
+    async def _probe(self, instance: FlareSolverrInstance) -> None:
+        session = http_sessions.get("flaresolverr")
+        try:
+            async with session.get(
+                instance.health_url, timeout=FLARESOLVERR_HEALTH_INTERVAL
+            ) as response:
+                response.raise_for_status()
+        except Exception as e:
+            print(f"Health check failed for FlareSolverr instance {instance.name}: {e}")
+            instance.record_failure()
+            return
+        # A passing probe only closes the circuit once the cooldown is over. Its
+        # round trip says nothing about page load times, so the EWMA is left be.
+        if not instance.circuit_open:
+            instance.record_success()
@@ -1,10 +1,34 @@
 import aiohttp
 import os
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Optional
 from dotenv import load_dotenv
 
+from http_client import http_sessions
+from flaresolverr_sessions import (
+    ClearanceStore,
+    FLARESOLVERR_SESSION_POOL_SIZE,
+    PooledSession,
+)
+from flaresolverr_balancer import (
+    FLARESOLVERR_URLS,
+    FlareSolverrBalancer,
+    FlareSolverrInstance,
+)
+from flaresolverr_governor import FLARESOLVERR_MAX_CONCURRENCY, FlareSolverrGovernor
+from metrics import UPSTREAM_ERRORS, UPSTREAM_REQUEST_SECONDS, error_reason, observe
+from tracing import current_span, span
+
 load_dotenv()
 
-FLARESOLVERR_URL = os.getenv("FLARESOLVERR_URL")
+# How many instances a page load is tried on before giving up
+FLARESOLVERR_MAX_ATTEMPTS = int(os.getenv("FLARESOLVERR_MAX_ATTEMPTS", "2"))
+
+# Fetch pages with plain HTTP while a captured cf_clearance is still valid
+FLARESOLVERR_DIRECT_FETCH = (
+    os.getenv("FLARESOLVERR_DIRECT_FETCH", "true").lower() == "true"
+)
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/85.0.4183.121 Safari/537.36",
@@ -14,18 +38,197 @@ HEADERS = {
 }
 
 
-async def fetch_page_with_flaresolverr(url: str) -> str:
-    payload = {"cmd": "request.get", "url": url, "maxTimeout": 60000}
+async def send_flaresolverr_command(
+    flaresolverr_url: str,
+    payload: dict,
+    session: Optional[aiohttp.ClientSession] = None,
+) -> dict:
+    """Send one command to a FlareSolverr instance and return its JSON result."""
+    session = session or http_sessions.get("flaresolverr")
+    async with session.post(flaresolverr_url, json=payload) as response:
+        response.raise_for_status()
+        return await response.json()
+
+
+class PinnedBrowser:
+    """
+    One FlareSolverr slot, instance and pooled browser session, held across
+    the page loads made with it. Each is taken on the first load that needs
+    it; the instance and session are replaced only if they fail.
+    """
+
+    def __init__(self, stack: AsyncExitStack):
+        self._stack = stack
+        self._session_stack = AsyncExitStack()
+        self.has_slot = False
+        self.instance: Optional[FlareSolverrInstance] = None
+        self.pooled: Optional[PooledSession] = None
+
+    async def take_slot(self) -> None:
+        if not self.has_slot:
+            await self._stack.enter_async_context(flaresolverr_governor.slot())
+            # Registered after the slot, so the session is returned first
+            self._stack.push_async_callback(self.release_session)
+            self.has_slot = True
+
+    async def session_on(
+        self, instance: FlareSolverrInstance
+    ) -> Optional[PooledSession]:
+        """The pinned session, moved to `instance` if it's on another one."""
+        if self.instance is not instance or (
+            self.pooled is not None and not self.pooled.healthy
+        ):
+            await self.release_session()
+            self.pooled = await self._session_stack.enter_async_context(
+                instance.session_pool.acquire()
+            )
+            self.instance = instance
+        return self.pooled
+
+    async def release_session(self) -> None:
+        session_stack, self._session_stack = self._session_stack, AsyncExitStack()
+        self.instance = self.pooled = None
+        await session_stack.aclose()
+
+
+@asynccontextmanager
+async def flaresolverr_browser_session() -> AsyncIterator[PinnedBrowser]:
+    """
+    Pin the page loads made with the yielded browser to one FlareSolverr
+    slot, instance and pooled session, so later loads reuse the browser and
+    its solved Cloudflare challenge. Loads served by a direct fetch take none.
+    """
+    async with AsyncExitStack() as stack:
+        yield PinnedBrowser(stack)
+
+
+async def fetch_page_with_flaresolverr(
+    url: str,
+    session: Optional[aiohttp.ClientSession] = None,
+    browser: Optional[PinnedBrowser] = None,
+) -> str:
+    with span("fetch_page_with_flaresolverr", **{"url.full": url}) as current:
+        # Fast path: plain HTTP with a clearance captured from an earlier solve
+        if FLARESOLVERR_DIRECT_FETCH:
+            page_content = await clearance_store.fetch(url)
+            if page_content:
+                current.set_attributes(
+                    {"fetch.path": "direct", "page.size": len(page_content)}
+                )
+                return page_content
+
+        # Otherwise wait for a FlareSolverr slot; raises FlareSolverrOverloaded
+        # if one can't be had in time
+        if browser is not None:
+            await browser.take_slot()
+            page_content = await fetch_page_from_instances(url, session, browser)
+        else:
+            async with flaresolverr_governor.slot():
+                page_content = await fetch_page_from_instances(url, session)
+        current.set_attributes(
+            {"fetch.path": "flaresolverr", "page.size": len(page_content)}
+        )
+        return page_content
+
+
+async def fetch_page_from_instances(
+    url: str,
+    session: Optional[aiohttp.ClientSession] = None,
+    browser: Optional[PinnedBrowser] = None,
+) -> str:
+    # Render it in a pooled browser session on the least-loaded instance (or
+    # the pinned one), moving on to the next one if that instance fails
+    tried = ()
+    for _ in range(FLARESOLVERR_MAX_ATTEMPTS):
+        instance = browser.instance if browser is not None else None
+        if instance is None or not instance.available or instance.name in tried:
+            instance = flaresolverr_balancer.pick(exclude=tried)
+        if instance is None:
+            print("No healthy FlareSolverr instance available.")
+            return ""
+        tried += (instance.name,)
 
-    async with aiohttp.ClientSession() as session:
         try:
-            async with session.post(FLARESOLVERR_URL, json=payload) as response:
-                response.raise_for_status()
-                result = await response.json()
-                return result.get("solution", {}).get("response", "")
+            async with flaresolverr_balancer.track(instance):
+                if browser is None:
+                    async with instance.session_pool.acquire() as pooled:
+                        return await load_in_session(url, instance, pooled, session)
+                pooled = await browser.session_on(instance)
+                try:
+                    return await load_in_session(url, instance, pooled, session)
+                except Exception:
+                    if pooled is not None:
+                        pooled.healthy = False
+                    raise
         except aiohttp.ClientResponseError as e:
-            print(f"HTTP error occurred: {e.status} - {e.message}")
-            return ""
+            UPSTREAM_ERRORS.labels("flaresolverr", instance.name, str(e.status)).inc()
+            print(f"HTTP error occurred on {instance.name}: {e.status} - {e.message}")
         except Exception as e:
-            print(f"An error occurred: {e}")
-            return ""
+            UPSTREAM_ERRORS.labels("flaresolverr", instance.name, error_reason(e)).inc()
+            print(f"An error occurred on {instance.name}: {e}")
+    return ""
+
+
+async def load_in_session(
+    url: str,
+    instance: FlareSolverrInstance,
+    pooled: Optional[PooledSession],
+    session: Optional[aiohttp.ClientSession] = None,
+) -> str:
+    """Load a page on one instance, in a pooled session if there is one."""
+    with span(
+        "flaresolverr.request.get",
+        **{
+            "flaresolverr.instance": instance.name,
+            "flaresolverr.pooled_session": pooled is not None,
+        },
+    ), observe(UPSTREAM_REQUEST_SECONDS, upstream="flaresolverr", target=instance.name):
+        started = time.monotonic()
+        page_content = await fetch_page_in_browser(
+            url, instance.url, session, pooled.id if pooled else None
+        )
+        instance.record_latency(time.monotonic() - started)
+    if not page_content:
+        UPSTREAM_ERRORS.labels("flaresolverr", instance.name, "empty_page").inc()
+        if pooled is not None:
+            pooled.healthy = False
+    return page_content
+
+
+async def fetch_page_in_browser(
+    url: str,
+    flaresolverr_url: str,
+    session: Optional[aiohttp.ClientSession] = None,
+    browser_session: Optional[str] = None,
+) -> str:
+    payload = {"cmd": "request.get", "url": url, "maxTimeout": 60000}
+    if browser_session:
+        payload["session"] = browser_session
+
+    result = await send_flaresolverr_command(flaresolverr_url, payload, session=session)
+    solution = result.get("solution", {})
+    clearance_store.capture(url, solution)
+    page_content = solution.get("response", "")
+
+    # How long the browser spent, and whether it met a Cloudflare challenge
+    attributes = {
+        "flaresolverr.message": result.get("message", ""),
+        "http.response.status_code": solution.get("status", 0),
+        "page.size": len(page_content),
+    }
+    if "startTimestamp" in result and "endTimestamp" in result:
+        attributes["flaresolverr.solve_ms"] = (
+            result["endTimestamp"] - result["startTimestamp"]
+        )
+    current_span().set_attributes(attributes)
+    return page_content
+
+
+flaresolverr_balancer = FlareSolverrBalancer(
+    FLARESOLVERR_URLS, send_flaresolverr_command
+)
+clearance_store = ClearanceStore(HEADERS)
+flaresolverr_governor = FlareSolverrGovernor(
+    FLARESOLVERR_MAX_CONCURRENCY
+    or FLARESOLVERR_SESSION_POOL_SIZE * max(len(FLARESOLVERR_URLS), 1)
+)
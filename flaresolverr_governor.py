@@ -0,0 +1,268 @@
+import asyncio
+import math
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Iterator
+
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+
+from tracing import span
+
+load_dotenv()
+
+# FlareSolverr navigations allowed at once across every worker. 0 means one
+# per pooled browser session on every instance.
+FLARESOLVERR_MAX_CONCURRENCY = int(os.getenv("FLARESOLVERR_MAX_CONCURRENCY", "0"))
+
+# Requests allowed to wait for a slot before new ones are turned away
+FLARESOLVERR_MAX_QUEUE = int(os.getenv("FLARESOLVERR_MAX_QUEUE", "50"))
+
+# Seconds a request may spend queueing and scraping before it's not worth it
+FLARESOLVERR_REQUEST_DEADLINE = float(os.getenv("FLARESOLVERR_REQUEST_DEADLINE", "45"))
+
+# A slot is reclaimed after this many seconds if its holder stops renewing it,
+# e.g. because its worker died. Held slots are renewed every third of this.
+FLARESOLVERR_SLOT_LEASE = float(os.getenv("FLARESOLVERR_SLOT_LEASE", "30"))
+
+FLARESOLVERR_QUEUE_POLL_INTERVAL = float(
+    os.getenv("FLARESOLVERR_QUEUE_POLL_INTERVAL", "0.1")
+)
+
+# Initial guess at how long a navigation takes, refined as they complete
+FLARESOLVERR_EXPECTED_SERVICE_TIME = float(
+    os.getenv("FLARESOLVERR_EXPECTED_SERVICE_TIME", "10")
+)
+
+GOVERNOR_KEY_PREFIX = "tracker:flaresolverr:governor"
+
+# Waiters that stop polling for this long are assumed gone
+QUEUE_STALE_MS = 5000
+
+# Join the queue if needed, then take a slot if one is free and we're at the
+# front of the queue.
+#
+# KEYS: slot holders (zset of lease expiries), queue (zset of enqueue times),
+#       last time each waiter polled (hash)
+# ARGV: token, now ms, limit, lease ms, max queue, stale ms
+# Returns {1, 0} once a slot is taken, {0, position} while queued, {-1, depth}
+# if the queue is full
+ACQUIRE_SCRIPT = """
+local token, now, limit = ARGV[1], tonumber(ARGV[2]), tonumber(ARGV[3])
+local lease, max_queue, stale = tonumber(ARGV[4]), tonumber(ARGV[5]), tonumber(ARGV[6])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+for _, waiter in ipairs(redis.call('ZRANGE', KEYS[2], 0, -1)) do
+    if tonumber(redis.call('HGET', KEYS[3], waiter) or '0') < now - stale then
+        redis.call('ZREM', KEYS[2], waiter)
+        redis.call('HDEL', KEYS[3], waiter)
+    end
+end
+
+if not redis.call('ZSCORE', KEYS[2], token) then
+    local depth = redis.call('ZCARD', KEYS[2])
+    if depth >= max_queue then
+        return {-1, depth}
+    end
+    redis.call('ZADD', KEYS[2], now, token)
+end
+redis.call('HSET', KEYS[3], token, now)
+
+local free = limit - redis.call('ZCARD', KEYS[1])
+local rank = redis.call('ZRANK', KEYS[2], token)
+if rank < free then
+    redis.call('ZREM', KEYS[2], token)
+    redis.call('HDEL', KEYS[3], token)
+    redis.call('ZADD', KEYS[1], now + lease, token)
+    return {1, 0}
+end
+return {0, rank - math.max(free, 0) + 1}
+"""
+
+# Whether callers in this context queue for a slot or only take a free one
+_queue_for_slot: ContextVar[bool] = ContextVar("queue_for_slot", default=True)
+
+
+@contextmanager
+def background_scrape() -> Iterator[None]:
+    """
+    Scrapes in this block only take a FlareSolverr slot that's free right
+    away, so background refreshes never queue ahead of user requests.
+    """
+    token = _queue_for_slot.set(False)
+    try:
+        yield
+    finally:
+        _queue_for_slot.reset(token)
+
+
+class FlareSolverrOverloaded(Exception):
+    """No FlareSolverr slot can be had within the request's deadline."""
+
+    def __init__(self, retry_after: float):
+        super().__init__("FlareSolverr is overloaded.")
+        self.retry_after = max(math.ceil(retry_after), 1)
+
+
+class FlareSolverrGovernor:
+    """
+    Global limit on concurrent FlareSolverr navigations, shared through Redis.
+
+    Requests wait their turn in a bounded FIFO queue. A request is turned away
+    with FlareSolverrOverloaded as soon as the queue is full or its estimated
+    wait (queue position times the average navigation time) would run past
+    FLARESOLVERR_REQUEST_DEADLINE, rather than waiting to time out. Background
+    refreshes never queue, so under load they are shed first and stale cache
+    entries keep being served. A held slot's lease is renewed until it's
+    released, however many attempts the navigation takes. Without Redis, or
+    while it's failing, the limit is per worker.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.redis = None
+        self.service_time = FLARESOLVERR_EXPECTED_SERVICE_TIME
+        self._local = asyncio.Semaphore(limit)
+        self._acquire = None
+
+    def init(self, redis_client) -> None:
+        self.redis = redis_client
+        self._acquire = redis_client.register_script(ACQUIRE_SCRIPT)
+
+    def close(self) -> None:
+        self.redis = None
+        self._acquire = None
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one FlareSolverr slot for the duration of the block."""
+        token = uuid.uuid4().hex
+        if self.redis is None or not await self._wait_for_slot(token):
+            async with self._local_slot():
+                yield
+            return
+
+        renewal = asyncio.create_task(self._renew(token))
+        try:
+            async with self._timed():
+                yield
+        finally:
+            renewal.cancel()
+            await self._release(token)
+
+    @asynccontextmanager
+    async def _local_slot(self) -> AsyncIterator[None]:
+        """Hold one of this worker's own slots for the duration of the block."""
+        if self._local.locked() and not _queue_for_slot.get():
+            raise FlareSolverrOverloaded(self.service_time)
+        with span("flaresolverr.queue"):
+            await self._local.acquire()
+        try:
+            async with self._timed():
+                yield
+        finally:
+            self._local.release()
+
+    @asynccontextmanager
+    async def _timed(self) -> AsyncIterator[None]:
+        started = time.monotonic()
+        yield
+        self.service_time += 0.2 * (time.monotonic() - started - self.service_time)
+
+    def _estimated_wait(self, position: int) -> float:
+        return math.ceil(position / self.limit) * self.service_time
+
+    async def _wait_for_slot(self, token: str) -> bool:
+        """
+        Queue for a slot. Returns False if Redis failed, in which case the
+        caller should fall back to the per-worker limit.
+        """
+        deadline = time.monotonic() + FLARESOLVERR_REQUEST_DEADLINE
+        try:
+            with span("flaresolverr.queue"):
+                return await self._queue(token, deadline)
+        except RedisError as e:
+            print(f"FlareSolverr governor unavailable, limiting per worker: {e}")
+            return False
+        except asyncio.CancelledError:
+            await asyncio.shield(self._leave_queue(token))
+            raise
+
+    async def _queue(self, token: str, deadline: float) -> bool:
+        while True:
+            taken, position = await self._acquire(
+                keys=self._keys(),
+                args=[
+                    token,
+                    int(time.time() * 1000),
+                    self.limit,
+                    int(FLARESOLVERR_SLOT_LEASE * 1000),
+                    FLARESOLVERR_MAX_QUEUE,
+                    QUEUE_STALE_MS,
+                ],
+            )
+            if taken == 1:
+                return True
+            if taken == -1:
+                raise FlareSolverrOverloaded(self._estimated_wait(position))
+
+            wait = self._estimated_wait(position)
+            if (
+                not _queue_for_slot.get()
+                or time.monotonic() + wait + self.service_time > deadline
+            ):
+                await self._leave_queue(token)
+                raise FlareSolverrOverloaded(wait)
+            await asyncio.sleep(FLARESOLVERR_QUEUE_POLL_INTERVAL)
+
+    def _keys(self):
+        return [
+            f"{GOVERNOR_KEY_PREFIX}:slots",
+            f"{GOVERNOR_KEY_PREFIX}:queue",
+            f"{GOVERNOR_KEY_PREFIX}:seen",
+        ]
+
+    async def _leave_queue(self, token: str) -> None:
+        slots, queue, seen = self._keys()
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.zrem(queue, token)
+                pipe.hdel(seen, token)
+                # In case the slot was granted just as we gave up on it
+                pipe.zrem(slots, token)
+                await pipe.execute()
+        except RedisError as e:
+            print(f"Could not leave the FlareSolverr queue: {e}")
+
+    async def _renew(self, token: str) -> None:
+        """Push the slot's lease back until the holder cancels this task."""
+        slots = self._keys()[0]
+        while True:
+            await asyncio.sleep(FLARESOLVERR_SLOT_LEASE / 3)
+            expires = int((time.time() + FLARESOLVERR_SLOT_LEASE) * 1000)
+            try:
+                await self.redis.zadd(slots, {token: expires}, xx=True)
+            except RedisError as e:
+                print(f"Could not renew FlareSolverr slot: {e}")
+
+    async def _release(self, token: str) -> None:
+        try:
+            await self.redis.zrem(self._keys()[0], token)
+        except RedisError as e:
+            print(f"Could not release FlareSolverr slot: {e}")
+
+    async def stats(self) -> dict:
+        """Slots in use and requests queued, across every worker."""
+        if self.redis is None:
+            return {"limit": self.limit}
+        slots, queue, _ = self._keys()
+        try:
+            in_use = await self.redis.zcount(slots, int(time.time() * 1000), "+inf")
+            queued = await self.redis.zcard(queue)
+        except RedisError as e:
+            print(f"Could not read FlareSolverr governor stats: {e}")
+            return {"limit": self.limit}
+        return {"limit": self.limit, "in_use": in_use, "queued": queued}
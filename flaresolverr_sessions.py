@@ -0,0 +1,210 @@
+import asyncio
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Mapping, Optional
+from urllib.parse import urlsplit
+
+from http_client import http_sessions
+from metrics import UPSTREAM_ERRORS, UPSTREAM_REQUEST_SECONDS, error_reason, observe
+from tracing import span
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Persistent FlareSolverr browser sessions, rotated after an age or use count
+FLARESOLVERR_SESSION_POOL_SIZE = int(os.getenv("FLARESOLVERR_SESSION_POOL_SIZE", "4"))
+FLARESOLVERR_SESSION_MAX_AGE = float(os.getenv("FLARESOLVERR_SESSION_MAX_AGE", "600"))
+FLARESOLVERR_SESSION_MAX_USES = int(os.getenv("FLARESOLVERR_SESSION_MAX_USES", "100"))
+
+# Upper bound on how long a captured cf_clearance is trusted, in seconds
+CF_CLEARANCE_TTL = float(os.getenv("CF_CLEARANCE_TTL", "1800"))
+
+# Markers of a Cloudflare challenge page instead of the real content. Not
+# "challenge-platform": Cloudflare injects a beacon script from that path into
+# ordinary pages too.
+CHALLENGE_STATUSES = (403, 503)
+CHALLENGE_MARKERS = ("<title>Just a moment...</title>", "cf_chl_opt")
+
+SendCommand = Callable[[dict], Awaitable[dict]]
+
+
+def is_challenge(status: int, headers: Mapping[str, str], page_content: str) -> bool:
+    """Whether Cloudflare answered with a challenge rather than the page."""
+    if headers.get("cf-mitigated", "").lower() == "challenge":
+        return True
+    return status in CHALLENGE_STATUSES and any(
+        marker in page_content for marker in CHALLENGE_MARKERS
+    )
+
+
+class PooledSession:
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.created_at = time.monotonic()
+        self.uses = 0
+        self.healthy = True
+
+    @property
+    def expired(self) -> bool:
+        return (
+            time.monotonic() - self.created_at > FLARESOLVERR_SESSION_MAX_AGE
+            or self.uses >= FLARESOLVERR_SESSION_MAX_USES
+        )
+
+
+class FlareSolverrSessionPool:
+    """
+    Pool of long-lived FlareSolverr browser sessions.
+
+    A session keeps its browser context and solved challenge between page
+    loads. Each session serves one request at a time, is destroyed and
+    replaced once it gets too old, too used or fails, and all are destroyed
+    on shutdown.
+    """
+
+    def __init__(self, send: SendCommand, size: int = FLARESOLVERR_SESSION_POOL_SIZE):
+        self.send = send
+        self.size = size
+        self._semaphore = asyncio.Semaphore(size)
+        self._idle: List[PooledSession] = []
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Optional[PooledSession]]:
+        """
+        Borrow a session. Yields None if one can't be created, in which case
+        the caller should fall back to a stateless request.
+        """
+        async with self._semaphore:
+            pooled = self._idle.pop() if self._idle else None
+            if pooled is not None and pooled.expired:
+                await self._destroy(pooled)
+                pooled = None
+            if pooled is None:
+                pooled = await self._create()
+            if pooled is None:
+                yield None
+                return
+
+            try:
+                yield pooled
+            except BaseException:
+                pooled.healthy = False
+                raise
+            finally:
+                pooled.uses += 1
+                if pooled.healthy and not pooled.expired:
+                    self._idle.append(pooled)
+                else:
+                    await self._destroy(pooled)
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for pooled in idle:
+            await self._destroy(pooled)
+
+    async def _create(self) -> Optional[PooledSession]:
+        session_id = f"tracker-{uuid.uuid4().hex}"
+        try:
+            await self.send({"cmd": "sessions.create", "session": session_id})
+        except Exception as e:
+            print(f"Could not create FlareSolverr session: {e}")
+            return None
+        return PooledSession(session_id)
+
+    async def _destroy(self, pooled: PooledSession) -> None:
+        try:
+            await self.send({"cmd": "sessions.destroy", "session": pooled.id})
+        except Exception as e:
+            print(f"Could not destroy FlareSolverr session {pooled.id}: {e}")
+
+
+class Clearance:
+    def __init__(self, cookies: Dict[str, str], user_agent: str, expires_at: float):
+        self.cookies = cookies
+        self.user_agent = user_agent
+        self.expires_at = expires_at
+
+
+class ClearanceStore:
+    """
+    Cloudflare clearance captured from solved FlareSolverr challenges.
+
+    While a host's cf_clearance cookie is valid, pages on that host are
+    fetched with plain HTTP using the same cookies and user agent, which
+    takes well under a second instead of a full browser render.
+    """
+
+    def __init__(self, headers: Dict[str, str]):
+        self.headers = headers
+        self._clearances: Dict[str, Clearance] = {}
+
+    def capture(self, url: str, solution: dict) -> None:
+        """Remember the clearance from a FlareSolverr solution, if it has one."""
+        cookies = solution.get("cookies") or []
+        clearance_cookie = next(
+            (cookie for cookie in cookies if cookie.get("name") == "cf_clearance"),
+            None,
+        )
+        user_agent = solution.get("userAgent")
+        if clearance_cookie is None or not user_agent:
+            return
+
+        expires_at = time.time() + CF_CLEARANCE_TTL
+        if clearance_cookie.get("expires", -1) > 0:
+            expires_at = min(expires_at, clearance_cookie["expires"])
+        self._clearances[urlsplit(url).hostname] = Clearance(
+            cookies={cookie["name"]: cookie["value"] for cookie in cookies},
+            user_agent=user_agent,
+            expires_at=expires_at,
+        )
+
+    def invalidate(self, url: str) -> None:
+        self._clearances.pop(urlsplit(url).hostname, None)
+
+    async def fetch(self, url: str) -> Optional[str]:
+        """
+        Fetch a page directly with a captured clearance. Returns None if there
+        is no valid clearance or Cloudflare challenges the request again.
+        """
+        clearance = self._clearances.get(urlsplit(url).hostname)
+        if clearance is None:
+            return None
+        if clearance.expires_at <= time.time():
+            self.invalidate(url)
+            return None
+
+        session = http_sessions.get("tracker")
+        headers = {**self.headers, "User-Agent": clearance.user_agent}
+        try:
+            with span("tracker.direct_fetch", **{"url.full": url}) as current, observe(
+                UPSTREAM_REQUEST_SECONDS, upstream="tracker", target="direct"
+            ):
+                async with session.get(
+                    url, headers=headers, cookies=clearance.cookies
+                ) as response:
+                    page_content = await response.text()
+                    challenged = is_challenge(
+                        response.status, response.headers, page_content
+                    )
+                    current.set_attributes(
+                        {
+                            "http.response.status_code": response.status,
+                            "page.size": len(page_content),
+                        }
+                    )
+        except Exception as e:
+            UPSTREAM_ERRORS.labels("tracker", "direct", error_reason(e)).inc()
+            print(f"Direct fetch failed for {url}: {e}")
+            return None
+
+        if challenged:
+            UPSTREAM_ERRORS.labels("tracker", "direct", "challenged").inc()
+            print(f"Clearance for {url} was challenged, falling back to FlareSolverr.")
+            self.invalidate(url)
+            return None
+        if response.status != 200:
+            UPSTREAM_ERRORS.labels("tracker", "direct", str(response.status)).inc()
+            return None
+        return page_content
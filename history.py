@@ -0,0 +1,207 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from dotenv import load_dotenv
+
+from metrics import SNAPSHOTS_DROPPED
+from models.db import engine
+from models.history_model import StatsDelta
+from models.snapshots import (
+    SNAPSHOT_META_COLUMNS,
+    SNAPSHOT_MODELS,
+    SNAPSHOT_TABLES,
+    numeric_fields,
+    snapshot_row,
+)
+
+load_dotenv()
+
+# Keep a snapshot of every fetch for the history and delta endpoints
+SNAPSHOT_HISTORY = os.getenv("SNAPSHOT_HISTORY", "true").lower() == "true"
+
+# Snapshots waiting to be written; new ones are dropped while this is full
+SNAPSHOT_QUEUE_SIZE = int(os.getenv("SNAPSHOT_QUEUE_SIZE", "10000"))
+SNAPSHOT_BATCH_SIZE = int(os.getenv("SNAPSHOT_BATCH_SIZE", "500"))
+SNAPSHOT_FLUSH_INTERVAL = float(os.getenv("SNAPSHOT_FLUSH_INTERVAL", "5"))
+
+# Seconds between log lines about dropped snapshots; each drop is still counted
+SNAPSHOT_DROP_LOG_INTERVAL = float(os.getenv("SNAPSHOT_DROP_LOG_INTERVAL", "60"))
+
+Snapshot = Tuple[datetime, BaseModel]
+
+
+class SnapshotRecorder:
+    """
+    Appends fetched stats to the per-game snapshot tables in the background.
+
+    Snapshots are queued as they're fetched and written in batches by one
+    task, so recording never adds a database round trip to a request.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._dropped = 0
+        self._drop_logged_at = float("-inf")
+
+    def start(self) -> None:
+        if not SNAPSHOT_HISTORY or self._task is not None:
+            return
+        self._queue = asyncio.Queue(SNAPSHOT_QUEUE_SIZE)
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the writer and write whatever is still queued."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        pending = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        if pending:
+            await self._write(pending)
+
+    def record(self, game: str, identifier: str, season: str, stats: BaseModel) -> None:
+        """Queue a snapshot; stats other than a game's player stats are ignored."""
+        if self._queue is None or not isinstance(stats, SNAPSHOT_MODELS.get(game, ())):
+            return
+        try:
+            self._queue.put_nowait((game, snapshot_row(identifier, stats)))
+        except asyncio.QueueFull:
+            self._drop(game)
+
+    def _drop(self, game: str) -> None:
+        """Count a dropped snapshot, logging at most once per interval."""
+        SNAPSHOTS_DROPPED.labels(game=game).inc()
+        self._dropped += 1
+        now = time.monotonic()
+        if now - self._drop_logged_at >= SNAPSHOT_DROP_LOG_INTERVAL:
+            print(f"Snapshot queue full, dropped {self._dropped} snapshots.")
+            self._dropped = 0
+            self._drop_logged_at = now
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            loop = asyncio.get_running_loop()
+            flush_at = loop.time() + SNAPSHOT_FLUSH_INTERVAL
+            while len(batch) < SNAPSHOT_BATCH_SIZE:
+                timeout = flush_at - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._write(batch)
+
+    async def _write(self, batch: List[Tuple[str, dict]]) -> None:
+        rows_by_game: Dict[str, List[dict]] = {}
+        for game, row in batch:
+            rows_by_game.setdefault(game, []).append(row)
+        try:
+            async with engine.begin() as conn:
+                for game, rows in rows_by_game.items():
+                    await conn.execute(SNAPSHOT_TABLES[game].insert(), rows)
+        except SQLAlchemyError as e:
+            print(f"Could not write {len(batch)} snapshots: {e}")
+
+
+def row_to_snapshot(game: str, row) -> Snapshot:
+    mapping = row._mapping
+    stats = SNAPSHOT_MODELS[game].model_validate(
+        {
+            name: value
+            for name, value in mapping.items()
+            if name not in SNAPSHOT_META_COLUMNS
+        }
+    )
+    return mapping["fetched_at"], stats
+
+
+async def fetch_history(
+    game: str,
+    identifier: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 100,
+    season: Optional[str] = None,
+) -> List[Snapshot]:
+    """A player's snapshots between `since` and `until`, oldest first."""
+    table = SNAPSHOT_TABLES[game]
+    query = select(table).where(table.c.identifier == identifier.lower())
+    if since is not None:
+        query = query.where(table.c.fetched_at >= since)
+    if until is not None:
+        query = query.where(table.c.fetched_at <= until)
+    if season is not None:
+        query = query.where(table.c.season == season)
+    query = query.order_by(table.c.fetched_at).limit(limit)
+
+    async with engine.connect() as conn:
+        result = await conn.execute(query)
+        return [row_to_snapshot(game, row) for row in result]
+
+
+async def fetch_delta(
+    game: str,
+    identifier: str,
+    since: Optional[datetime] = None,
+    season: Optional[str] = None,
+) -> Optional[StatsDelta]:
+    """
+    Compare a player's latest snapshot with the one they had at `since` (the
+    last one taken at or before it, else the first one after it). Returns how
+    much each numeric stat changed, or None without snapshots to compare.
+    """
+    table = SNAPSHOT_TABLES[game]
+    player = table.c.identifier == identifier.lower()
+    if season is not None:
+        player = player & (table.c.season == season)
+
+    latest_query = select(table).where(player).order_by(table.c.fetched_at.desc())
+    if since is None:
+        baseline_query = select(table).where(player).order_by(table.c.fetched_at)
+    else:
+        baseline_query = (
+            select(table)
+            .where(player & (table.c.fetched_at <= since))
+            .order_by(table.c.fetched_at.desc())
+        )
+
+    async with engine.connect() as conn:
+        latest = (await conn.execute(latest_query.limit(1))).first()
+        baseline = (await conn.execute(baseline_query.limit(1))).first()
+        if baseline is None and since is not None:
+            baseline = (
+                await conn.execute(
+                    select(table)
+                    .where(player & (table.c.fetched_at > since))
+                    .order_by(table.c.fetched_at)
+                    .limit(1)
+                )
+            ).first()
+    if latest is None or baseline is None:
+        return None
+
+    baseline, latest = baseline._mapping, latest._mapping
+    return StatsDelta(
+        from_fetched_at=baseline["fetched_at"],
+        to_fetched_at=latest["fetched_at"],
+        changes={
+            field: latest[field] - baseline[field]
+            for field in numeric_fields(game)
+            if latest[field] is not None and baseline[field] is not None
+        },
+    )
+
+
+snapshot_recorder = SnapshotRecorder()
@@ -0,0 +1,69 @@
+import os
+from typing import Dict
+
+import aiohttp
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Connection pool settings shared by every upstream session
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+
+# Total request timeouts per upstream, in seconds. FlareSolverr is given room
+# for its own 60 s maxTimeout on top of the round trip, "tracker" is for
+# direct page fetches with a captured Cloudflare clearance.
+UPSTREAM_TIMEOUTS = {
+    "flaresolverr": float(os.getenv("FLARESOLVERR_HTTP_TIMEOUT", "75")),
+    "steam": float(os.getenv("STEAM_HTTP_TIMEOUT", "10")),
+    "tracker": float(os.getenv("TRACKER_HTTP_TIMEOUT", "15")),
+}
+
+
+class SessionRegistry:
+    """
+    App-scoped registry of pooled aiohttp sessions, one per upstream.
+
+    Sessions keep their connections alive between requests, so scrapers no
+    longer pay for a new connector, DNS lookup and socket on every call.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+
+    def start(self) -> None:
+        """Open a session for every known upstream."""
+        for name in UPSTREAM_TIMEOUTS:
+            self.get(name)
+
+    def get(self, name: str) -> aiohttp.ClientSession:
+        """Return the session for an upstream, creating it on first use."""
+        session = self._sessions.get(name)
+        if session is None or session.closed:
+            session = self._create(name)
+            self._sessions[name] = session
+        return session
+
+    async def close(self) -> None:
+        for session in self._sessions.values():
+            await session.close()
+        self._sessions.clear()
+
+    @staticmethod
+    def _create(name: str) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=UPSTREAM_TIMEOUTS.get(name), connect=HTTP_CONNECT_TIMEOUT
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+http_sessions = SessionRegistry()
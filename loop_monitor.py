@@ -0,0 +1,55 @@
+import asyncio
+import os
+from collections import deque
+from typing import Deque, Optional
+from dotenv import load_dotenv
+
+from metrics import EVENT_LOOP_LAG_SECONDS
+
+load_dotenv()
+
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))
+
+# Number of samples the peak lag is taken over
+LOOP_LAG_WINDOW = int(os.getenv("LOOP_LAG_WINDOW", "120"))
+
+
+class EventLoopLagMonitor:
+    """
+    Measure how late the event loop wakes up from a fixed sleep.
+
+    Anything that blocks the loop (CPU-bound parsing, sync DB calls) shows up
+    as lag here, and every other in-flight request is delayed by that much.
+    """
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL):
+        self.interval = interval
+        self.lag = 0.0
+        self._samples: Deque[float] = deque(maxlen=LOOP_LAG_WINDOW)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def peak_lag(self) -> float:
+        return max(self._samples, default=0.0)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, loop.time() - started - self.interval)
+            self._samples.append(self.lag)
+            EVENT_LOOP_LAG_SECONDS.set(self.lag)
+
+
+loop_lag_monitor = EventLoopLagMonitor()
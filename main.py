@@ -1,55 +1,139 @@
 import os
 import random
 import string
-from fastapi import FastAPI, HTTPException, Depends, Header
+import time
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Type
+from fastapi import (
+    BackgroundTasks,
+    FastAPI,
+    HTTPException,
+    Depends,
+    Header,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from fastapi.security import APIKeyHeader
-from fastapi_limiter import FastAPILimiter
-from fastapi_limiter.depends import RateLimiter
 import redis.asyncio as redis
 from contextlib import asynccontextmanager
-from sqlalchemy.orm import Session
-from databases import Database
+from sqlalchemy.ext.asyncio import AsyncSession
+from functools import partial
+from pydantic import BaseModel
 
-from scrapers.valorant_scraper import fetch_valorant_player_stats
-from scrapers.cs2_scraper import fetch_cs2_player_stats
-from models.valorant_model import ValorantPlayerStats
-from models.cs2_model import CS2PlayerStats
+from scrapers.valorant_scraper import (
+    fetch_valorant_player_stats,
+    fetch_valorant_player_profile,
+)
+from scrapers.cs2_scraper import fetch_cs2_player_stats, fetch_cs2_players_stats
+from models.valorant_model import (
+    ValorantPlayerStats,
+    ValorantPlayerProfile,
+    ValorantBatchRequest,
+    ValorantBatchResult,
+    ValorantSnapshot,
+)
+from models.cs2_model import (
+    CS2PlayerStats,
+    CS2BatchRequest,
+    CS2BatchResult,
+    CS2Snapshot,
+)
 from scrapers.tft_scraper import fetch_tft_player_stats
-from models.tft_model import TFTPlayerStats
+from models.tft_model import (
+    TFTPlayerStats,
+    TFTBatchRequest,
+    TFTBatchResult,
+    TFTSnapshot,
+)
+from models.history_model import StatsDelta
+from models.watchlist_model import WatchlistRequest, WatchlistEntry
 
-from models.db import create_db, add_api_key, SessionLocal, APIKey
+from models.db import create_db, close_db, add_api_key, count_api_keys, SessionLocal
+from cache import player_stats_cache, CacheEntry, CACHE_HIT, CACHE_MISS
+from compression import (
+    DYNAMIC_COMPRESSORS,
+    StreamCompressor,
+    compress_response,
+    negotiate_encoding,
+)
+from api_key_cache import api_key_cache, CachedAPIKey
+from rate_limit import rate_limiter, RATE_LIMIT_TIERS, EXPENSIVE, CHEAP
+from http_client import http_sessions
+from flaresolverr_client import flaresolverr_balancer, flaresolverr_governor
+from flaresolverr_governor import FlareSolverrOverloaded
+from worker_pool import flaresolverr_pool, stream_as_completed
+from loop_monitor import loop_lag_monitor
+from prewarm import prewarm_scheduler
+from history import snapshot_recorder, fetch_history, fetch_delta
+from scrapers.parse_executor import start_parser_executor, shutdown_parser_executor
+from metrics import (
+    HTTP_REQUEST_SECONDS,
+    mark_worker_dead,
+    metrics_authorized,
+    render_metrics,
+)
+from tracing import (
+    TRACING_ENABLED,
+    extract_context,
+    span,
+    start_tracing,
+    stop_tracing,
+)
 
 from dotenv import load_dotenv
 
 
 load_dotenv()
 
-DATABASE_URL = os.getenv("DATABASE_URL", "Please set DATABASE_URL environment variable")
-database = Database(DATABASE_URL)
-
 API_KEY_HEADER = "X-API-Key"
 api_key_header = APIKeyHeader(name=API_KEY_HEADER)
 
+VALORANT_SEASON_LABELS = {"current": "Current Act", "all": "All Acts"}
 
-def get_session_local():
-    yield SessionLocal()
+CS2_BATCH_MAX_IDS = int(os.getenv("CS2_BATCH_MAX_IDS", "1000"))
+FLARESOLVERR_BATCH_MAX_PLAYERS = int(os.getenv("FLARESOLVERR_BATCH_MAX_PLAYERS", "50"))
+OVERLOADED_DETAIL = "Too many lookups in progress, please retry later."
+HISTORY_MAX_LIMIT = int(os.getenv("HISTORY_MAX_LIMIT", "1000"))
 
 
-# Fetch API keys from the database
-def get_api_keys_from_db(db: Session):
-    keys = db.query(APIKey.key).all()
-    return {key[0] for key in keys}
+async def get_session_local():
+    async with SessionLocal() as db:
+        yield db
 
 
-# Dependency to validate the API key using SQLAlchemy ORM
-async def get_api_key(
-    api_key: str = Depends(api_key_header), db: Session = Depends(get_session_local)
-):
-    db_api_key = db.query(APIKey).filter(APIKey.key == api_key).first()
+# Dependency to validate the API key against the in-process key cache
+async def get_api_key_entry(api_key: str = Depends(api_key_header)) -> CachedAPIKey:
+    with span("get_api_key") as current:
+        db_api_key = await api_key_cache.get(api_key)
+        current.set_attribute("api_key.valid", db_api_key is not None)
 
     if not db_api_key:
         raise HTTPException(status_code=403, detail="Invalid API Key")
 
+    return db_api_key
+
+
+async def get_api_key(
+    api_key: str = Depends(api_key_header),
+    db_api_key: CachedAPIKey = Depends(get_api_key_entry),
+):
+    return api_key
+
+
+# Dependency that also requires the API key to have 'admin' permissions
+async def get_admin_api_key(
+    api_key: str = Depends(get_api_key),
+    db_api_key: CachedAPIKey = Depends(get_api_key_entry),
+):
+    if db_api_key.permission != "admin":
+        raise HTTPException(
+            status_code=403,
+            detail="You must have 'admin' permissions to use this endpoint.",
+        )
+
     return api_key
 
 
@@ -60,15 +144,15 @@ def generate_random_api_key() -> str:
 
 
 # Check if the app is running for the first time (no API keys)
-def check_first_run(db: Session) -> bool:
-    count = db.query(APIKey).count()
+async def check_first_run(db: AsyncSession) -> bool:
+    count = await count_api_keys(db)
     return count == 0
 
 
-async def add_admin_key(admin_key: str, db: Session):
+async def add_admin_key(admin_key: str, db: AsyncSession):
     """Adds an admin API key to the database and prints it."""
     # Create an admin key with the permission 'admin'
-    add_api_key(db, admin_key, user="admin", permission="admin")
+    await add_api_key(db, admin_key, user="admin", permission="admin", tier="admin")
     print(f"Admin API key generated: {admin_key}")
 
 
@@ -81,95 +165,729 @@ async def lifespan(app: FastAPI):
 
     redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
     redis_client = redis.from_url(redis_url, encoding="utf-8", decode_responses=True)
+    # Cache entries hold compressed bodies, so they're read as raw bytes
+    cache_redis_client = redis.from_url(redis_url)
 
-    await FastAPILimiter.init(redis_client)
-
-    await database.connect()
+    start_tracing()
+    rate_limiter.init(redis_client)
+    flaresolverr_governor.init(redis_client)
+    player_stats_cache.init(cache_redis_client)
+    api_key_cache.start(redis_client)
+    http_sessions.start()
+    start_parser_executor()
+    loop_lag_monitor.start()
+    flaresolverr_balancer.start()
+    prewarm_scheduler.start(redis_client)
 
-    create_db()
+    await create_db()
+    snapshot_recorder.start()
 
-    db = SessionLocal()
-    if check_first_run(db):
-        admin_key = generate_random_api_key()
-        await add_admin_key(admin_key, db)
-    db.close()
+    async with SessionLocal() as db:
+        if await check_first_run(db):
+            admin_key = generate_random_api_key()
+            await add_admin_key(admin_key, db)
 
     yield
 
+    await prewarm_scheduler.close()
+    await player_stats_cache.close()
+    await api_key_cache.close()
+    rate_limiter.close()
+    flaresolverr_governor.close()
+    await flaresolverr_balancer.close()
+    await http_sessions.close()
+    shutdown_parser_executor()
+    await loop_lag_monitor.stop()
     await redis_client.close()
-    await database.disconnect()
+    await cache_redis_client.close()
+    await snapshot_recorder.close()
+    await close_db()
+    mark_worker_dead()
+    stop_tracing()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+
+@app.middleware("http")
+async def record_request_time(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template, not path, so player names don't become labels
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.labels(
+        request.method,
+        route.path if route is not None else "unmatched",
+        str(response.status_code),
+    ).observe(time.perf_counter() - started)
+    return response
+
+
+async def trace_request(request: Request, call_next):
+    """
+    Run each request in a server span, continuing the caller's trace if it
+    sent a traceparent header. Every other span of the request nests in it.
+    """
+    with span(
+        request.method,
+        context=extract_context(request.headers),
+        **{"http.request.method": request.method, "url.path": request.scope["path"]},
+    ) as current:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        if route is not None:
+            current.update_name(f"{request.method} {route.path}")
+            current.set_attribute("http.route", route.path)
+        current.set_attribute("http.response.status_code", response.status_code)
+        cache_status = response.headers.get("X-Cache")
+        if cache_status is not None:
+            current.set_attribute("cache.status", cache_status)
+        return response
+
+
+if TRACING_ENABLED:
+    app.middleware("http")(trace_request)
+
+
+@app.exception_handler(FlareSolverrOverloaded)
+async def flaresolverr_overloaded_handler(
+    request: Request, exc: FlareSolverrOverloaded
+):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": OVERLOADED_DETAIL},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+async def fetch_valorant_season_stats(
+    username: str, season: str
+) -> Optional[ValorantPlayerStats]:
+    """Fetch Valorant stats and label them with the requested season."""
+    player_stats = await fetch_valorant_player_stats(username=username, season=season)
+    if player_stats is not None:
+        player_stats.season = VALORANT_SEASON_LABELS[season]
+    return player_stats
+
+
+async def fetch_valorant_profile_stats(
+    username: str,
+) -> Optional[ValorantPlayerProfile]:
+    """
+    Fetch both Valorant season views, label them and keep the single-season
+    cache entries warm.
+    """
+    profile = await fetch_valorant_player_profile(username=username)
+    if profile is None:
+        return None
+
+    for season, label in VALORANT_SEASON_LABELS.items():
+        player_stats = getattr(profile, season)
+        if player_stats is not None:
+            player_stats.season = label
+            await player_stats_cache.store_many(
+                "valorant", season, {username: player_stats}
+            )
+    return profile
+
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[List[str]]:
+    """Field names from a `fields` query parameter, checked against the model."""
+    if not fields:
+        return None
+    selected = list(
+        dict.fromkeys(field.strip() for field in fields.split(",") if field.strip())
+    )
+    unknown = [field for field in selected if field not in model.model_fields]
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown fields: {', '.join(unknown)}."
+        )
+    return selected
 
 
-app = FastAPI(lifespan=lifespan)
+def stats_response(
+    request: Request,
+    response: Response,
+    entry: CacheEntry,
+    fields: Optional[List[str]] = None,
+) -> Response:
+    """
+    Send the cached JSON body as it is, or only the selected fields, with its
+    ETag and Last-Modified, compressed in the encoding the client prefers.
+    Answers an empty 304 when the client's copy is current. The stats model
+    is never built or validated again.
+    """
+    if fields is not None:
+        entry = entry.select(fields)
+    encoding = entry.negotiate(request.headers.get("accept-encoding"))
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Last-Modified"] = entry.last_modified
+    # Compressed bytes differ from the stats the ETag hashes, so it's only weak
+    response.headers["ETag"] = entry.etag if encoding is None else f"W/{entry.etag}"
+    if entry.not_modified(
+        request.headers.get("if-none-match"), request.headers.get("if-modified-since")
+    ):
+        return Response(status_code=304, headers=dict(response.headers))
+
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    return Response(
+        content=entry.encoded(encoding),
+        media_type="application/json",
+        headers=dict(response.headers),
+    )
+
+
+def json_response(request: Request, content) -> Response:
+    """
+    Serialize a response built for this request, compressed in the encoding
+    the client prefers if it's over the size threshold.
+    """
+    body = ORJSONResponse(jsonable_encoder(content)).body
+    body, encoding = compress_response(body, request.headers.get("accept-encoding"))
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Keep a snapshot of every fetch for the history and delta endpoints
+player_stats_cache.add_listener(snapshot_recorder.record)
+
+# How watched players are refreshed in the background, per game
+prewarm_scheduler.register("valorant", "profile", fetch_valorant_profile_stats)
+prewarm_scheduler.register("cs2", "all", fetch_cs2_player_stats)
+prewarm_scheduler.register("tft", "current", fetch_tft_player_stats)
+
+
+@app.get(
+    "/valorant/player/{username}",
+    response_model=ValorantPlayerProfile,
+)
+async def get_valorant_player_profile(
+    username: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields to return."
+    ),
+    api_key_entry: CachedAPIKey = Depends(get_api_key_entry),
+):
+    """
+    Fetch current act and all seasons stats together, from one page load where
+    the page has both.
+    """
+    selected = parse_fields(fields, ValorantPlayerProfile)
+    prewarm_scheduler.record_hit("valorant", username)
+    entry, cache_status = await player_stats_cache.get_entry(
+        "valorant",
+        username,
+        "profile",
+        partial(fetch_valorant_profile_stats, username),
+        admit=rate_limiter.for_lookup(api_key_entry, EXPENSIVE),
+    )
+    player_stats_cache.apply_headers(response, cache_status)
+    if entry is None:
+        raise HTTPException(
+            status_code=404, detail=f"Player stats not found for username: {username}."
+        )
+    return stats_response(request, response, entry, selected)
 
 
 @app.get(
     "/valorant/player/{username}/current",
     response_model=ValorantPlayerStats,
-    dependencies=[Depends(RateLimiter(times=10, seconds=60))],
 )
 async def get_valorant_current_act_stats(
-    username: str, api_key: str = Depends(get_api_key)
+    username: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields to return."
+    ),
+    api_key_entry: CachedAPIKey = Depends(get_api_key_entry),
 ):
-    player_stats = await fetch_valorant_player_stats(
-        username=username, season="current"
+    selected = parse_fields(fields, ValorantPlayerStats)
+    prewarm_scheduler.record_hit("valorant", username)
+    entry, cache_status = await player_stats_cache.get_entry(
+        "valorant",
+        username,
+        "current",
+        partial(fetch_valorant_season_stats, username, "current"),
+        admit=rate_limiter.for_lookup(api_key_entry, EXPENSIVE),
     )
-    if player_stats is None:
+    player_stats_cache.apply_headers(response, cache_status)
+    if entry is None:
         raise HTTPException(
             status_code=404, detail=f"Player stats not found for username: {username}."
         )
-    player_stats.season = "Current Act"
-    return player_stats
+    return stats_response(request, response, entry, selected)
 
 
 @app.get(
     "/valorant/player/{username}/all",
     response_model=ValorantPlayerStats,
-    dependencies=[Depends(RateLimiter(times=10, seconds=60))],
 )
 async def get_valorant_all_seasons_stats(
-    username: str, api_key: str = Depends(get_api_key)
+    username: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields to return."
+    ),
+    api_key_entry: CachedAPIKey = Depends(get_api_key_entry),
 ):
-    player_stats = await fetch_valorant_player_stats(username=username, season="all")
-    if player_stats is None:
+    selected = parse_fields(fields, ValorantPlayerStats)
+    prewarm_scheduler.record_hit("valorant", username)
+    entry, cache_status = await player_stats_cache.get_entry(
+        "valorant",
+        username,
+        "all",
+        partial(fetch_valorant_season_stats, username, "all"),
+        admit=rate_limiter.for_lookup(api_key_entry, EXPENSIVE),
+    )
+    player_stats_cache.apply_headers(response, cache_status)
+    if entry is None:
         raise HTTPException(
             status_code=404, detail=f"Player stats not found for username: {username}."
         )
-    player_stats.season = "All Acts"
-    return player_stats
+    return stats_response(request, response, entry, selected)
+
+
+def check_batch_usernames(usernames: List[str]) -> None:
+    if not usernames:
+        raise HTTPException(status_code=400, detail="No usernames provided.")
+    if len(usernames) > FLARESOLVERR_BATCH_MAX_PLAYERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch can contain at most {FLARESOLVERR_BATCH_MAX_PLAYERS} usernames.",
+        )
+
+
+def stream_batch_results(
+    request: Request, results: AsyncIterator[BaseModel]
+) -> StreamingResponse:
+    """
+    Stream batch results as each player finishes, as Server-Sent Events if the
+    client accepts them and as newline-delimited JSON otherwise, compressed in
+    the encoding the client prefers.
+    """
+    if "text/event-stream" in request.headers.get("accept", ""):
+        media_type = "text/event-stream"
+
+        async def events() -> AsyncIterator[str]:
+            async for result in results:
+                yield f"event: player\ndata: {result.model_dump_json()}\n\n"
+            yield "event: done\ndata: {}\n\n"
+
+    else:
+        media_type = "application/x-ndjson"
+
+        async def events() -> AsyncIterator[str]:
+            async for result in results:
+                yield result.model_dump_json() + "\n"
+
+    headers = {"Vary": "Accept-Encoding"}
+    # A stream's size isn't known up front, so it's compressed whenever the
+    # client accepts it rather than above COMPRESSION_MIN_SIZE
+    encoding = negotiate_encoding(
+        request.headers.get("accept-encoding"), DYNAMIC_COMPRESSORS
+    )
+    if encoding is None:
+        return StreamingResponse(events(), media_type=media_type, headers=headers)
+
+    async def compressed() -> AsyncIterator[bytes]:
+        compressor = StreamCompressor(encoding)
+        async for event in events():
+            yield compressor.compress(event.encode())
+        yield compressor.finish()
+
+    headers["Content-Encoding"] = encoding
+    return StreamingResponse(compressed(), media_type=media_type, headers=headers)
+
+
+@app.post(
+    "/valorant/players",
+    response_model=List[ValorantBatchResult],
+)
+async def get_valorant_players_stats(
+    batch: ValorantBatchRequest,
+    request: Request,
+    api_key_entry: CachedAPIKey = Depends(get_api_key_entry),
+):
+    """
+    Fetch Valorant stats for a list of usernames and seasons ("current" and/or
+    "all"), streamed back as each player finishes.
+    """
+    check_batch_usernames(batch.usernames)
+    for season in batch.seasons:
+        if season not in VALORANT_SEASON_LABELS:
+            raise HTTPException(status_code=400, detail=f"Invalid season: {season}.")
+    usernames = list(dict.fromkeys(batch.usernames))
+    seasons = list(dict.fromkeys(batch.seasons))
+    # Only players that aren't cached are charged as expensive lookups
+    cache_statuses = []
+    for season in seasons:
+        cached = await player_stats_cache.get_many("valorant", season, usernames)
+        cache_statuses += [cache_status for _, cache_status in cached.values()]
+    await rate_limiter.admit_lookups(api_key_entry, EXPENSIVE, cache_statuses)
+
+    async def fetch_one(username: str, season: str) -> ValorantBatchResult:
+        try:
+            player_stats, _ = await player_stats_cache.get_or_fetch(
+                "valorant",
+                username,
+                season,
+                ValorantPlayerStats,
+                partial(
+                    flaresolverr_pool.run,
+                    partial(fetch_valorant_season_stats, username, season),
+                ),
+            )
+        except FlareSolverrOverloaded:
+            return ValorantBatchResult(
+                username=username, season=season, error=OVERLOADED_DETAIL
+            )
+        except Exception as e:
+            print(
+                f"An error occurred while fetching {season} stats for {username}: {e}"
+            )
+            return ValorantBatchResult(username=username, season=season, error=str(e))
+        if player_stats is None:
+            return ValorantBatchResult(
+                username=username, season=season, error="Player stats not found."
+            )
+        return ValorantBatchResult(username=username, season=season, stats=player_stats)
+
+    jobs = [
+        partial(fetch_one, username, season)
+        for username in usernames
+        for season in seasons
+    ]
+    return stream_batch_results(request, stream_as_completed(jobs))
 
 
 @app.get(
     "/cs2/player/{steam_id}",
     response_model=CS2PlayerStats,
-    dependencies=[Depends(RateLimiter(times=10, seconds=60))],
 )
-async def get_cs2_stats(steam_id: str, api_key: str = Depends(get_api_key)):
-    player_stats = await fetch_cs2_player_stats(steam_id=steam_id)
-    if player_stats is None:
+async def get_cs2_stats(
+    steam_id: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields to return."
+    ),
+    api_key_entry: CachedAPIKey = Depends(get_api_key_entry),
+):
+    selected = parse_fields(fields, CS2PlayerStats)
+    prewarm_scheduler.record_hit("cs2", steam_id)
+    entry, cache_status = await player_stats_cache.get_entry(
+        "cs2",
+        steam_id,
+        "all",
+        partial(fetch_cs2_player_stats, steam_id=steam_id),
+        admit=rate_limiter.for_lookup(api_key_entry, CHEAP),
+    )
+    player_stats_cache.apply_headers(response, cache_status)
+    if entry is None:
         raise HTTPException(
             status_code=404, detail=f"Player stats not found for steam_id: {steam_id}."
         )
-    return player_stats
+    return stats_response(request, response, entry, selected)
+
+
+@app.post(
+    "/cs2/players",
+    response_model=List[CS2BatchResult],
+)
+async def get_cs2_players_stats(
+    batch: CS2BatchRequest,
+    request: Request,
+    api_key_entry: CachedAPIKey = Depends(get_api_key_entry),
+):
+    """
+    Fetch CS2 stats for a list of Steam IDs. Players that can't be fetched get
+    an error entry instead of failing the whole batch.
+    """
+    if not batch.steam_ids:
+        raise HTTPException(status_code=400, detail="No Steam IDs provided.")
+    if len(batch.steam_ids) > CS2_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch can contain at most {CS2_BATCH_MAX_IDS} Steam IDs.",
+        )
+    # Players with fresh cached stats are served from the cache and charged as
+    # cached lookups; the rest are fetched from Steam in one batch
+    steam_ids = list(dict.fromkeys(batch.steam_ids))
+    cached = {}
+    entries = await player_stats_cache.get_many("cs2", "all", steam_ids)
+    for steam_id, (entry, cache_status) in entries.items():
+        if cache_status == CACHE_HIT:
+            cached[steam_id] = CS2BatchResult(
+                steam_id=steam_id, stats=entry.stats(CS2PlayerStats)
+            )
+    await rate_limiter.admit_lookups(
+        api_key_entry,
+        CHEAP,
+        [CACHE_HIT if steam_id in cached else CACHE_MISS for steam_id in steam_ids],
+    )
+
+    results_by_id = dict(cached)
+    missing = [steam_id for steam_id in steam_ids if steam_id not in cached]
+    if missing:
+        results = await fetch_cs2_players_stats(missing)
+        results_by_id.update((result.steam_id, result) for result in results)
+
+        # Keep the cache warm for single-player lookups
+        await player_stats_cache.store_many(
+            "cs2",
+            "all",
+            {result.steam_id: result.stats for result in results if result.stats},
+        )
+    return json_response(
+        request, [results_by_id[steam_id] for steam_id in batch.steam_ids]
+    )
 
 
 @app.get(
     "/tft/player/{username}",
     response_model=TFTPlayerStats,
-    dependencies=[Depends(RateLimiter(times=10, seconds=60))],
 )
-async def get_tft_player_stats(username: str, api_key: str = Depends(get_api_key)):
-    player_stats = await fetch_tft_player_stats(username=username)
-    if player_stats is None:
+async def get_tft_player_stats(
+    username: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields to return."
+    ),
+    api_key_entry: CachedAPIKey = Depends(get_api_key_entry),
+):
+    selected = parse_fields(fields, TFTPlayerStats)
+    prewarm_scheduler.record_hit("tft", username)
+    entry, cache_status = await player_stats_cache.get_entry(
+        "tft",
+        username,
+        "current",
+        partial(fetch_tft_player_stats, username=username),
+        admit=rate_limiter.for_lookup(api_key_entry, EXPENSIVE),
+    )
+    player_stats_cache.apply_headers(response, cache_status)
+    if entry is None:
         raise HTTPException(
             status_code=404, detail=f"Player stats not found for username: {username}."
         )
-    return player_stats
+    return stats_response(request, response, entry, selected)
+
+
+@app.post(
+    "/tft/players",
+    response_model=List[TFTBatchResult],
+)
+async def get_tft_players_stats(
+    batch: TFTBatchRequest,
+    request: Request,
+    api_key_entry: CachedAPIKey = Depends(get_api_key_entry),
+):
+    """Fetch TFT stats for a list of usernames, streamed back as each finishes."""
+    check_batch_usernames(batch.usernames)
+    usernames = list(dict.fromkeys(batch.usernames))
+    # Only players that aren't cached are charged as expensive lookups
+    cached = await player_stats_cache.get_many("tft", "current", usernames)
+    await rate_limiter.admit_lookups(
+        api_key_entry, EXPENSIVE, [cache_status for _, cache_status in cached.values()]
+    )
+
+    async def fetch_one(username: str) -> TFTBatchResult:
+        try:
+            player_stats, _ = await player_stats_cache.get_or_fetch(
+                "tft",
+                username,
+                "current",
+                TFTPlayerStats,
+                partial(
+                    flaresolverr_pool.run,
+                    partial(fetch_tft_player_stats, username=username),
+                ),
+            )
+        except FlareSolverrOverloaded:
+            return TFTBatchResult(username=username, error=OVERLOADED_DETAIL)
+        except Exception as e:
+            print(f"An error occurred while fetching stats for {username}: {e}")
+            return TFTBatchResult(username=username, error=str(e))
+        if player_stats is None:
+            return TFTBatchResult(username=username, error="Player stats not found.")
+        return TFTBatchResult(username=username, stats=player_stats)
+
+    jobs = [partial(fetch_one, username) for username in usernames]
+    return stream_batch_results(request, stream_as_completed(jobs))
+
+
+def check_valorant_season(season: str) -> None:
+    if season not in VALORANT_SEASON_LABELS:
+        raise HTTPException(status_code=400, detail=f"Invalid season: {season}.")
+
+
+@app.get(
+    "/valorant/player/{username}/history",
+    response_model=List[ValorantSnapshot],
+)
+async def get_valorant_history(
+    username: str,
+    request: Request,
+    season: str = "current",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=HISTORY_MAX_LIMIT),
+    api_key_entry: CachedAPIKey = Depends(get_api_key_entry),
+):
+    """
+    Stored snapshots of a player's stats for a season ("current" or "all"),
+    oldest first. Answered from stored data without fetching.
+    """
+    check_valorant_season(season)
+    await rate_limiter.admit(api_key_entry, CHEAP)
+    snapshots = await fetch_history(
+        "valorant", username, since, until, limit, VALORANT_SEASON_LABELS[season]
+    )
+    return json_response(
+        request,
+        [
+            ValorantSnapshot(fetched_at=fetched_at, stats=stats)
+            for fetched_at, stats in snapshots
+        ],
+    )
+
+
+@app.get(
+    "/valorant/player/{username}/delta",
+    response_model=StatsDelta,
+)
+async def get_valorant_delta(
+    username: str,
+    request: Request,
+    season: str = "current",
+    since: Optional[datetime] = None,
+    api_key_entry: CachedAPIKey = Depends(get_api_key_entry),
+):
+    """How much a player's stats changed since `since`, from stored snapshots."""
+    check_valorant_season(season)
+    await rate_limiter.admit(api_key_entry, CHEAP)
+    delta = await fetch_delta(
+        "valorant", username, since, VALORANT_SEASON_LABELS[season]
+    )
+    if delta is None:
+        raise HTTPException(
+            status_code=404, detail=f"No stored stats found for username: {username}."
+        )
+    return json_response(request, delta)
+
+
+@app.get(
+    "/cs2/player/{steam_id}/history",
+    response_model=List[CS2Snapshot],
+)
+async def get_cs2_history(
+    steam_id: str,
+    request: Request,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=HISTORY_MAX_LIMIT),
+    api_key_entry: CachedAPIKey = Depends(get_api_key_entry),
+):
+    """Stored snapshots of a player's stats, oldest first."""
+    await rate_limiter.admit(api_key_entry, CHEAP)
+    snapshots = await fetch_history("cs2", steam_id, since, until, limit)
+    return json_response(
+        request,
+        [
+            CS2Snapshot(fetched_at=fetched_at, stats=stats)
+            for fetched_at, stats in snapshots
+        ],
+    )
+
+
+@app.get(
+    "/cs2/player/{steam_id}/delta",
+    response_model=StatsDelta,
+)
+async def get_cs2_delta(
+    steam_id: str,
+    request: Request,
+    since: Optional[datetime] = None,
+    api_key_entry: CachedAPIKey = Depends(get_api_key_entry),
+):
+    """How much a player's stats changed since `since`, from stored snapshots."""
+    await rate_limiter.admit(api_key_entry, CHEAP)
+    delta = await fetch_delta("cs2", steam_id, since)
+    if delta is None:
+        raise HTTPException(
+            status_code=404, detail=f"No stored stats found for steam_id: {steam_id}."
+        )
+    return json_response(request, delta)
+
+
+@app.get(
+    "/tft/player/{username}/history",
+    response_model=List[TFTSnapshot],
+)
+async def get_tft_history(
+    username: str,
+    request: Request,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=HISTORY_MAX_LIMIT),
+    api_key_entry: CachedAPIKey = Depends(get_api_key_entry),
+):
+    """Stored snapshots of a player's stats, oldest first."""
+    await rate_limiter.admit(api_key_entry, CHEAP)
+    snapshots = await fetch_history("tft", username, since, until, limit)
+    return json_response(
+        request,
+        [
+            TFTSnapshot(fetched_at=fetched_at, stats=stats)
+            for fetched_at, stats in snapshots
+        ],
+    )
+
+
+@app.get(
+    "/tft/player/{username}/delta",
+    response_model=StatsDelta,
+)
+async def get_tft_delta(
+    username: str,
+    request: Request,
+    since: Optional[datetime] = None,
+    api_key_entry: CachedAPIKey = Depends(get_api_key_entry),
+):
+    """How much a player's stats changed since `since`, from stored snapshots."""
+    await rate_limiter.admit(api_key_entry, CHEAP)
+    delta = await fetch_delta("tft", username, since)
+    if delta is None:
+        raise HTTPException(
+            status_code=404, detail=f"No stored stats found for username: {username}."
+        )
+    return json_response(request, delta)
 
 
 @app.get("/status", summary="API Health Check")
 async def status():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "event_loop_lag_ms": round(loop_lag_monitor.lag * 1000, 2),
+        "event_loop_lag_peak_ms": round(loop_lag_monitor.peak_lag * 1000, 2),
+        "flaresolverr": await flaresolverr_governor.stats(),
+    }
+
+
+@app.get("/metrics", summary="Prometheus metrics", include_in_schema=False)
+async def metrics(authorization: Optional[str] = Header(None)):
+    if not metrics_authorized(authorization):
+        raise HTTPException(status_code=403, detail="Invalid metrics token.")
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
 
 
 @app.post(
@@ -180,13 +898,14 @@ async def create_new_api_key(
     user: str,
     new_api_key: str = Header(None, include_in_schema=False),
     permission: str = "normal",
+    tier: str = "free",
     api_key: str = Depends(get_api_key),
-    db: Session = Depends(get_session_local),
+    db: AsyncSession = Depends(get_session_local),
 ):
     """
     Create a new API key, but only accessible to users with 'admin' permissions.
     """
-    db_api_key = db.query(APIKey).filter(APIKey.key == api_key).first()
+    db_api_key = await api_key_cache.get(api_key)
 
     if not db_api_key:
         raise HTTPException(status_code=403, detail="Invalid API Key")
@@ -201,6 +920,8 @@ async def create_new_api_key(
     # Check for valid permission level in the request
     if permission not in ["normal", "admin"]:
         raise HTTPException(status_code=400, detail="Invalid permission level.")
+    if tier not in RATE_LIMIT_TIERS:
+        raise HTTPException(status_code=400, detail="Invalid rate limit tier.")
 
     # If no API key is provided, generate a random one
     if not new_api_key:
@@ -208,9 +929,98 @@ async def create_new_api_key(
 
     try:
         # Call function to add the new API key to the database
-        add_api_key(db, new_api_key, user, permission)
+        await add_api_key(db, new_api_key, user, permission, tier)
+        await api_key_cache.invalidate(new_api_key)
         return {
-            "message": f"API Key '{new_api_key}' created successfully for user '{user}' with permission '{permission}'."
+            "message": f"API Key '{new_api_key}' created successfully for user '{user}' with permission '{permission}' and tier '{tier}'."
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+def get_flaresolverr_instance_name(name: str) -> str:
+    if name not in flaresolverr_balancer.instances:
+        raise HTTPException(status_code=404, detail="Unknown FlareSolverr instance.")
+    return name
+
+
+@app.get(
+    "/admin/flaresolverr",
+    summary="List FlareSolverr instances",
+)
+async def get_flaresolverr_instances(api_key: str = Depends(get_admin_api_key)):
+    return flaresolverr_balancer.status()
+
+
+@app.post(
+    "/admin/flaresolverr/{name}/drain",
+    summary="Drain a FlareSolverr instance",
+)
+async def drain_flaresolverr_instance(
+    background_tasks: BackgroundTasks,
+    name: str = Depends(get_flaresolverr_instance_name),
+    api_key: str = Depends(get_admin_api_key),
+):
+    """
+    Stop sending new requests to an instance. Its browser sessions are
+    destroyed once its in-flight requests finish.
+    """
+    flaresolverr_balancer.drain(name)
+    background_tasks.add_task(flaresolverr_balancer.close_drained, name)
+    return flaresolverr_balancer.instances[name].status()
+
+
+@app.post(
+    "/admin/flaresolverr/{name}/undrain",
+    summary="Return a drained FlareSolverr instance to service",
+)
+async def undrain_flaresolverr_instance(
+    name: str = Depends(get_flaresolverr_instance_name),
+    api_key: str = Depends(get_admin_api_key),
+):
+    flaresolverr_balancer.undrain(name)
+    return flaresolverr_balancer.instances[name].status()
+
+
+@app.get(
+    "/admin/watchlist",
+    response_model=List[WatchlistEntry],
+    summary="List pre-warmed players",
+)
+async def get_watchlist(api_key: str = Depends(get_admin_api_key)):
+    """List watched players, most requested first."""
+    return await prewarm_scheduler.watchlist()
+
+
+@app.post(
+    "/admin/watchlist",
+    summary="Pre-warm players",
+)
+async def add_to_watchlist(
+    watchlist: WatchlistRequest, api_key: str = Depends(get_admin_api_key)
+):
+    """
+    Add players to the watchlist. Their cached stats are refreshed in the
+    background ahead of expiry, so requests for them never wait on a fetch.
+    """
+    if watchlist.game not in prewarm_scheduler.refreshers:
+        raise HTTPException(status_code=400, detail="Invalid game.")
+    if not watchlist.identifiers:
+        raise HTTPException(status_code=400, detail="No identifiers provided.")
+
+    await prewarm_scheduler.watch(watchlist.game, watchlist.identifiers)
+    return {
+        "message": f"Added {len(watchlist.identifiers)} {watchlist.game} players to the watchlist."
+    }
+
+
+@app.delete(
+    "/admin/watchlist/{game}/{identifier}",
+    summary="Stop pre-warming a player",
+)
+async def remove_from_watchlist(
+    game: str, identifier: str, api_key: str = Depends(get_admin_api_key)
+):
+    if not await prewarm_scheduler.unwatch(game, identifier):
+        raise HTTPException(status_code=404, detail="Player is not on the watchlist.")
+    return {"message": f"Removed {game} player '{identifier}' from the watchlist."}
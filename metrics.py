@@ -0,0 +1,171 @@
+import asyncio
+import os
+import secrets
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Awaitable, Callable, Iterator, Optional, Tuple, TypeVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Set when the API runs with several uvicorn workers, so /metrics can add up
+# what every worker recorded (see prometheus_client's multiprocess mode)
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Bearer token Prometheus must send to read /metrics; unset leaves it open
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Buckets in seconds: in-memory and Redis steps, parsing, and upstream calls
+# which can take as long as a FlareSolverr timeout
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+PARSE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+UPSTREAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+T = TypeVar("T")
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "tracker_http_request_seconds",
+    "Time to answer an API request.",
+    ["method", "route", "status"],
+    buckets=REQUEST_BUCKETS,
+)
+AUTH_LOOKUP_SECONDS = Histogram(
+    "tracker_auth_lookup_seconds",
+    "Time to look up an API key, from this worker's cache or the database.",
+    ["source"],
+    buckets=FAST_BUCKETS,
+)
+RATE_LIMIT_CHECK_SECONDS = Histogram(
+    "tracker_rate_limit_check_seconds",
+    "Time to check and charge a rate limit budget in Redis.",
+    ["budget", "result"],
+    buckets=FAST_BUCKETS,
+)
+UPSTREAM_REQUEST_SECONDS = Histogram(
+    "tracker_upstream_request_seconds",
+    "Time of one call to an upstream: a FlareSolverr instance, a direct "
+    "Tracker.gg fetch or a Steam Web API endpoint.",
+    ["upstream", "target"],
+    buckets=UPSTREAM_BUCKETS,
+)
+UPSTREAM_ERRORS = Counter(
+    "tracker_upstream_errors",
+    "Failed upstream calls, by HTTP status, 'timeout' or 'exception'.",
+    ["upstream", "target", "reason"],
+)
+EMPTY_PAGES = Counter(
+    "tracker_empty_pages",
+    "Lookups that got no page content back from FlareSolverr.",
+    ["game"],
+)
+PARSE_SECONDS = Histogram(
+    "tracker_parse_seconds",
+    "Time to parse a page into stats, including the hand-off to the parser pool.",
+    ["parser"],
+    buckets=PARSE_BUCKETS,
+)
+MODEL_BUILD_SECONDS = Histogram(
+    "tracker_model_build_seconds",
+    "Time to build a stats model from upstream data that needs no parsing.",
+    ["game"],
+    buckets=FAST_BUCKETS,
+)
+SERIALIZATION_SECONDS = Histogram(
+    "tracker_serialization_seconds",
+    "Time to encode stats: JSON dump, compression, or selecting fields.",
+    ["stage"],
+    buckets=FAST_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    "tracker_cache_lookups",
+    "Cache lookups by outcome: HIT, MISS or STALE.",
+    ["game", "outcome"],
+)
+SNAPSHOTS_DROPPED = Counter(
+    "tracker_snapshots_dropped",
+    "Snapshots dropped because the write queue was full.",
+    ["game"],
+)
+SCRAPES_IN_PROGRESS = Gauge(
+    "tracker_scrapes_in_progress",
+    "Scrapes running right now.",
+    ["game"],
+    multiprocess_mode="livesum",
+)
+EVENT_LOOP_LAG_SECONDS = Gauge(
+    "tracker_event_loop_lag_seconds",
+    "How late the event loop last woke up from a fixed sleep.",
+    multiprocess_mode="livemax",
+)
+
+
+@contextmanager
+def observe(histogram: Histogram, **labels) -> Iterator[None]:
+    """Time the block into `histogram`, whether or not it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(**labels).observe(time.perf_counter() - started)
+
+
+def track_scrape(
+    game: str,
+) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Count calls to a scraper's fetch function as scrapes in progress."""
+
+    def decorator(fetch: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @wraps(fetch)
+        async def tracked(*args, **kwargs) -> T:
+            with SCRAPES_IN_PROGRESS.labels(game).track_inprogress():
+                return await fetch(*args, **kwargs)
+
+        return tracked
+
+    return decorator
+
+
+def error_reason(error: Exception) -> str:
+    """The `reason` label for an upstream call that raised."""
+    status = getattr(error, "status", None)
+    if isinstance(status, int):
+        return str(status)
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+        return "timeout"
+    return "exception"
+
+
+def metrics_authorized(authorization: Optional[str]) -> bool:
+    if not METRICS_TOKEN:
+        return True
+    scheme, _, token = (authorization or "").partition(" ")
+    return scheme.lower() == "bearer" and secrets.compare_digest(
+        token.encode(), METRICS_TOKEN.encode()
+    )
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """The Prometheus exposition of every metric, and its content type."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead() -> None:
+    """Drop this worker's live gauges once it shuts down."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
@@ -1,5 +1,6 @@
+from datetime import datetime
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 
 class CS2PlayerStats(BaseModel):
@@ -112,3 +113,18 @@ class CS2PlayerStats(BaseModel):
     total_time_played_unlocked: Optional[int] = None
     total_planted_bombs_unlocked: Optional[int] = None
     total_defused_bombs_unlocked: Optional[int] = None
+
+
+class CS2BatchRequest(BaseModel):
+    steam_ids: List[str]
+
+
+class CS2BatchResult(BaseModel):
+    steam_id: str
+    stats: Optional[CS2PlayerStats] = None
+    error: Optional[str] = None
+
+
+class CS2Snapshot(BaseModel):
+    fetched_at: datetime
+    stats: CS2PlayerStats
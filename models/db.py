@@ -1,7 +1,8 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, func
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import Column, Integer, String, DateTime, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
 from sqlalchemy.exc import IntegrityError
+from typing import Optional
 from dotenv import load_dotenv
 import os
 
@@ -18,34 +19,105 @@ class APIKey(Base):
     key = Column(String, unique=True, nullable=False)
     user = Column(String, nullable=False)
     permission = Column(String, default="normal")
+    tier = Column(String, default="free", server_default="free", nullable=False)
     created_at = Column(DateTime, default=func.now(), nullable=False)
 
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL, echo=True, future=True)
+# Log every SQL statement; off by default as it floods the logs under load
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
 
+# Connections kept open per worker, and how many more may be opened under load
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def async_database_url(url: str) -> str:
+    """Point a plain postgresql:// URL at the asyncpg driver."""
+    for scheme in ("postgresql://", "postgres://"):
+        if url.startswith(scheme):
+            return "postgresql+asyncpg://" + url[len(scheme) :]
+    return url
 
-def create_db() -> None:
-    """Create all tables in the database."""
-    Base.metadata.create_all(bind=engine)
 
+engine = create_async_engine(
+    async_database_url(DATABASE_URL),
+    echo=DB_ECHO,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=True,
+)
 
-def add_api_key(
-    db: Session, api_key: str, user: str, permission: str = "normal"
+
+SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+
+async def create_db() -> None:
+    """Create all tables in the database and bring existing ones up to date."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await migrate_api_key_tiers(conn)
+
+
+async def migrate_api_key_tiers(conn) -> None:
+    """Add the tier column to an api_keys table created before it existed."""
+    has_tier = await conn.scalar(
+        text(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_name = 'api_keys' AND column_name = 'tier'"
+        )
+    )
+    if has_tier:
+        return
+    await conn.execute(
+        text(
+            "ALTER TABLE api_keys "
+            "ADD COLUMN IF NOT EXISTS tier VARCHAR NOT NULL DEFAULT 'free'"
+        )
+    )
+    # Existing admin keys keep the unlimited access they had
+    await conn.execute(
+        text("UPDATE api_keys SET tier = 'admin' WHERE permission = 'admin'")
+    )
+
+
+async def close_db() -> None:
+    """Close every pooled connection."""
+    await engine.dispose()
+
+
+async def get_api_key_record(db: AsyncSession, api_key: str) -> Optional[APIKey]:
+    result = await db.execute(select(APIKey).where(APIKey.key == api_key))
+    return result.scalar_one_or_none()
+
+
+async def count_api_keys(db: AsyncSession) -> int:
+    result = await db.execute(select(func.count()).select_from(APIKey))
+    return result.scalar_one()
+
+
+async def add_api_key(
+    db: AsyncSession,
+    api_key: str,
+    user: str,
+    permission: str = "normal",
+    tier: str = "free",
 ) -> APIKey:
     """
     Function to insert a new API key into the database.
     Ensures the key is unique.
 
     Args:
-        db: The SQLAlchemy session.
+        db: The SQLAlchemy async session.
         api_key: The API key to add.
         user: The associated user for the API key.
         permission: The permission level for the API key ('normal' or 'admin').
+        tier: The rate limit tier for the API key.
 
     Returns:
         The created APIKey object.
@@ -53,13 +125,13 @@ def add_api_key(
     Raises:
         Exception: If the API key already exists in the database.
     """
-    db_api_key = APIKey(key=api_key, user=user, permission=permission)
+    db_api_key = APIKey(key=api_key, user=user, permission=permission, tier=tier)
     db.add(db_api_key)
     try:
-        db.commit()
+        await db.commit()
 
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
 
         raise Exception(f"API Key '{api_key}' already exists in the database.") from e
     return db_api_key
@@ -0,0 +1,9 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Dict
+
+
+class StatsDelta(BaseModel):
+    from_fetched_at: datetime
+    to_fetched_at: datetime
+    changes: Dict[str, float]
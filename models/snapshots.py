@@ -0,0 +1,90 @@
+from datetime import datetime
+from typing import Dict, List, Type, Union, get_args, get_origin
+
+from pydantic import BaseModel
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    Index,
+    JSON,
+    String,
+    Table,
+    func,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+
+from models.db import Base
+from models.valorant_model import ValorantPlayerStats
+from models.cs2_model import CS2PlayerStats
+from models.tft_model import TFTPlayerStats
+
+# Stats models snapshotted per game; each gets a table with one typed column
+# per model field, generated below so the tables follow the models
+SNAPSHOT_MODELS: Dict[str, Type[BaseModel]] = {
+    "valorant": ValorantPlayerStats,
+    "cs2": CS2PlayerStats,
+    "tft": TFTPlayerStats,
+}
+
+COLUMN_TYPES = {int: BigInteger, float: Float, str: String, bool: Boolean}
+
+# Columns every snapshot table has besides the model's own fields
+SNAPSHOT_META_COLUMNS = ("id", "identifier", "fetched_at")
+
+
+def column_type(annotation):
+    """Map a field annotation to a column type; lists and models become JSON."""
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            annotation = args[0]
+    if annotation in COLUMN_TYPES:
+        return COLUMN_TYPES[annotation]
+    return JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql")
+
+
+def snapshot_table(game: str, model: Type[BaseModel]) -> Table:
+    name = f"{game}_snapshots"
+    return Table(
+        name,
+        Base.metadata,
+        Column("id", BigInteger, primary_key=True, autoincrement=True),
+        Column("identifier", String, nullable=False),
+        Column(
+            "fetched_at",
+            DateTime(timezone=True),
+            nullable=False,
+            server_default=func.now(),
+        ),
+        *(
+            Column(field_name, column_type(field.annotation))
+            for field_name, field in model.model_fields.items()
+        ),
+        Index(f"ix_{name}_identifier_fetched_at", "identifier", "fetched_at"),
+    )
+
+
+SNAPSHOT_TABLES: Dict[str, Table] = {
+    game: snapshot_table(game, model) for game, model in SNAPSHOT_MODELS.items()
+}
+
+
+def snapshot_row(identifier: str, stats: BaseModel) -> dict:
+    return {
+        "identifier": identifier.lower(),
+        "fetched_at": datetime.now().astimezone(),
+        **stats.model_dump(mode="json"),
+    }
+
+
+def numeric_fields(game: str) -> List[str]:
+    """Fields of a game's stats that can be compared between snapshots."""
+    return [
+        column.name
+        for column in SNAPSHOT_TABLES[game].columns
+        if column.name not in SNAPSHOT_META_COLUMNS
+        and isinstance(column.type, (BigInteger, Float))
+    ]
@@ -1,7 +1,8 @@
 # models/tft_model.py
 
+from datetime import datetime
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 
 class TFTPlayerStats(BaseModel):
@@ -13,3 +14,18 @@ class TFTPlayerStats(BaseModel):
     losses: Optional[int] = None
     win_percentage: Optional[float] = None
     matches_played: Optional[int] = None
+
+
+class TFTBatchRequest(BaseModel):
+    usernames: List[str]
+
+
+class TFTBatchResult(BaseModel):
+    username: str
+    stats: Optional[TFTPlayerStats] = None
+    error: Optional[str] = None
+
+
+class TFTSnapshot(BaseModel):
+    fetched_at: datetime
+    stats: TFTPlayerStats
@@ -1,3 +1,4 @@
+from datetime import datetime
 from pydantic import BaseModel
 from typing import Optional, List
 
@@ -61,3 +62,26 @@ class ValorantPlayerStats(BaseModel):
     top_weapons: Optional[List[Weapon]] = None
     top_maps: Optional[List[MapStats]] = None
     roles: Optional[List[Role]] = None
+
+
+class ValorantPlayerProfile(BaseModel):
+    username: str
+    current: Optional[ValorantPlayerStats] = None
+    all: Optional[ValorantPlayerStats] = None
+
+
+class ValorantBatchRequest(BaseModel):
+    usernames: List[str]
+    seasons: List[str] = ["current"]
+
+
+class ValorantBatchResult(BaseModel):
+    username: str
+    season: str
+    stats: Optional[ValorantPlayerStats] = None
+    error: Optional[str] = None
+
+
+class ValorantSnapshot(BaseModel):
+    fetched_at: datetime
+    stats: ValorantPlayerStats
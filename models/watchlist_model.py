@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import List
+
+
+class WatchlistRequest(BaseModel):
+    game: str
+    identifiers: List[str]
+
+
+class WatchlistEntry(BaseModel):
+    game: str
+    identifier: str
+    hits: float
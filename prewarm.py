@@ -0,0 +1,265 @@
+import asyncio
+import os
+import uuid
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Set
+
+from pydantic import BaseModel
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+
+from cache import CACHE_TTLS, player_stats_cache
+from flaresolverr_governor import FlareSolverrOverloaded, background_scrape
+from singleflight import RELEASE_LOCK_SCRIPT
+from worker_pool import WorkerPool
+
+load_dotenv()
+
+# Seconds between scheduler passes
+PREWARM_INTERVAL = float(os.getenv("PREWARM_INTERVAL", "30"))
+
+# Refresh an entry once it has used this fraction of its cache TTL
+PREWARM_REFRESH_AHEAD = float(os.getenv("PREWARM_REFRESH_AHEAD", "0.8"))
+
+# Upstream fetches allowed per pass across all workers, and how many run at once
+PREWARM_BUDGET = int(os.getenv("PREWARM_BUDGET", "50"))
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", "2"))
+
+# Request counts decay by this factor every pass, so priority follows recent use
+PREWARM_HIT_DECAY = float(os.getenv("PREWARM_HIT_DECAY", "0.9"))
+
+WATCHLIST_KEY = "tracker:watchlist"
+WATCHLIST_HITS_KEY = "tracker:watchlist:hits"
+PREWARM_LEADER_KEY = "tracker:prewarm:leader"
+
+# The leader lock lasts one interval and is renewed while a pass runs
+PREWARM_LOCK_TTL_MS = max(int(PREWARM_INTERVAL * 1000), 1000)
+
+# Only extend the lock if we still own it
+RENEW_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class Refresher(NamedTuple):
+    season: str
+    fetch: Callable[[str], Awaitable[Optional[BaseModel]]]
+
+
+class PrewarmScheduler:
+    """
+    Keeps the cache entries of watched players fresh in the background.
+
+    The watchlist and per-player request counts live in Redis. Every worker
+    counts requests for watched players and flushes them each pass; one worker
+    at a time (holding a Redis lock) then refreshes the entries closest to
+    expiry, most requested first, within PREWARM_BUDGET fetches per pass.
+    The lock is renewed for as long as the pass runs, so a slow pass is never
+    repeated by another worker, and then left to expire so passes start at
+    most once per PREWARM_INTERVAL.
+    """
+
+    def __init__(self):
+        self.redis = None
+        self.refreshers: Dict[str, Refresher] = {}
+        self.pool = WorkerPool(PREWARM_CONCURRENCY)
+        self._watched: Set[str] = set()
+        self._hits: Counter = Counter()
+        self._task: Optional[asyncio.Task] = None
+
+    def register(
+        self,
+        game: str,
+        season: str,
+        fetch: Callable[[str], Awaitable[Optional[BaseModel]]],
+    ) -> None:
+        """Set how a game's watched players are fetched and which entry they fill."""
+        self.refreshers[game] = Refresher(season, fetch)
+
+    def start(self, redis_client) -> None:
+        self.redis = redis_client
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.redis = None
+
+    @staticmethod
+    def member(game: str, identifier: str) -> str:
+        return f"{game}:{identifier.lower()}"
+
+    def record_hit(self, game: str, identifier: str) -> None:
+        member = self.member(game, identifier)
+        if member in self._watched:
+            self._hits[member] += 1
+
+    async def watch(self, game: str, identifiers: List[str]) -> None:
+        await self.redis.hset(
+            WATCHLIST_KEY,
+            mapping={
+                self.member(game, identifier): identifier for identifier in identifiers
+            },
+        )
+        self._watched.update(
+            self.member(game, identifier) for identifier in identifiers
+        )
+
+    async def unwatch(self, game: str, identifier: str) -> bool:
+        member = self.member(game, identifier)
+        self._watched.discard(member)
+        await self.redis.zrem(WATCHLIST_HITS_KEY, member)
+        return bool(await self.redis.hdel(WATCHLIST_KEY, member))
+
+    async def watchlist(self) -> List[dict]:
+        entries = await self.redis.hgetall(WATCHLIST_KEY)
+        if not entries:
+            return []
+        members = list(entries)
+        scores = await self.redis.zmscore(WATCHLIST_HITS_KEY, members)
+        return sorted(
+            (
+                {
+                    "game": member.split(":", 1)[0],
+                    "identifier": entries[member],
+                    "hits": round(score or 0.0, 2),
+                }
+                for member, score in zip(members, scores)
+            ),
+            key=lambda entry: entry["hits"],
+            reverse=True,
+        )
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._tick()
+            except RedisError as e:
+                print(f"Pre-warm pass failed: {e}")
+            except Exception as e:
+                print(f"An error occurred during the pre-warm pass: {e}")
+            await asyncio.sleep(PREWARM_INTERVAL)
+
+    async def _tick(self) -> None:
+        entries = await self.redis.hgetall(WATCHLIST_KEY)
+        self._watched = set(entries)
+        await self._flush_hits()
+
+        # Only one worker refreshes per pass
+        token = uuid.uuid4().hex
+        acquired = await self.redis.set(
+            PREWARM_LEADER_KEY, token, nx=True, px=PREWARM_LOCK_TTL_MS
+        )
+        if not acquired or not entries:
+            return
+
+        renewal = asyncio.create_task(self._renew_lock(token))
+        try:
+            await self._refresh_due(entries)
+        except asyncio.CancelledError:
+            # Shutting down, let another worker take over straight away
+            await asyncio.shield(self._release_lock(token))
+            raise
+        finally:
+            renewal.cancel()
+
+    async def _renew_lock(self, token: str) -> None:
+        while True:
+            await asyncio.sleep(PREWARM_LOCK_TTL_MS / 3000)
+            try:
+                await self.redis.eval(
+                    RENEW_LOCK_SCRIPT,
+                    1,
+                    PREWARM_LEADER_KEY,
+                    token,
+                    PREWARM_LOCK_TTL_MS,
+                )
+            except RedisError as e:
+                print(f"Could not renew the pre-warm lock: {e}")
+
+    async def _release_lock(self, token: str) -> None:
+        try:
+            await self.redis.eval(RELEASE_LOCK_SCRIPT, 1, PREWARM_LEADER_KEY, token)
+        except RedisError as e:
+            print(f"Could not release the pre-warm lock: {e}")
+
+    async def _refresh_due(self, entries: Dict[str, str]) -> None:
+        await self.redis.zunionstore(
+            WATCHLIST_HITS_KEY, {WATCHLIST_HITS_KEY: PREWARM_HIT_DECAY}
+        )
+        due = await self._due(entries)
+        if not due:
+            return
+        scores = await self.redis.zmscore(WATCHLIST_HITS_KEY, due)
+        ranked = sorted(zip(due, scores), key=lambda pair: pair[1] or 0.0, reverse=True)
+
+        await asyncio.gather(
+            *(
+                self.pool.run(lambda member=member: self._refresh(member, entries))
+                for member, _ in ranked[:PREWARM_BUDGET]
+            )
+        )
+
+    async def _flush_hits(self) -> None:
+        hits, self._hits = self._hits, Counter()
+        hits = {
+            member: count for member, count in hits.items() if member in self._watched
+        }
+        if not hits:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for member, count in hits.items():
+                pipe.zincrby(WATCHLIST_HITS_KEY, count, member)
+            await pipe.execute()
+
+    async def _due(self, entries: Dict[str, str]) -> List[str]:
+        """Watched members whose cache entry is missing or close to expiry."""
+        by_game: Dict[str, List[str]] = {}
+        for member in entries:
+            game = member.split(":", 1)[0]
+            if game in self.refreshers:
+                by_game.setdefault(game, []).append(member)
+
+        due = []
+        for game, members in by_game.items():
+            ages = await player_stats_cache.entry_ages(
+                game,
+                self.refreshers[game].season,
+                [entries[member] for member in members],
+            )
+            refresh_after = CACHE_TTLS[game] * PREWARM_REFRESH_AHEAD
+            due.extend(
+                member
+                for member in members
+                if ages[entries[member]] is None
+                or ages[entries[member]] >= refresh_after
+            )
+        return due
+
+    async def _refresh(self, member: str, entries: Dict[str, str]) -> None:
+        game = member.split(":", 1)[0]
+        identifier = entries[member]
+        refresher = self.refreshers[game]
+        try:
+            with background_scrape():
+                await player_stats_cache.refresh(
+                    game,
+                    identifier,
+                    refresher.season,
+                    lambda: refresher.fetch(identifier),
+                )
+        except FlareSolverrOverloaded:
+            print(
+                f"Skipped pre-warming {game} stats for {identifier}, FlareSolverr is busy."
+            )
+        except Exception as e:
+            print(f"Could not pre-warm {game} stats for {identifier}: {e}")
+
+
+prewarm_scheduler = PrewarmScheduler()
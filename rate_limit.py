@@ -0,0 +1,211 @@
+import json
+import math
+import os
+import time
+from typing import Awaitable, Callable, Dict, Iterable
+
+from fastapi import HTTPException
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+
+from api_key_cache import CachedAPIKey
+from cache import CACHE_MISS
+from metrics import RATE_LIMIT_CHECK_SECONDS
+from tracing import span
+
+load_dotenv()
+
+# Budgets: "expensive" lookups render a page through FlareSolverr, "cheap" ones
+# call the Steam API or are answered from the cache
+EXPENSIVE = "expensive"
+CHEAP = "cheap"
+
+# Requests allowed per RATE_LIMIT_WINDOW ("rate") and per RATE_LIMIT_BURST_WINDOW
+# ("burst") for each tier and budget. A rate of None means unlimited.
+DEFAULT_RATE_LIMIT_TIERS = {
+    "free": {
+        EXPENSIVE: {"rate": 10, "burst": 3},
+        CHEAP: {"rate": 60, "burst": 10},
+    },
+    "pro": {
+        EXPENSIVE: {"rate": 60, "burst": 10},
+        CHEAP: {"rate": 600, "burst": 50},
+    },
+    "admin": {
+        EXPENSIVE: {"rate": None, "burst": None},
+        CHEAP: {"rate": None, "burst": None},
+    },
+}
+RATE_LIMIT_TIERS: Dict[str, dict] = {
+    **DEFAULT_RATE_LIMIT_TIERS,
+    **json.loads(os.getenv("RATE_LIMIT_TIERS", "{}")),
+}
+RATE_LIMIT_DEFAULT_TIER = os.getenv("RATE_LIMIT_DEFAULT_TIER", "free")
+
+RATE_LIMIT_WINDOW = float(os.getenv("RATE_LIMIT_WINDOW", "60"))
+RATE_LIMIT_BURST_WINDOW = float(os.getenv("RATE_LIMIT_BURST_WINDOW", "1"))
+
+# What a lookup answered from the cache costs against the cheap budget
+RATE_LIMIT_CACHED_COST = int(os.getenv("RATE_LIMIT_CACHED_COST", "0"))
+
+RATE_LIMIT_KEY_PREFIX = "tracker:ratelimit"
+
+# Sliding-window counters for the rate and burst windows, checked and charged
+# atomically. Each window's count is the current bucket plus the previous
+# bucket weighted by how much of it still overlaps the window.
+#
+# KEYS: rate bucket, previous rate bucket, burst bucket, previous burst bucket
+# ARGV: cost, rate, window ms, ms into the rate bucket,
+#       burst, burst window ms, ms into the burst bucket
+# Returns {allowed, remaining, retry after ms}
+SLIDING_WINDOW_SCRIPT = """
+local function used(key, previous_key, window, elapsed)
+    local current = tonumber(redis.call('GET', key) or '0')
+    local previous = tonumber(redis.call('GET', previous_key) or '0')
+    return previous * (window - elapsed) / window + current
+end
+
+local cost = tonumber(ARGV[1])
+local rate, window, elapsed = tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local burst, burst_window, burst_elapsed =
+    tonumber(ARGV[5]), tonumber(ARGV[6]), tonumber(ARGV[7])
+
+local rate_used = used(KEYS[1], KEYS[2], window, elapsed)
+local remaining = math.floor(rate - rate_used)
+if rate_used + cost > rate then
+    return {0, remaining, window - elapsed}
+end
+-- A batch larger than the burst may use the whole burst at once
+local burst_cost = math.min(cost, burst)
+if used(KEYS[3], KEYS[4], burst_window, burst_elapsed) + burst_cost > burst then
+    return {0, remaining, burst_window - burst_elapsed}
+end
+
+redis.call('INCRBY', KEYS[1], cost)
+redis.call('PEXPIRE', KEYS[1], window * 2)
+redis.call('INCRBY', KEYS[3], burst_cost)
+redis.call('PEXPIRE', KEYS[3], burst_window * 2)
+return {1, remaining - cost, 0}
+"""
+
+
+class TieredRateLimiter:
+    """
+    Per-API-key rate limits with separate expensive and cheap budgets.
+
+    Each key's tier sets a rate and a burst for each budget. A request is
+    checked and charged with one Redis script call; lookups served from the
+    cache are charged RATE_LIMIT_CACHED_COST against the cheap budget, which
+    by default makes them free. If Redis is unavailable requests are let
+    through.
+    """
+
+    def __init__(self):
+        self.redis = None
+        self._script = None
+
+    def init(self, redis_client) -> None:
+        self.redis = redis_client
+        self._script = redis_client.register_script(SLIDING_WINDOW_SCRIPT)
+
+    def close(self) -> None:
+        self.redis = None
+        self._script = None
+
+    @staticmethod
+    def limits(key: CachedAPIKey, budget: str) -> dict:
+        tier = (
+            RATE_LIMIT_TIERS.get(key.tier) or RATE_LIMIT_TIERS[RATE_LIMIT_DEFAULT_TIER]
+        )
+        return tier[budget]
+
+    async def admit(self, key: CachedAPIKey, budget: str, cost: int = 1) -> None:
+        """Charge a request to a budget, raising a 429 if it's used up."""
+        limits = self.limits(key, budget)
+        if cost <= 0 or limits["rate"] is None or self._script is None:
+            return
+        if cost > limits["rate"]:
+            raise HTTPException(
+                status_code=400,
+                detail=(
+                    f"Request needs {cost} {budget} lookups but the limit is "
+                    f"{limits['rate']} per {RATE_LIMIT_WINDOW:g} seconds."
+                ),
+            )
+
+        now_ms = int(time.time() * 1000)
+        window_ms = int(RATE_LIMIT_WINDOW * 1000)
+        burst_window_ms = int(RATE_LIMIT_BURST_WINDOW * 1000)
+        prefix = f"{RATE_LIMIT_KEY_PREFIX}:{key.id}:{budget}"
+        bucket, burst_bucket = now_ms // window_ms, now_ms // burst_window_ms
+        started = time.perf_counter()
+        try:
+            with span("rate_limit.check", budget=budget, cost=cost) as current:
+                allowed, remaining, retry_after_ms = await self._script(
+                    keys=[
+                        f"{prefix}:rate:{bucket}",
+                        f"{prefix}:rate:{bucket - 1}",
+                        f"{prefix}:burst:{burst_bucket}",
+                        f"{prefix}:burst:{burst_bucket - 1}",
+                    ],
+                    args=[
+                        cost,
+                        limits["rate"],
+                        window_ms,
+                        now_ms % window_ms,
+                        limits["burst"] or limits["rate"],
+                        burst_window_ms,
+                        now_ms % burst_window_ms,
+                    ],
+                )
+                current.set_attribute("rate_limit.allowed", bool(allowed))
+        except RedisError as e:
+            RATE_LIMIT_CHECK_SECONDS.labels(budget, "error").observe(
+                time.perf_counter() - started
+            )
+            print(f"Rate limit check failed, allowing request: {e}")
+            return
+
+        RATE_LIMIT_CHECK_SECONDS.labels(
+            budget, "allowed" if allowed else "limited"
+        ).observe(time.perf_counter() - started)
+        if not allowed:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Rate limit exceeded for {budget} lookups.",
+                headers={
+                    "Retry-After": str(max(math.ceil(retry_after_ms / 1000), 1)),
+                    "X-RateLimit-Limit": str(limits["rate"]),
+                    "X-RateLimit-Remaining": str(max(remaining, 0)),
+                },
+            )
+
+    def for_lookup(
+        self, key: CachedAPIKey, budget: str
+    ) -> Callable[[str], Awaitable[None]]:
+        """
+        Admission callback for a cached lookup: misses are charged to
+        `budget`, cache hits and stale hits are charged as cached lookups.
+        """
+
+        async def admit(cache_status: str) -> None:
+            if cache_status == CACHE_MISS:
+                await self.admit(key, budget)
+            else:
+                await self.admit(key, CHEAP, RATE_LIMIT_CACHED_COST)
+
+        return admit
+
+    async def admit_lookups(
+        self, key: CachedAPIKey, budget: str, cache_statuses: Iterable[str]
+    ) -> None:
+        """Charge a batch of lookups the way for_lookup charges each one."""
+        cache_statuses = list(cache_statuses)
+        misses = cache_statuses.count(CACHE_MISS)
+        await self.admit(key, budget, misses)
+        await self.admit(
+            key, CHEAP, (len(cache_statuses) - misses) * RATE_LIMIT_CACHED_COST
+        )
+
+
+rate_limiter = TieredRateLimiter()
@@ -1,41 +1,36 @@
-import aiohttp
-from typing import Optional
-from models.cs2_model import CS2PlayerStats
+import asyncio
+from typing import List, Optional
+from models.cs2_model import CS2PlayerStats, CS2BatchResult
+from scrapers.steam_backend import SteamBackend, fan_out, steam_backend
+from metrics import MODEL_BUILD_SECONDS, observe, track_scrape
+from tracing import traced
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
-STEAM_API_KEY = os.getenv("STEAM_API_KEY")
 CS2_APP_ID = "730"  # The App ID for CS2
 
+# GetPlayerSummaries accepts at most 100 Steam IDs per call
+STEAM_SUMMARIES_CHUNK_SIZE = 100
+CS2_BATCH_STATS_CONCURRENCY = int(os.getenv("CS2_BATCH_STATS_CONCURRENCY", "10"))
 
-async def fetch_steam_player_summary(steam_id: str) -> Optional[dict]:
+
+async def fetch_steam_player_summary(
+    steam_id: str, backend: Optional[SteamBackend] = None
+) -> Optional[dict]:
     """Fetch basic player summary using the Steam API."""
-    url = f"http://api.steampowered.com/ISteamUser/GetPlayerSummaries/v0002/?key={STEAM_API_KEY}&steamids={steam_id}"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                data = await response.json()
-                if (
-                    "response" in data
-                    and "players" in data["response"]
-                    and len(data["response"]["players"]) > 0
-                ):
-                    return data["response"]["players"][0]
-    return None
+    players = await (backend or steam_backend).get_player_summaries([steam_id])
+    return players[0] if players else None
 
 
-async def fetch_cs2_user_stats(steam_id: str) -> Optional[list]:
+async def fetch_cs2_user_stats(
+    steam_id: str, backend: Optional[SteamBackend] = None
+) -> Optional[list]:
     """Fetch CS2 user stats using the Steam API."""
-    url = f"http://api.steampowered.com/ISteamUserStats/GetUserStatsForGame/v0002/?appid={CS2_APP_ID}&key={STEAM_API_KEY}&steamid={steam_id}"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                data = await response.json()
-                if "playerstats" in data and "stats" in data["playerstats"]:
-                    return data["playerstats"]["stats"]
-    return None
+    return await (backend or steam_backend).get_user_stats_for_game(
+        steam_id, CS2_APP_ID
+    )
 
 
 def get_stat_value(stats: list, stat_name: str) -> Optional[int]:
@@ -46,17 +41,100 @@ def get_stat_value(stats: list, stat_name: str) -> Optional[int]:
     return None
 
 
-async def fetch_cs2_player_stats(steam_id: str) -> Optional[CS2PlayerStats]:
-    player_summary = await fetch_steam_player_summary(steam_id)
-    if not player_summary:
-        print("No player summary found.")
+@track_scrape("cs2")
+@traced("fetch_cs2_player_stats", game="cs2")
+async def fetch_cs2_player_stats(
+    steam_id: str, backend: Optional[SteamBackend] = None
+) -> Optional[CS2PlayerStats]:
+    # The summary and stats calls are independent, so issue them together
+    results = await fan_out(
+        {
+            "player summary": fetch_steam_player_summary(steam_id, backend),
+            "player stats": fetch_cs2_user_stats(steam_id, backend),
+        }
+    )
+    if results is None:
         return None
 
-    player_stats = await fetch_cs2_user_stats(steam_id)
-    if not player_stats:
-        print("No player stats found.")
-        return None
+    return build_cs2_player_stats(
+        steam_id, results["player summary"], results["player stats"]
+    )
 
+
+@track_scrape("cs2")
+@traced("fetch_cs2_players_stats", game="cs2")
+async def fetch_cs2_players_stats(
+    steam_ids: List[str], backend: Optional[SteamBackend] = None
+) -> List[CS2BatchResult]:
+    """
+    Fetch CS2 stats for many players at once.
+
+    Summaries are fetched in chunks of up to 100 IDs per Steam call, and the
+    per-player stats calls run with bounded concurrency. A player that can't
+    be fetched gets an error entry instead of failing the whole batch.
+    """
+    backend = backend or steam_backend
+    unique_ids = list(dict.fromkeys(steam_ids))
+
+    # Fetch summaries, up to 100 Steam IDs per call
+    chunks = [
+        unique_ids[i : i + STEAM_SUMMARIES_CHUNK_SIZE]
+        for i in range(0, len(unique_ids), STEAM_SUMMARIES_CHUNK_SIZE)
+    ]
+    chunk_results = await asyncio.gather(
+        *(backend.get_player_summaries(chunk) for chunk in chunks),
+        return_exceptions=True,
+    )
+    summaries = {}
+    summary_errors = {}
+    for chunk, result in zip(chunks, chunk_results):
+        if isinstance(result, Exception):
+            print(f"An error occurred while fetching player summaries: {result}")
+            summary_errors.update({steam_id: str(result) for steam_id in chunk})
+            continue
+        for player in result:
+            summaries[player.get("steamid")] = player
+
+    # Fan out the per-player stats calls
+    semaphore = asyncio.Semaphore(CS2_BATCH_STATS_CONCURRENCY)
+
+    async def fetch_one(steam_id: str) -> CS2BatchResult:
+        if steam_id in summary_errors:
+            return CS2BatchResult(steam_id=steam_id, error=summary_errors[steam_id])
+        player_summary = summaries.get(steam_id)
+        if not player_summary:
+            return CS2BatchResult(steam_id=steam_id, error="Player summary not found.")
+
+        async with semaphore:
+            try:
+                player_stats = await fetch_cs2_user_stats(steam_id, backend)
+            except Exception as e:
+                print(f"An error occurred while fetching stats for {steam_id}: {e}")
+                return CS2BatchResult(steam_id=steam_id, error=str(e))
+        if not player_stats:
+            return CS2BatchResult(steam_id=steam_id, error="Player stats not found.")
+
+        return CS2BatchResult(
+            steam_id=steam_id,
+            stats=build_cs2_player_stats(steam_id, player_summary, player_stats),
+        )
+
+    results = await asyncio.gather(*(fetch_one(steam_id) for steam_id in unique_ids))
+    results_by_id = dict(zip(unique_ids, results))
+    return [results_by_id[steam_id] for steam_id in steam_ids]
+
+
+def build_cs2_player_stats(
+    steam_id: str, player_summary: dict, player_stats: list
+) -> CS2PlayerStats:
+    """Build the stats model from a Steam player summary and raw stats list."""
+    with observe(MODEL_BUILD_SECONDS, game="cs2"):
+        return _build_cs2_player_stats(steam_id, player_summary, player_stats)
+
+
+def _build_cs2_player_stats(
+    steam_id: str, player_summary: dict, player_stats: list
+) -> CS2PlayerStats:
     player_name = player_summary.get("personaname", "Unknown Player")
 
     stats_data = {stat["name"]: stat["value"] for stat in player_stats}
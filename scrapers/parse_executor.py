@@ -0,0 +1,66 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+from dotenv import load_dotenv
+
+from metrics import PARSE_SECONDS, observe
+from tracing import span
+
+load_dotenv()
+
+# Where HTML parsing runs: "process" (default), "thread" or "inline" on the loop
+PARSER_EXECUTOR = os.getenv("PARSER_EXECUTOR", "process")
+PARSER_WORKERS = int(os.getenv("PARSER_WORKERS", str(os.cpu_count() or 1)))
+
+T = TypeVar("T")
+
+_executor: Optional[Executor] = None
+
+
+def start_parser_executor() -> None:
+    """Create the parser pool, so the first request doesn't pay for it."""
+    global _executor
+    if _executor is not None or PARSER_EXECUTOR == "inline":
+        return
+    if PARSER_EXECUTOR == "thread":
+        _executor = ThreadPoolExecutor(
+            max_workers=PARSER_WORKERS, thread_name_prefix="parser"
+        )
+    else:
+        # Spawn rather than fork, forking a process with a running event loop
+        # and open sockets isn't safe
+        _executor = ProcessPoolExecutor(
+            max_workers=PARSER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+
+def shutdown_parser_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def run_parser(parse: Callable[..., T], *args) -> T:
+    """
+    Run a pure parse function off the event loop.
+
+    `parse` and its arguments must be picklable when the process pool is used,
+    so pass module-level functions and plain data.
+    """
+    # Page parsers take the page first; its size is what parse time scales with
+    page_size = len(args[0]) if args and isinstance(args[0], str) else 0
+    with span(
+        "parse",
+        parser=parse.__name__,
+        executor=PARSER_EXECUTOR,
+        **{"page.size": page_size},
+    ), observe(PARSE_SECONDS, parser=parse.__name__):
+        if PARSER_EXECUTOR == "inline":
+            return parse(*args)
+        start_parser_executor()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, parse, *args)
@@ -0,0 +1,35 @@
+import importlib
+import os
+from types import ModuleType
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Which HTML parser backend to use: "lxml" (default) or "bs4"
+PARSER_BACKEND = os.getenv("PARSER_BACKEND", "lxml")
+
+# Each backend module provides parse_valorant(html, username) and
+# parse_tft(html, username), returning the same models
+PARSER_BACKENDS = {
+    "lxml": "scrapers.parsers.lxml_backend",
+    "bs4": "scrapers.parsers.bs4_backend",
+}
+
+
+def get_parser_backend(name: Optional[str] = None) -> ModuleType:
+    """
+    Return the parser backend module, falling back to BeautifulSoup's pure
+    Python parser if the requested backend's dependencies aren't installed.
+    """
+    name = name or PARSER_BACKEND
+    if name not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend: {name}")
+    try:
+        return importlib.import_module(PARSER_BACKENDS[name])
+    except ImportError as e:
+        if name == "bs4":
+            raise
+        print(f"Parser backend '{name}' is unavailable ({e}), using 'bs4'.")
+        PARSER_BACKENDS[name] = PARSER_BACKENDS["bs4"]
+        return importlib.import_module(PARSER_BACKENDS["bs4"])
@@ -0,0 +1,496 @@
+import re
+from typing import List, Optional
+import lxml.html
+from lxml import etree
+from models.valorant_model import ValorantPlayerStats, Weapon, MapStats, Role
+from models.tft_model import TFTPlayerStats
+from scrapers.parsers.sanitize import sanitize_int, sanitize_number
+
+# Mirrors scrapers.parsers.bs4_backend selector for selector, so both backends
+# return identical models. Selectors are compiled once at import.
+
+HTML_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+
+WINS_PATTERN = re.compile(r"\bWins\b", re.IGNORECASE)
+MAP_IMAGE_PATTERN = re.compile(r"url\('([^']+)'\)")
+
+
+def has_class(name: str) -> str:
+    """XPath predicate matching one class token, like BeautifulSoup's class_."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def compile_first(path: str) -> etree.XPath:
+    return etree.XPath(f"({path})[1]")
+
+
+# Valorant selectors
+CURRENT_RANK_SECTION = compile_first(f"//div[{has_class('rating-summary__content')}]")
+PEAK_RANK_SECTION = compile_first(
+    "//div[normalize-space(@class)="
+    "'rating-summary__content rating-summary__content--secondary']"
+)
+RANK_INFO = compile_first(f".//div[{has_class('rating-entry__rank-info')}]")
+LABEL_DIV = compile_first(f".//div[{has_class('label')}]")
+VALUE_DIV = compile_first(f".//div[{has_class('value')}]")
+MMR_SPAN = compile_first(f".//span[{has_class('mmr')}]")
+SUBTEXT_DIV = compile_first(f".//div[{has_class('subtext')}]")
+FIRST_IMG = compile_first(".//img")
+TRACKER_SCORE_SECTION = compile_first(f"//div[{has_class('score__text')}]")
+PERFORMANCE_SECTION = compile_first(
+    f"//div[{has_class('performance-score__container')}]"
+)
+STAT_DIVS = etree.XPath(f".//div[{has_class('stat')}]")
+STAT_LABEL_DIV = compile_first(f".//div[{has_class('stat__label')}]")
+STAT_VALUE_DIV = compile_first(f".//div[{has_class('stat__value')}]")
+MATCHES_SPAN = compile_first(f"//span[{has_class('matches')}]")
+PLAYTIME_SPAN = compile_first(f"//span[{has_class('playtime')}]")
+ALL_STAT_DIVS = etree.XPath(f"//div[{has_class('stat')}]")
+NAME_SPAN = compile_first(f".//span[{has_class('name')}]")
+VALUE_SPAN = compile_first(f".//span[{has_class('value')}]")
+ALL_SPANS = etree.XPath("//span")
+SPAN_BY_TITLE = compile_first("//span[@title=$title]")
+NEXT_VALUE_SPAN = compile_first(
+    f"descendant::span[{has_class('value')}] | following::span[{has_class('value')}]"
+)
+NUMBERS_PARENT = compile_first(f"ancestor::div[{has_class('numbers')}]")
+WEAPONS_SECTION = compile_first(f"//div[{has_class('top-weapons__content')}]")
+WEAPON_DIVS = etree.XPath(f".//div[{has_class('weapon')}]")
+WEAPON_NAME_DIV = compile_first(f".//div[{has_class('weapon__name')}]")
+WEAPON_TYPE_DIV = compile_first(f".//div[{has_class('weapon__type')}]")
+WEAPON_SILHOUETTE_IMG = compile_first(f".//img[{has_class('weapon__silhouette')}]")
+WEAPON_ACCURACY_DIV = compile_first(f".//div[{has_class('weapon__accuracy-hits')}]")
+WEAPON_MAIN_STAT_DIV = compile_first(f".//div[{has_class('weapon__main-stat')}]")
+STAT_SPANS = etree.XPath(f".//span[{has_class('stat')}]")
+TOP_MAPS_SECTION = compile_first(f"//div[{has_class('top-maps__maps')}]")
+MAP_DIVS = etree.XPath(f".//div[{has_class('top-maps__maps-map')}]")
+NAME_DIV = compile_first(f".//div[{has_class('name')}]")
+INFO_DIV = compile_first(f".//div[{has_class('info')}]")
+ROLES_SECTION = compile_first(f"//div[{has_class('roles__list')}]")
+ROLE_DIVS = etree.XPath(f".//div[{has_class('role')}]")
+ROLE_NAME_H5 = compile_first(f".//h5[{has_class('role__name')}]")
+ROLE_ICON_IMG = compile_first(f".//img[{has_class('icon')}]")
+ROLE_STATS_DIV = compile_first(f".//div[{has_class('role__stats')}]")
+ROLE_VALUE_SPANS = etree.XPath(f".//span[{has_class('role__value')}]")
+ROLE_SUB_SPANS = etree.XPath(f".//span[{has_class('role__sub')}]")
+
+# TFT selectors
+PROGRESSION_SECTION = compile_first(
+    f"//div[{has_class('highlighted-stat--progression')}]"
+)
+HIGHLIGHT_TEXT_DIV = compile_first(f".//div[{has_class('highlight-text')}]")
+PROGRESSION_SPAN = compile_first(f".//span[{has_class('progression')}]")
+
+
+def parse_html(page_content: str) -> lxml.html.HtmlElement:
+    return lxml.html.document_fromstring(
+        page_content.encode("utf-8"), parser=HTML_PARSER
+    )
+
+
+def first(selector: etree.XPath, node, **variables) -> Optional[lxml.html.HtmlElement]:
+    """Return the first match of a compiled selector, or None."""
+    matches = selector(node, **variables)
+    return matches[0] if matches else None
+
+
+def text(node: lxml.html.HtmlElement) -> str:
+    """All text under a node, like BeautifulSoup's .text."""
+    return node.text_content()
+
+
+def single_string(node: lxml.html.HtmlElement) -> Optional[str]:
+    """
+    The node's only string, following single-child chains, like
+    BeautifulSoup's .string. None if the node has several children.
+    """
+    children = len(node)
+    if children == 0:
+        return node.text
+    if children == 1 and not node.text and not node[0].tail:
+        return single_string(node[0])
+    return None
+
+
+def next_value(node: lxml.html.HtmlElement) -> str:
+    """Text of the next span.value in document order, like find_next."""
+    return text(NEXT_VALUE_SPAN(node)[0]).strip()
+
+
+def span_with_title(root: lxml.html.HtmlElement, title: str):
+    return first(SPAN_BY_TITLE, root, title=title)
+
+
+def parse_valorant(page_content: str, username: str) -> ValorantPlayerStats:
+    """Parse a Tracker.gg Valorant overview page with lxml."""
+    root = parse_html(page_content)
+
+    # Extract Current Rank
+    current_rank_section = first(CURRENT_RANK_SECTION, root)
+    current_rank = "Unknown"
+    current_rank_image_url = None
+    if current_rank_section is not None:
+        rank_info = first(RANK_INFO, current_rank_section)
+        if rank_info is not None:
+            current_rank_label = first(LABEL_DIV, rank_info)
+            current_rank_value = first(VALUE_DIV, rank_info)
+            current_rank_rr = first(MMR_SPAN, rank_info)
+            current_rank = (
+                f"{text(current_rank_label).strip()} {text(current_rank_value).strip()}"
+                if current_rank_label is not None
+                and current_rank_value is not None
+                and current_rank_rr is not None
+                else (
+                    text(current_rank_value).strip()
+                    if current_rank_value is not None
+                    else "Unknown"
+                )
+            )
+
+            # Extract rank image URL
+            rank_image = first(FIRST_IMG, current_rank_section)
+            current_rank_image_url = (
+                rank_image.attrib["src"] if rank_image is not None else None
+            )
+
+    # Extract Peak Rank
+    peak_rank_section = first(PEAK_RANK_SECTION, root)
+    peak_rank = "Unknown"
+    peak_rank_episode = "N/A"
+    peak_rank_image_url = None
+    if peak_rank_section is not None:
+        peak_rank_info = first(RANK_INFO, peak_rank_section)
+        if peak_rank_info is not None:
+            peak_rank_value = first(VALUE_DIV, peak_rank_info)
+            peak_rank = (
+                text(peak_rank_value).strip()
+                if peak_rank_value is not None
+                else "Unknown"
+            )
+            episode_act_div = first(SUBTEXT_DIV, peak_rank_info)
+            peak_rank_episode = (
+                text(episode_act_div).strip() if episode_act_div is not None else "N/A"
+            )
+
+            # Extract peak rank image URL
+            rank_image = first(FIRST_IMG, peak_rank_section)
+            peak_rank_image_url = (
+                rank_image.attrib["src"] if rank_image is not None else None
+            )
+
+    # Extract Tracker Score
+    tracker_score_section = first(TRACKER_SCORE_SECTION, root)
+    tracker_score = None
+    if tracker_score_section is not None:
+        tracker_score_value = first(VALUE_DIV, tracker_score_section)
+        tracker_score_text = (
+            text(tracker_score_value).strip() if tracker_score_value is not None else ""
+        )
+        tracker_score = sanitize_int(tracker_score_text)
+
+    # Extract Round Win %
+    round_win_percentage = None
+    tracker_win_percentage_section = first(PERFORMANCE_SECTION, root)
+    if tracker_win_percentage_section is not None:
+        for stat in STAT_DIVS(tracker_win_percentage_section):
+            label = text(STAT_LABEL_DIV(stat)[0]).strip()
+            value = text(STAT_VALUE_DIV(stat)[0]).strip()
+            if label == "Round Win %":
+                round_win_percentage = sanitize_number(value.replace("%", ""))
+
+    # Extract Matches Played
+    matches_section = first(MATCHES_SPAN, root)
+    matches_played = sanitize_int(
+        text(matches_section).strip().replace("Matches", "")
+        if matches_section is not None
+        else "0"
+    )
+
+    # Extract Hours Played
+    playtime_section = first(PLAYTIME_SPAN, root)
+    playtime_hours = "0.0"
+    if playtime_section is not None:
+        hours_played_text = text(playtime_section).strip()
+        playtime_hours = sanitize_number(
+            hours_played_text.split("h")[0].strip()
+            if "h" in hours_played_text
+            else "0.0"
+        )
+
+    # Extract Main Stats
+    stats_dict = {}
+    for stat in ALL_STAT_DIVS(root):
+        name_span = first(NAME_SPAN, stat)
+        value_span = first(VALUE_SPAN, stat)
+        if name_span is not None and value_span is not None:
+            stat_name = name_span.get("title", "").strip()
+            value_text = text(value_span).strip().replace("%", "")
+            stats_dict[stat_name] = sanitize_number(value_text)
+
+    # Extract Wins
+    wins_section = next(
+        (
+            span
+            for span in ALL_SPANS(root)
+            if (string := single_string(span)) is not None
+            and WINS_PATTERN.search(string)
+        ),
+        None,
+    )
+    wins = sanitize_int(next_value(wins_section) if wins_section is not None else "0")
+
+    # Extract KD Ratio
+    kd_ratio_section = span_with_title(root, "K/D Ratio")
+    kd_ratio = sanitize_number(
+        next_value(kd_ratio_section) if kd_ratio_section is not None else "0.0"
+    )
+
+    # Extract Kills
+    kills_section = span_with_title(root, "Kills")
+    kills = sanitize_int(
+        text(VALUE_SPAN(NUMBERS_PARENT(kills_section)[0])[0]).strip()
+        if kills_section is not None
+        else "0"
+    )
+
+    # Extract Headshot %
+    headshot_section = span_with_title(root, "Headshot %")
+    headshot_percentage = sanitize_number(
+        next_value(headshot_section).replace("%", "")
+        if headshot_section is not None
+        else "0.0"
+    )
+
+    # Win Percentage
+    win_section = span_with_title(root, "Win %")
+    win_percentage = (
+        next_value(win_section).replace("%", "").strip()
+        if win_section is not None
+        else "0.0"
+    )
+
+    # Extract ACS (Average Combat Score)
+    acs_section = span_with_title(root, "ACS")
+    acs_value = sanitize_number(
+        next_value(acs_section) if acs_section is not None else "0.0"
+    )
+
+    # Extract individual stats
+    damage_per_round = float(stats_dict.get("Damage/Round", 0.0))
+    kast = float(stats_dict.get("KAST", 0.0))
+    ddr_per_round = float(stats_dict.get("DDΔ/Round", 0.0))
+    deaths = int(stats_dict.get("Deaths", 0))
+    assists = int(stats_dict.get("Assists", 0))
+    kad_ratio = float(stats_dict.get("KAD Ratio", 0.0))
+    kills_per_round = float(stats_dict.get("Kills/Round", 0.0))
+    first_bloods = int(stats_dict.get("First Bloods", 0))
+    flawless_rounds = int(stats_dict.get("Flawless Rounds", 0))
+    aces = int(stats_dict.get("Aces", 0))
+
+    return ValorantPlayerStats(
+        username=username,
+        platform="valorant",
+        season="All",
+        current_rank=current_rank,
+        current_rank_image_url=current_rank_image_url,
+        peak_rank=peak_rank,
+        peak_rank_image_url=peak_rank_image_url,
+        peak_rank_episode=peak_rank_episode,
+        tracker_score=tracker_score,
+        round_win_percentage=round_win_percentage,
+        playtime_hours=playtime_hours,
+        matches_played=matches_played,
+        damage_per_round=damage_per_round,
+        kd_ratio=kd_ratio,
+        headshot_percentage=headshot_percentage,
+        win_percentage=win_percentage,
+        wins=wins,
+        kast=kast,
+        ddr_per_round=ddr_per_round,
+        kills=kills,
+        deaths=deaths,
+        assists=assists,
+        acs=acs_value,
+        kad_ratio=kad_ratio,
+        kills_per_round=kills_per_round,
+        first_bloods=first_bloods,
+        flawless_rounds=flawless_rounds,
+        aces=aces,
+        top_weapons=parse_top_weapons(root),
+        top_maps=parse_top_maps(root),
+        roles=parse_roles(root),
+    )
+
+
+def parse_top_weapons(root: lxml.html.HtmlElement) -> List[Weapon]:
+    top_weapons = []
+    weapons_section = first(WEAPONS_SECTION, root)
+    if weapons_section is None:
+        return top_weapons
+
+    for weapon_div in WEAPON_DIVS(weapons_section):
+        name_div = first(WEAPON_NAME_DIV, weapon_div)
+        type_div = first(WEAPON_TYPE_DIV, weapon_div)
+        silhouette_img = first(WEAPON_SILHOUETTE_IMG, weapon_div)
+        accuracy_hits_div = first(WEAPON_ACCURACY_DIV, weapon_div)
+        main_stat_div = first(WEAPON_MAIN_STAT_DIV, weapon_div)
+
+        if (
+            name_div is None
+            or type_div is None
+            or silhouette_img is None
+            or accuracy_hits_div is None
+            or main_stat_div is None
+        ):
+            continue
+
+        top_weapons.append(
+            Weapon(
+                weapon_name=text(name_div).strip(),
+                weapon_type=text(type_div).strip(),
+                weapon_silhouette_url=silhouette_img.attrib["src"],
+                weapon_accuracy=[
+                    text(stat).strip() for stat in STAT_SPANS(accuracy_hits_div)
+                ],
+                weapon_kills=int(
+                    text(VALUE_SPAN(main_stat_div)[0]).replace(",", "").strip()
+                ),
+            )
+        )
+    return top_weapons
+
+
+def parse_top_maps(root: lxml.html.HtmlElement) -> List[MapStats]:
+    top_maps = []
+    top_maps_section = first(TOP_MAPS_SECTION, root)
+    if top_maps_section is None:
+        return top_maps
+
+    for map_div in MAP_DIVS(top_maps_section):
+        name_div = first(NAME_DIV, map_div)
+        info_div = first(INFO_DIV, map_div)
+        if name_div is None or info_div is None:
+            continue
+
+        # Extract the image URL from the style attribute
+        style = map_div.get("style")
+        map_image_url = None
+        if style:
+            match = MAP_IMAGE_PATTERN.search(style)
+            if match:
+                map_image_url = match.group(1)
+
+        top_maps.append(
+            MapStats(
+                map_name=text(name_div).strip(),
+                map_win_percentage=text(VALUE_DIV(info_div)[0])
+                .replace("%", "")
+                .strip(),
+                map_matches=text(LABEL_DIV(info_div)[0]).strip(),
+                map_image_url=map_image_url,
+            )
+        )
+    return top_maps
+
+
+def parse_roles(root: lxml.html.HtmlElement) -> List[Role]:
+    roles = []
+    roles_section = first(ROLES_SECTION, root)
+    if roles_section is None:
+        return roles
+
+    for role_div in ROLE_DIVS(roles_section):
+        role_name = text(ROLE_NAME_H5(role_div)[0]).strip()
+
+        role_image_tag = first(ROLE_ICON_IMG, role_div)
+        role_image_url = (
+            role_image_tag.attrib["src"] if role_image_tag is not None else None
+        )
+
+        role_stats = first(ROLE_STATS_DIV, role_div)
+        if role_stats is None:
+            continue
+
+        role_values = ROLE_VALUE_SPANS(role_stats)
+        role_subs = ROLE_SUB_SPANS(role_stats)
+
+        # Win rate, e.g. "Win% 54.2%"
+        role_win_rate = text(role_values[0]).strip().replace("%", "").split(" ")[1]
+
+        # Wins and Losses, e.g. "65W - 55L"
+        role_wins, role_losses = map(
+            int, re.findall(r"(\d+)W.*?(\d+)L", text(role_subs[0]).strip())[0]
+        )
+
+        # KDA, e.g. "KDA 1.45"
+        role_kda = float(text(role_values[1]).strip().split(" ")[1])
+
+        # Kills, Deaths, and Assists, e.g. "2,410 / 1,980 / 560"
+        kd_values = re.findall(r"\d{1,3}(?:,\d{3})*", text(role_subs[1]).strip())
+        role_kills = int(kd_values[0].replace(",", "")) if len(kd_values) > 0 else 0
+        role_deaths = int(kd_values[1].replace(",", "")) if len(kd_values) > 1 else 0
+        role_assists = int(kd_values[2].replace(",", "")) if len(kd_values) > 2 else 0
+
+        roles.append(
+            Role(
+                role_name=role_name,
+                role_win_rate=role_win_rate,
+                role_wins=role_wins,
+                role_losses=role_losses,
+                role_kda=role_kda,
+                role_kills=role_kills,
+                role_deaths=role_deaths,
+                role_assists=role_assists,
+                role_image_url=role_image_url,
+            )
+        )
+    return roles
+
+
+def parse_tft(page_content: str, username: str) -> TFTPlayerStats:
+    """Parse a Tracker.gg TFT overview page with lxml."""
+    root = parse_html(page_content)
+
+    # Rank
+    rank_section = first(PROGRESSION_SECTION, root)
+    rank = "Unknown"
+    lp = "0"
+
+    if rank_section is not None:
+        rank_text = first(HIGHLIGHT_TEXT_DIV, rank_section)
+        if rank_text is not None:
+            rank = text(rank_text).strip()
+
+        lp_section = first(PROGRESSION_SPAN, rank_section)
+        if lp_section is not None:
+            lp_text = (
+                text(lp_section)
+                .strip()
+                .replace("Tier Progress: ", "")
+                .replace(" LP", "")
+            )
+            lp = lp_text.strip().replace(",", "")
+
+    def stat_after(title: str, default: str) -> str:
+        section = span_with_title(root, title)
+        return next_value(section) if section is not None else default
+
+    wins = stat_after("Wins", "0").replace(",", "")
+    losses = stat_after("Losses", "0").replace(",", "")
+    win_percentage = stat_after("Win %", "0.0").replace("%", "").strip()
+    matches_played = stat_after("Matches Played", "0").replace(",", "")
+
+    return TFTPlayerStats(
+        username=username,
+        platform="tft",
+        current_rank=rank,
+        lp=int(lp) if lp.isdigit() else 0,
+        wins=int(wins) if wins.isdigit() else 0,
+        losses=int(losses) if losses.isdigit() else 0,
+        win_percentage=(
+            float(win_percentage)
+            if win_percentage.replace(".", "", 1).isdigit()
+            else 0.0
+        ),
+        matches_played=int(matches_played) if matches_played.isdigit() else 0,
+    )
@@ -0,0 +1,20 @@
+def sanitize_number(value: str) -> float:
+    """
+    Remove commas from a numeric string and convert it to a float.
+    Return 0.0 if the value cannot be converted.
+    """
+    try:
+        return float(value.replace(",", "").strip())
+    except (ValueError, AttributeError):
+        return 0.0
+
+
+def sanitize_int(value: str) -> int:
+    """
+    Remove commas from a numeric string and convert it to an integer.
+    Return 0 if the value cannot be converted.
+    """
+    try:
+        return int(value.replace(",", "").strip())
+    except (ValueError, AttributeError):
+        return 0
@@ -0,0 +1,295 @@
+import json
+import re
+from typing import Any, Dict, List, Optional
+from models.valorant_model import ValorantPlayerStats, Weapon, MapStats, Role
+
+# Tracker.gg pages ship the profile they render as a JSON blob assigned in an
+# inline script. Reading it directly skips the DOM walk entirely and gives the
+# raw values behind the rounded display text.
+
+INITIAL_STATE_PATTERN = re.compile(r"window\.__INITIAL_STATE__\s*=\s*")
+
+# Segment types in the profile payload
+OVERVIEW_SEGMENT_TYPES = ("season", "overview")
+WEAPON_SEGMENT_TYPE = "weapon"
+MAP_SEGMENT_TYPE = "map"
+ROLE_SEGMENT_TYPES = ("agent-role", "role")
+
+# Entries the overview page renders in each list. The payload carries a
+# segment for every weapon, map and role played, so the JSON path keeps only
+# as many as the DOM path can read.
+OVERVIEW_TOP_WEAPONS = 2
+OVERVIEW_TOP_MAPS = 2
+OVERVIEW_ROLES = 2
+
+# The rank card's label, which the overview puts before the current tier
+CURRENT_RANK_LABEL = "Rating"
+
+MS_PER_HOUR = 3_600_000
+
+_decoder = json.JSONDecoder()
+
+
+def extract_initial_state(page_content: str) -> Optional[dict]:
+    """Find and decode the embedded state object, or None if there isn't one."""
+    match = INITIAL_STATE_PATTERN.search(page_content)
+    if not match:
+        return None
+    try:
+        state, _ = _decoder.raw_decode(page_content, match.end())
+    except json.JSONDecodeError as e:
+        print(f"Could not decode embedded state: {e}")
+        return None
+    return state if isinstance(state, dict) else None
+
+
+def find_profile(node: Any) -> Optional[dict]:
+    """Depth-first search for the first object carrying profile segments."""
+    if isinstance(node, dict):
+        segments = node.get("segments")
+        if isinstance(segments, list) and segments:
+            return node
+        children = node.values()
+    elif isinstance(node, list):
+        children = node
+    else:
+        return None
+    for child in children:
+        profile = find_profile(child)
+        if profile is not None:
+            return profile
+    return None
+
+
+def stat_value(stats: dict, name: str) -> Any:
+    return (stats.get(name) or {}).get("value")
+
+
+def stat_metadata(stats: dict, name: str) -> dict:
+    return (stats.get(name) or {}).get("metadata") or {}
+
+
+def in_season(segment: dict, season: Optional[str]) -> bool:
+    """
+    Whether a segment belongs to the "current" or "all" season view. Segments
+    without a season attribute belong to both.
+    """
+    segment_season = (segment.get("attributes") or {}).get("season")
+    if season is None or segment_season is None:
+        return True
+    return (segment_season == "all") == (season == "all")
+
+
+def segments_of_type(
+    profile: dict, *types: str, season: Optional[str] = None
+) -> List[dict]:
+    return [
+        segment
+        for segment in profile["segments"]
+        if segment.get("type") in types and in_season(segment, season)
+    ]
+
+
+def pick_overview_segment(
+    profile: dict, season: Optional[str] = None
+) -> Optional[dict]:
+    """Prefer the competitive playlist, as the rendered overview does."""
+    segments = segments_of_type(profile, *OVERVIEW_SEGMENT_TYPES, season=season)
+    for segment in segments:
+        if (segment.get("attributes") or {}).get("playlist") == "competitive":
+            return segment
+    return segments[0] if segments else None
+
+
+def percentage(stats: dict, name: str) -> Optional[str]:
+    value = stat_value(stats, name)
+    return f"{value:.1f}" if value is not None else None
+
+
+def map_weapon(segment: dict) -> Optional[Weapon]:
+    metadata = segment.get("metadata") or {}
+    stats = segment.get("stats") or {}
+    kills = stat_value(stats, "kills")
+    if not metadata.get("name") or kills is None:
+        return None
+    return Weapon(
+        weapon_name=metadata["name"],
+        weapon_type=metadata.get("category", ""),
+        weapon_silhouette_url=metadata.get("imageUrl", ""),
+        weapon_accuracy=[
+            f"{stat_value(stats, name) or 0:.0f}%"
+            for name in (
+                "headshotsPercentage",
+                "bodyshotsPercentage",
+                "legshotsPercentage",
+            )
+        ],
+        weapon_kills=int(kills),
+    )
+
+
+def map_map_stats(segment: dict) -> Optional[MapStats]:
+    metadata = segment.get("metadata") or {}
+    stats = segment.get("stats") or {}
+    win_percentage = percentage(stats, "matchesWinPct")
+    if not metadata.get("name") or win_percentage is None:
+        return None
+    return MapStats(
+        map_name=metadata["name"],
+        map_win_percentage=win_percentage,
+        map_matches=(
+            f"{int(stat_value(stats, 'matchesWon') or 0)}W - "
+            f"{int(stat_value(stats, 'matchesLost') or 0)}L"
+        ),
+        map_image_url=metadata.get("imageUrl", ""),
+    )
+
+
+def map_role(segment: dict) -> Optional[Role]:
+    metadata = segment.get("metadata") or {}
+    stats = segment.get("stats") or {}
+    win_rate = percentage(stats, "matchesWinPct")
+    if not metadata.get("name") or win_rate is None:
+        return None
+    return Role(
+        role_name=metadata["name"],
+        role_win_rate=win_rate,
+        role_kda=float(stat_value(stats, "kDARatio") or 0.0),
+        role_wins=int(stat_value(stats, "matchesWon") or 0),
+        role_losses=int(stat_value(stats, "matchesLost") or 0),
+        role_kills=int(stat_value(stats, "kills") or 0),
+        role_deaths=int(stat_value(stats, "deaths") or 0),
+        role_assists=int(stat_value(stats, "assists") or 0),
+        role_image_url=metadata.get("imageUrl", ""),
+    )
+
+
+def current_rank_text(stats: dict) -> str:
+    """The current rank as the DOM path reads it, e.g. "Rating Ascendant 1"."""
+    tier_name = stat_metadata(stats, "rank").get("tierName")
+    if not tier_name:
+        return "Unknown"
+    return f"{CURRENT_RANK_LABEL} {tier_name}"
+
+
+def optional_int(value: Any) -> Optional[int]:
+    return int(value) if value is not None else None
+
+
+def map_valorant_profile(
+    profile: dict, username: str, season: Optional[str] = None
+) -> Optional[ValorantPlayerStats]:
+    """
+    Map a profile payload onto the stats model, or None if it has no overview.
+    `season` ("current" or "all") limits it to that season view's segments.
+    """
+    overview = pick_overview_segment(profile, season)
+    if overview is None:
+        return None
+    stats = overview.get("stats") or {}
+
+    rank = stat_metadata(stats, "rank")
+    peak_rank = stat_metadata(stats, "peakRank")
+    time_played = stat_value(stats, "timePlayed")
+
+    top_weapons = [
+        weapon
+        for weapon in map(
+            map_weapon, segments_of_type(profile, WEAPON_SEGMENT_TYPE, season=season)
+        )
+        if weapon is not None
+    ]
+    top_weapons.sort(key=lambda weapon: weapon.weapon_kills, reverse=True)
+
+    return ValorantPlayerStats(
+        username=username,
+        platform="valorant",
+        current_rank=current_rank_text(stats),
+        current_rank_image_url=rank.get("iconUrl"),
+        peak_rank=peak_rank.get("tierName", "Unknown"),
+        peak_rank_image_url=peak_rank.get("iconUrl"),
+        peak_rank_episode=peak_rank.get("actName", "N/A"),
+        tracker_score=optional_int(stat_value(stats, "trnPerformanceScore")),
+        round_win_percentage=stat_value(stats, "roundsWinPct"),
+        playtime_hours=(
+            round(time_played / MS_PER_HOUR, 2) if time_played is not None else 0.0
+        ),
+        matches_played=int(stat_value(stats, "matchesPlayed") or 0),
+        damage_per_round=stat_value(stats, "damagePerRound") or 0.0,
+        kd_ratio=stat_value(stats, "kDRatio") or 0.0,
+        headshot_percentage=stat_value(stats, "headshotsPercentage") or 0.0,
+        win_percentage=stat_value(stats, "matchesWinPct") or 0.0,
+        wins=int(stat_value(stats, "matchesWon") or 0),
+        kast=stat_value(stats, "kAST") or 0.0,
+        ddr_per_round=stat_value(stats, "dDDeltaPerRound") or 0.0,
+        kills=int(stat_value(stats, "kills") or 0),
+        deaths=int(stat_value(stats, "deaths") or 0),
+        assists=int(stat_value(stats, "assists") or 0),
+        acs=stat_value(stats, "scorePerRound") or 0.0,
+        kad_ratio=stat_value(stats, "kADRatio") or 0.0,
+        kills_per_round=stat_value(stats, "killsPerRound") or 0.0,
+        first_bloods=int(stat_value(stats, "firstBloods") or 0),
+        flawless_rounds=int(stat_value(stats, "flawless") or 0),
+        aces=int(stat_value(stats, "aces") or 0),
+        top_weapons=top_weapons[:OVERVIEW_TOP_WEAPONS],
+        top_maps=[
+            map_stats
+            for map_stats in map(
+                map_map_stats,
+                segments_of_type(profile, MAP_SEGMENT_TYPE, season=season),
+            )
+            if map_stats is not None
+        ][:OVERVIEW_TOP_MAPS],
+        roles=[
+            role
+            for role in map(
+                map_role, segments_of_type(profile, *ROLE_SEGMENT_TYPES, season=season)
+            )
+            if role is not None
+        ][:OVERVIEW_ROLES],
+    )
+
+
+def parse_valorant_state(
+    page_content: str, username: str, season: Optional[str] = None
+) -> Optional[ValorantPlayerStats]:
+    """
+    Build stats for `season` ("current" or "all") from the page's embedded
+    state, or None if it's missing. The state can carry both season views.
+    """
+    state = extract_initial_state(page_content)
+    if state is None:
+        return None
+    profile = find_profile(state)
+    if profile is None:
+        return None
+    try:
+        return map_valorant_profile(profile, username, season)
+    except (TypeError, ValueError, KeyError) as e:
+        print(f"Could not map embedded state for {username}: {e}")
+        return None
+
+
+def parse_valorant_state_seasons(
+    page_content: str, username: str
+) -> Optional[Dict[str, ValorantPlayerStats]]:
+    """
+    Build both the "current" and "all" season stats from one page's embedded
+    state. None unless the payload carries an all-seasons overview as well.
+    """
+    state = extract_initial_state(page_content)
+    profile = find_profile(state) if state is not None else None
+    if profile is None or not any(
+        (segment.get("attributes") or {}).get("season") == "all"
+        for segment in segments_of_type(profile, *OVERVIEW_SEGMENT_TYPES)
+    ):
+        return None
+    try:
+        seasons = {
+            season: map_valorant_profile(profile, username, season)
+            for season in ("current", "all")
+        }
+    except (TypeError, ValueError, KeyError) as e:
+        print(f"Could not map embedded state for {username}: {e}")
+        return None
+    return seasons if all(seasons.values()) else None
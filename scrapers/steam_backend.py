@@ -0,0 +1,112 @@
+import asyncio
+import aiohttp
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Dict, List, Optional
+from http_client import http_sessions
+from metrics import UPSTREAM_ERRORS, UPSTREAM_REQUEST_SECONDS, error_reason, observe
+from tracing import span
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+STEAM_API_KEY = os.getenv("STEAM_API_KEY")
+STEAM_API_URL = os.getenv("STEAM_API_URL", "http://api.steampowered.com")
+
+
+class SteamBackend(ABC):
+    """Interface for the Steam Web API calls the scrapers depend on."""
+
+    @abstractmethod
+    async def get_player_summaries(self, steam_ids: List[str]) -> List[dict]:
+        """Return the player summaries found for the given Steam IDs."""
+
+    @abstractmethod
+    async def get_user_stats_for_game(
+        self, steam_id: str, app_id: str
+    ) -> Optional[list]:
+        """Return a player's raw stats list for a game, or None."""
+
+
+class SteamWebAPI(SteamBackend):
+    """Steam backend that calls the public Steam Web API."""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: str = STEAM_API_URL,
+        session: Optional[aiohttp.ClientSession] = None,
+    ):
+        self.api_key = api_key or STEAM_API_KEY
+        self.base_url = base_url.rstrip("/")
+        self.session = session
+
+    async def _get_json(self, path: str, params: dict) -> Optional[dict]:
+        session = self.session or http_sessions.get("steam")
+        url = f"{self.base_url}/{path}"
+        # The endpoint name, e.g. GetPlayerSummaries
+        target = path.split("/")[1]
+        try:
+            with span(f"steam.{target}") as current, observe(
+                UPSTREAM_REQUEST_SECONDS, upstream="steam", target=target
+            ):
+                async with session.get(
+                    url, params={"key": self.api_key, **params}
+                ) as response:
+                    current.set_attribute("http.response.status_code", response.status)
+                    if response.status == 200:
+                        return await response.json()
+        except Exception as e:
+            UPSTREAM_ERRORS.labels("steam", target, error_reason(e)).inc()
+            raise
+        UPSTREAM_ERRORS.labels("steam", target, str(response.status)).inc()
+        return None
+
+    async def get_player_summaries(self, steam_ids: List[str]) -> List[dict]:
+        data = await self._get_json(
+            "ISteamUser/GetPlayerSummaries/v0002/",
+            {"steamids": ",".join(steam_ids)},
+        )
+        if data and "response" in data and "players" in data["response"]:
+            return data["response"]["players"]
+        return []
+
+    async def get_user_stats_for_game(
+        self, steam_id: str, app_id: str
+    ) -> Optional[list]:
+        data = await self._get_json(
+            "ISteamUserStats/GetUserStatsForGame/v0002/",
+            {"appid": app_id, "steamid": steam_id},
+        )
+        if data and "playerstats" in data and "stats" in data["playerstats"]:
+            return data["playerstats"]["stats"]
+        return None
+
+
+async def fan_out(calls: Dict[str, Awaitable[Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Run independent Steam calls concurrently and return their results by name.
+
+    If any call raises, the others are cancelled and the error propagates. If
+    any call comes back empty, the others are cancelled and None is returned.
+    """
+    tasks = {name: asyncio.ensure_future(call) for name, call in calls.items()}
+    names = {task: name for name, task in tasks.items()}
+    try:
+        pending = set(tasks.values())
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if not task.result():
+                    print(f"No data returned for Steam call '{names[task]}'.")
+                    return None
+        return {name: task.result() for name, task in tasks.items()}
+    finally:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+
+steam_backend = SteamWebAPI()
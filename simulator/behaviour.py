@@ -0,0 +1,333 @@
+import asyncio
+import math
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Tuple
+
+# Ways a simulated upstream can answer a request
+OUTCOMES = ("ok", "error", "challenge", "rate_limited", "timeout")
+
+# Settings every upstream starts with; see Upstream.configure
+DEFAULT_SETTINGS = {
+    "latency": "fixed:0",
+    "error_rate": 0.0,
+    "challenge_rate": 0.0,
+    "rate_limit_rate": 0.0,
+    "timeout_rate": 0.0,
+    "rate_limit_per_second": 0.0,
+    "max_concurrency": 0,
+    "timeout_after": 60.0,
+}
+
+# Share of requests given each outcome other than "ok"
+RATE_SETTINGS = {
+    "error_rate": "error",
+    "challenge_rate": "challenge",
+    "rate_limit_rate": "rate_limited",
+    "timeout_rate": "timeout",
+}
+
+# Named settings for both upstreams, modelled on what production has seen
+SCENARIOS: Dict[str, Dict[str, dict]] = {
+    # No delay at all, to find the API's own throughput ceiling
+    "instant": {"flaresolverr": {}, "steam": {}},
+    # A healthy FlareSolverr renders a page in a few seconds
+    "healthy": {
+        "flaresolverr": {"latency": "lognormal:4,0.35", "max_concurrency": 8},
+        "steam": {"latency": "lognormal:0.15,0.4"},
+    },
+    "degraded": {
+        "flaresolverr": {
+            "latency": "lognormal:8,0.6",
+            "max_concurrency": 8,
+            "error_rate": 0.05,
+            "challenge_rate": 0.05,
+        },
+        "steam": {"latency": "lognormal:0.4,0.8", "error_rate": 0.02},
+    },
+    # Browsers saturated: page loads queue, the tail times out
+    "overloaded": {
+        "flaresolverr": {
+            "latency": "pareto:3,1.5",
+            "max_concurrency": 4,
+            "timeout_rate": 0.1,
+            "timeout_after": 60,
+        },
+        "steam": {"latency": "lognormal:0.3,0.6", "rate_limit_per_second": 10},
+    },
+    # Cloudflare rejecting most solves
+    "cloudflare": {
+        "flaresolverr": {"latency": "lognormal:6,0.4", "challenge_rate": 0.5},
+        "steam": {"latency": "lognormal:0.15,0.4"},
+    },
+    "rate_limited": {
+        "flaresolverr": {"latency": "lognormal:4,0.35", "rate_limit_per_second": 2},
+        "steam": {"latency": "lognormal:0.15,0.4", "rate_limit_per_second": 5},
+    },
+}
+
+
+class Latency:
+    """
+    A latency distribution in seconds, written as "kind:param,...":
+
+        fixed:S              always S (a bare number means the same)
+        uniform:LOW,HIGH     evenly spread between LOW and HIGH
+        normal:MEAN,STDDEV   clamped at zero
+        lognormal:MEDIAN,SIGMA
+        exponential:MEAN
+        pareto:MIN,ALPHA     heavy tailed, never below MIN
+    """
+
+    PARAMS = {
+        "fixed": 1,
+        "uniform": 2,
+        "normal": 2,
+        "lognormal": 2,
+        "exponential": 1,
+        "pareto": 2,
+    }
+
+    def __init__(self, kind: str, params: Tuple[float, ...]):
+        if kind not in self.PARAMS:
+            raise ValueError(f"Unknown latency distribution '{kind}'.")
+        if len(params) != self.PARAMS[kind]:
+            raise ValueError(
+                f"'{kind}' latency takes {self.PARAMS[kind]} parameter(s)."
+            )
+        if any(param < 0 for param in params):
+            raise ValueError("Latency parameters can't be negative.")
+        if kind == "pareto" and params[1] <= 0:
+            raise ValueError("Pareto latency needs a positive ALPHA.")
+        self.kind = kind
+        self.params = params
+
+    @classmethod
+    def parse(cls, spec) -> "Latency":
+        if isinstance(spec, (int, float)):
+            return cls("fixed", (float(spec),))
+        kind, _, params = str(spec).partition(":")
+        if not params:
+            kind, params = "fixed", kind
+        try:
+            values = tuple(float(param) for param in params.split(","))
+        except ValueError:
+            raise ValueError(f"Invalid latency '{spec}'.") from None
+        return cls(kind.strip().lower(), values)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+        if self.kind == "normal":
+            return max(rng.gauss(*self.params), 0.0)
+        if self.kind == "lognormal":
+            median, sigma = self.params
+            return median * math.exp(rng.gauss(0, sigma)) if median else 0.0
+        if self.kind == "exponential":
+            mean = self.params[0]
+            return rng.expovariate(1 / mean) if mean else 0.0
+        minimum, alpha = self.params
+        return minimum * rng.paretovariate(alpha)
+
+    def __str__(self) -> str:
+        return f"{self.kind}:{','.join(f'{param:g}' for param in self.params)}"
+
+
+class Upstream:
+    """
+    One simulated upstream: how it misbehaves, and what it has served.
+
+    Each request first takes a token from the per-second rate limit, if one
+    is set, then waits for one of `max_concurrency` slots the way a browser
+    farm queues page loads. Its outcome is drawn from the configured rates.
+    Settings can be changed while requests are in flight.
+    """
+
+    def __init__(
+        self, name: str, rng: random.Random, outcomes: Tuple[str, ...] = OUTCOMES
+    ):
+        self.name = name
+        self.rng = rng
+        self.outcomes = outcomes
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.latency = Latency.parse(self.settings["latency"])
+        self._tokens = 0.0
+        self._refilled_at = time.monotonic()
+        self._in_flight = 0
+        self._slot_freed = asyncio.Condition()
+        self.reset_stats()
+
+    def configure(self, changes: dict) -> None:
+        """Apply new settings, all or none of them. Raises ValueError."""
+        settings = self.validate(changes)
+        if settings["rate_limit_per_second"] != self.settings["rate_limit_per_second"]:
+            self._tokens = settings["rate_limit_per_second"]
+            self._refilled_at = time.monotonic()
+        self.settings = settings
+        self.latency = Latency.parse(settings["latency"])
+
+    def validate(self, changes: dict) -> dict:
+        """The settings `changes` would result in. Raises ValueError."""
+        unknown = [key for key in changes if key not in DEFAULT_SETTINGS]
+        if unknown:
+            raise ValueError(f"Unknown {self.name} settings: {', '.join(unknown)}.")
+
+        settings = {**self.settings, **changes}
+        latency = Latency.parse(settings["latency"])
+        try:
+            for key in DEFAULT_SETTINGS:
+                if key != "latency":
+                    settings[key] = float(settings[key])
+        except (TypeError, ValueError):
+            raise ValueError(f"{self.name} settings must be numbers.") from None
+        settings["max_concurrency"] = int(settings["max_concurrency"])
+        settings["latency"] = str(latency)
+
+        for key, outcome in RATE_SETTINGS.items():
+            if not 0 <= settings[key] <= 1:
+                raise ValueError(f"{key} must be between 0 and 1.")
+            if settings[key] and outcome not in self.outcomes:
+                raise ValueError(f"{self.name} has no '{outcome}' responses.")
+        if sum(settings[key] for key in RATE_SETTINGS) > 1:
+            raise ValueError("The rates add up to more than 1.")
+        if min(settings[key] for key in DEFAULT_SETTINGS if key != "latency") < 0:
+            raise ValueError(f"{self.name} settings can't be negative.")
+        return settings
+
+    def reset_stats(self) -> None:
+        self.requests = 0
+        self.outcome_counts = {outcome: 0 for outcome in self.outcomes}
+        self.peak_in_flight = 0
+        self.queued = 0
+        self.peak_queued = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def stats(self) -> dict:
+        completed = sum(self.outcome_counts.values())
+        return {
+            "requests": self.requests,
+            "outcomes": dict(self.outcome_counts),
+            "in_flight": self._in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "queued": self.queued,
+            "peak_queued": self.peak_queued,
+            "mean_ms": self.total_time / completed * 1000 if completed else 0.0,
+            "max_ms": self.max_time * 1000,
+        }
+
+    def delay(self) -> float:
+        """Seconds this response should take, from the latency distribution."""
+        return self.latency.sample(self.rng)
+
+    @asynccontextmanager
+    async def serve(self) -> AsyncIterator[str]:
+        """Admit a request and yield the outcome it should get."""
+        started = time.monotonic()
+        self.requests += 1
+        outcome = None
+        try:
+            if not self._take_token():
+                outcome = "rate_limited"
+                yield outcome
+                return
+
+            await self._acquire_slot()
+            try:
+                outcome = self._draw()
+                yield outcome
+            finally:
+                await self._release_slot()
+        finally:
+            if outcome is not None:
+                self.outcome_counts[outcome] += 1
+                elapsed = time.monotonic() - started
+                self.total_time += elapsed
+                self.max_time = max(self.max_time, elapsed)
+
+    def _take_token(self) -> bool:
+        rate = self.settings["rate_limit_per_second"]
+        if not rate:
+            return True
+        now = time.monotonic()
+        self._tokens = min(self._tokens + (now - self._refilled_at) * rate, rate)
+        self._refilled_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    async def _acquire_slot(self) -> None:
+        self.queued += 1
+        self.peak_queued = max(self.peak_queued, self.queued)
+        try:
+            async with self._slot_freed:
+                await self._slot_freed.wait_for(self._has_free_slot)
+                self._in_flight += 1
+        finally:
+            self.queued -= 1
+        self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+
+    async def _release_slot(self) -> None:
+        async with self._slot_freed:
+            self._in_flight -= 1
+            self._slot_freed.notify_all()
+
+    def _has_free_slot(self) -> bool:
+        limit = self.settings["max_concurrency"]
+        return not limit or self._in_flight < limit
+
+    def _draw(self) -> str:
+        roll = self.rng.random()
+        for key, outcome in RATE_SETTINGS.items():
+            roll -= self.settings[key]
+            if roll < 0:
+                return outcome
+        return "ok"
+
+
+def apply_scenario(upstreams: Dict[str, Upstream], name: str) -> None:
+    """Reset every upstream, then apply a named scenario. Raises ValueError."""
+    scenario = SCENARIOS.get(name)
+    if scenario is None:
+        raise ValueError(f"Unknown scenario '{name}'.")
+    for upstream_name, upstream in upstreams.items():
+        upstream.configure({**DEFAULT_SETTINGS, **scenario.get(upstream_name, {})})
+
+
+def configure_all(upstreams: Dict[str, Upstream], changes: dict) -> None:
+    """
+    Apply {"upstream": {"setting": value}} changes, checking all of them
+    before applying any. Raises ValueError.
+    """
+    unknown = [name for name in changes if name not in upstreams]
+    if unknown:
+        raise ValueError(f"Unknown upstreams: {', '.join(unknown)}.")
+    for name, settings in changes.items():
+        if not isinstance(settings, dict):
+            raise ValueError(f"Settings for {name} must be an object.")
+        upstreams[name].validate(settings)
+    for name, settings in changes.items():
+        upstreams[name].configure(settings)
+
+
+def parse_overrides(overrides: List[str]) -> Dict[str, dict]:
+    """Turn "upstream.setting=value" strings into configure_all changes."""
+    changes: Dict[str, dict] = {}
+    for override in overrides:
+        key, separator, value = override.partition("=")
+        upstream, dot, setting = key.partition(".")
+        if not separator or not dot:
+            raise ValueError(f"Expected upstream.setting=value, got '{override}'.")
+        changes.setdefault(upstream.strip(), {})[setting.strip()] = value.strip()
+    return changes
+
+
+def describe(upstreams: Dict[str, Upstream], stats: bool = False) -> Dict[str, dict]:
+    return {
+        name: upstream.stats() if stats else dict(upstream.settings)
+        for name, upstream in upstreams.items()
+    }
@@ -0,0 +1,432 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit, parse_qs
+
+from aiohttp import web
+
+from simulator.behaviour import (
+    SCENARIOS,
+    Upstream,
+    apply_scenario,
+    configure_all,
+    describe,
+    parse_overrides,
+)
+
+# Recorded pages and Steam responses served in place of the real ones
+DEFAULT_FIXTURES_DIR = (
+    Path(__file__).resolve().parent.parent / "benchmarks" / "fixtures"
+)
+
+SIMULATOR_USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/126.0.0.0 Safari/537.36"
+)
+
+# What Cloudflare serves instead of the page when a challenge isn't solved
+CHALLENGE_PAGE = """<!DOCTYPE html><html lang="en-US"><head>
+<title>Just a moment...</title>
+<meta http-equiv="refresh" content="390">
+<script>window._cf_chl_opt={cvId:'3',cZone:'tracker.gg',cType:'managed'};</script>
+</head><body><div class="main-wrapper" role="main">
+<div id="challenge-platform"></div>
+<noscript><div class="cf-chl-noscript">Enable JavaScript and cookies to continue</div></noscript>
+</div></body></html>"""
+
+# Cloudflare's 1015 page, served when a client is rate limited
+RATE_LIMITED_PAGE = """<!DOCTYPE html><html lang="en-US"><head>
+<title>Access denied | tracker.gg used Cloudflare to restrict access</title>
+</head><body><div id="cf-wrapper"><h1>Error 1015</h1>
+<h2>You are being rate limited</h2>
+<p>The owner of this website (tracker.gg) has banned you temporarily from
+accessing this website.</p></div></body></html>"""
+
+
+class Fixtures:
+    """The fixture corpus, read once and served from memory."""
+
+    def __init__(self, directory: Path = DEFAULT_FIXTURES_DIR):
+        self.directory = Path(directory)
+        self.pages = {
+            name: (self.directory / f"{name}.html").read_text()
+            for name in ("valorant_current", "valorant_all", "tft")
+        }
+        self.player_summaries = json.loads(
+            (self.directory / "steam_player_summaries.json").read_text()
+        )
+        self.user_stats = json.loads(
+            (self.directory / "steam_user_stats.json").read_text()
+        )
+
+    def page_for(self, url: str) -> Optional[str]:
+        """The recorded page standing in for a Tracker.gg URL."""
+        parts = urlsplit(url)
+        if "/tft/" in parts.path:
+            return self.pages["tft"]
+        if "/valorant/" in parts.path:
+            season = parse_qs(parts.query).get("season", ["current"])[0]
+            return self.pages["valorant_all" if season == "all" else "valorant_current"]
+        return None
+
+
+class FlareSolverrSimulator:
+    """
+    Speaks the FlareSolverr v1 protocol (`request.get` and `sessions.*`),
+    answering page loads from the fixtures as the upstream's settings say:
+    after a sampled latency, with an error, a timeout, a Cloudflare challenge
+    page or Cloudflare's rate limit page.
+
+    Commands are checked the way FlareSolverr checks them, and malformed ones
+    are counted as protocol errors so a load test can tell the API sent them.
+    """
+
+    def __init__(self, fixtures: Fixtures, upstream: Upstream):
+        self.fixtures = fixtures
+        self.upstream = upstream
+        self.sessions: Dict[str, float] = {}
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.sessions_created = 0
+        self.sessions_destroyed = 0
+        self.protocol_errors = 0
+
+    def stats(self) -> dict:
+        return {
+            **self.upstream.stats(),
+            "sessions": len(self.sessions),
+            "sessions_created": self.sessions_created,
+            "sessions_destroyed": self.sessions_destroyed,
+            "protocol_errors": self.protocol_errors,
+        }
+
+    async def handle(self, request: web.Request) -> web.Response:
+        try:
+            payload = await request.json()
+        except json.JSONDecodeError:
+            return self.protocol_error("Request body is not valid JSON.")
+        if not isinstance(payload, dict):
+            return self.protocol_error("Request body must be a JSON object.")
+
+        cmd = payload.get("cmd")
+        if cmd == "request.get":
+            return await self.request_get(payload)
+        if cmd == "sessions.create":
+            session_id = payload.get("session") or str(uuid.uuid4())
+            if session_id in self.sessions:
+                return ok_response("Session already exists.", session=session_id)
+            self.sessions[session_id] = time.time()
+            self.sessions_created += 1
+            return ok_response("Session created successfully.", session=session_id)
+        if cmd == "sessions.destroy":
+            if self.sessions.pop(payload.get("session"), None) is None:
+                return self.protocol_error("The session doesn't exist.")
+            self.sessions_destroyed += 1
+            return ok_response("The session has been removed.")
+        if cmd == "sessions.list":
+            return ok_response("", sessions=list(self.sessions))
+        return self.protocol_error(f"Request parameter 'cmd' = '{cmd}' is invalid.")
+
+    async def request_get(self, payload: dict) -> web.Response:
+        started = time.time()
+        url = payload.get("url")
+        if not url:
+            return self.protocol_error(
+                "Request parameter 'url' is mandatory in 'request.get' command."
+            )
+        if "postData" in payload:
+            return self.protocol_error(
+                "Cannot use 'postBody' when sending a GET request."
+            )
+        session_id = payload.get("session")
+        if session_id is not None and session_id not in self.sessions:
+            return self.protocol_error("This session does not exist.")
+        page = self.fixtures.page_for(url)
+        if page is None:
+            return error_response(f"No fixture for {url}.")
+        max_timeout = float(payload.get("maxTimeout", 60000)) / 1000
+
+        async with self.upstream.serve() as outcome:
+            if outcome == "rate_limited":
+                return self.solution(url, 429, RATE_LIMITED_PAGE, started)
+            if outcome == "timeout":
+                timeout = min(self.upstream.settings["timeout_after"], max_timeout)
+                await asyncio.sleep(timeout)
+                return error_response(
+                    f"Error: Error solving the challenge. Timeout after {timeout} seconds."
+                )
+
+            await asyncio.sleep(self.upstream.delay())
+            if outcome == "error":
+                return error_response(
+                    "Error: Unable to process browser request. "
+                    "ProtocolException: Browser closed unexpectedly."
+                )
+            if outcome == "challenge":
+                return self.solution(url, 403, CHALLENGE_PAGE, started)
+            return self.solution(url, 200, page, started)
+
+    def solution(
+        self, url: str, status: int, page: str, started: float
+    ) -> web.Response:
+        return ok_response(
+            "Challenge not detected!" if status == 200 else "Challenge detected!",
+            solution={
+                "url": url,
+                "status": status,
+                "headers": {},
+                "response": page,
+                # No cf_clearance, so the API never tries a direct fetch
+                "cookies": [],
+                "userAgent": SIMULATOR_USER_AGENT,
+            },
+            startTimestamp=int(started * 1000),
+            endTimestamp=int(time.time() * 1000),
+        )
+
+    def protocol_error(self, message: str) -> web.Response:
+        self.protocol_errors += 1
+        return error_response(message)
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok"})
+
+
+class SteamSimulator:
+    """
+    The two Steam Web API calls the CS2 scraper makes, answered from the
+    fixtures for any Steam ID as the upstream's settings say.
+    """
+
+    def __init__(self, fixtures: Fixtures, upstream: Upstream):
+        self.fixtures = fixtures
+        self.upstream = upstream
+
+    def stats(self) -> dict:
+        return self.upstream.stats()
+
+    async def player_summaries(self, request: web.Request) -> web.Response:
+        template = self.fixtures.player_summaries["response"]["players"][0]
+        steam_ids = [
+            steam_id
+            for steam_id in request.query.get("steamids", "").split(",")
+            if steam_id
+        ]
+        players = [{**template, "steamid": steam_id} for steam_id in steam_ids]
+        return await self.respond(request, {"response": {"players": players}})
+
+    async def user_stats(self, request: web.Request) -> web.Response:
+        playerstats = {
+            **self.fixtures.user_stats["playerstats"],
+            "steamID": request.query.get("steamid", ""),
+        }
+        return await self.respond(request, {"playerstats": playerstats})
+
+    async def respond(self, request: web.Request, data: dict) -> web.Response:
+        if not request.query.get("key"):
+            return web.Response(status=403, text="Forbidden")
+
+        async with self.upstream.serve() as outcome:
+            if outcome == "rate_limited":
+                return web.Response(
+                    status=429, text="Too Many Requests", headers={"Retry-After": "1"}
+                )
+            if outcome == "timeout":
+                await asyncio.sleep(self.upstream.settings["timeout_after"])
+                return web.Response(status=504, text="Gateway Timeout")
+
+            await asyncio.sleep(self.upstream.delay())
+            if outcome == "error":
+                return web.Response(status=500, text="Internal Server Error")
+            return web.json_response(data)
+
+
+class SimulatorControl:
+    """
+    Runtime control of the simulator, so a scenario can be changed in the
+    middle of a load test:
+
+        GET    /simulator/config            current settings
+        PATCH  /simulator/config            {"flaresolverr": {"error_rate": 0.2}}
+        GET    /simulator/scenarios         the named scenarios
+        POST   /simulator/scenarios/{name}  reset and apply one
+        GET    /simulator/stats             what each upstream has served
+        DELETE /simulator/stats             reset the counters
+    """
+
+    def __init__(
+        self,
+        upstreams: Dict[str, Upstream],
+        flaresolverr: FlareSolverrSimulator,
+        steam: SteamSimulator,
+    ):
+        self.upstreams = upstreams
+        self.flaresolverr = flaresolverr
+        self.steam = steam
+
+    async def get_config(self, request: web.Request) -> web.Response:
+        return web.json_response(describe(self.upstreams))
+
+    async def patch_config(self, request: web.Request) -> web.Response:
+        try:
+            changes = await request.json()
+            if not isinstance(changes, dict):
+                raise ValueError("Expected an object of upstream settings.")
+            configure_all(self.upstreams, changes)
+        except (json.JSONDecodeError, ValueError) as e:
+            return web.json_response({"detail": str(e)}, status=400)
+        return web.json_response(describe(self.upstreams))
+
+    async def list_scenarios(self, request: web.Request) -> web.Response:
+        return web.json_response(SCENARIOS)
+
+    async def apply_scenario(self, request: web.Request) -> web.Response:
+        try:
+            apply_scenario(self.upstreams, request.match_info["name"])
+        except ValueError as e:
+            return web.json_response({"detail": str(e)}, status=404)
+        return web.json_response(describe(self.upstreams))
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {"flaresolverr": self.flaresolverr.stats(), "steam": self.steam.stats()}
+        )
+
+    async def reset_stats(self, request: web.Request) -> web.Response:
+        for upstream in self.upstreams.values():
+            upstream.reset_stats()
+        self.flaresolverr.reset_stats()
+        return web.json_response({"status": "ok"})
+
+
+def ok_response(message: str, **fields) -> web.Response:
+    return web.json_response(
+        {"status": "ok", "message": message, "version": "simulator", **fields}
+    )
+
+
+def error_response(message: str) -> web.Response:
+    return web.json_response(
+        {"status": "error", "message": message, "version": "simulator"}, status=500
+    )
+
+
+def create_app(
+    fixtures_dir: Path = DEFAULT_FIXTURES_DIR,
+    page_latency=None,
+    steam_latency=None,
+    scenario: Optional[str] = None,
+    overrides: Optional[List[str]] = None,
+    seed: Optional[int] = None,
+) -> web.Application:
+    """
+    One app serving both upstreams: point FLARESOLVERR_URLS at `/v1` and
+    STEAM_API_URL at the root. The scenario is applied first, then the
+    latencies, then "upstream.setting=value" overrides. Raises ValueError on
+    invalid settings.
+    """
+    rng = random.Random(seed)
+    upstreams = {
+        "flaresolverr": Upstream("flaresolverr", rng),
+        "steam": Upstream(
+            "steam", rng, outcomes=("ok", "error", "rate_limited", "timeout")
+        ),
+    }
+    if scenario is not None:
+        apply_scenario(upstreams, scenario)
+    if page_latency is not None:
+        upstreams["flaresolverr"].configure({"latency": page_latency})
+    if steam_latency is not None:
+        upstreams["steam"].configure({"latency": steam_latency})
+    configure_all(upstreams, parse_overrides(overrides or []))
+
+    fixtures = Fixtures(fixtures_dir)
+    flaresolverr = FlareSolverrSimulator(fixtures, upstreams["flaresolverr"])
+    steam = SteamSimulator(fixtures, upstreams["steam"])
+    control = SimulatorControl(upstreams, flaresolverr, steam)
+
+    app = web.Application()
+    app.router.add_post("/v1", flaresolverr.handle)
+    app.router.add_get("/health", flaresolverr.health)
+    app.router.add_get("/ISteamUser/GetPlayerSummaries/v0002/", steam.player_summaries)
+    app.router.add_get("/ISteamUserStats/GetUserStatsForGame/v0002/", steam.user_stats)
+    app.router.add_get("/simulator/config", control.get_config)
+    app.router.add_patch("/simulator/config", control.patch_config)
+    app.router.add_get("/simulator/scenarios", control.list_scenarios)
+    app.router.add_post("/simulator/scenarios/{name}", control.apply_scenario)
+    app.router.add_get("/simulator/stats", control.get_stats)
+    app.router.add_delete("/simulator/stats", control.reset_stats)
+    return app
+
+
+async def start_simulator(
+    host: str = "127.0.0.1", port: int = 0, **options
+) -> web.AppRunner:
+    """Serve the simulator on the running loop; port 0 picks a free one."""
+    runner = web.AppRunner(create_app(**options), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    return runner
+
+
+def simulator_url(runner: web.AppRunner) -> str:
+    host, port = runner.addresses[0][:2]
+    return f"http://{host}:{port}"
+
+
+def add_behaviour_arguments(parser: argparse.ArgumentParser) -> None:
+    """The options that shape the simulator, shared with the load test."""
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS))
+    parser.add_argument(
+        "--page-latency", help="Page load latency, e.g. 0.5 or lognormal:4,0.35"
+    )
+    parser.add_argument("--steam-latency", help="Steam call latency, same format")
+    parser.add_argument(
+        "--set",
+        dest="overrides",
+        action="append",
+        default=[],
+        metavar="UPSTREAM.SETTING=VALUE",
+        help="e.g. flaresolverr.error_rate=0.1, repeatable",
+    )
+    parser.add_argument("--seed", type=int, help="Seed for reproducible runs")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Local stand-in for FlareSolverr and the Steam Web API."
+    )
+    parser.add_argument("--host", default=os.getenv("SIMULATOR_HOST", "127.0.0.1"))
+    parser.add_argument(
+        "--port", type=int, default=int(os.getenv("SIMULATOR_PORT", "8191"))
+    )
+    parser.add_argument("--fixtures", type=Path, default=DEFAULT_FIXTURES_DIR)
+    add_behaviour_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        app = create_app(
+            args.fixtures,
+            page_latency=args.page_latency,
+            steam_latency=args.steam_latency,
+            scenario=args.scenario,
+            overrides=args.overrides,
+            seed=args.seed,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(f"Simulator listening on http://{args.host}:{args.port}")
+    web.run_app(app, host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import asyncio
+import os
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Coalesce across workers as well, using a Redis lock per key
+SINGLEFLIGHT_REDIS_LOCK = (
+    os.getenv("SINGLEFLIGHT_REDIS_LOCK", "false").lower() == "true"
+)
+
+# How long a worker may hold the lock before others stop waiting on it
+SINGLEFLIGHT_LOCK_TTL = float(os.getenv("SINGLEFLIGHT_LOCK_TTL", "90"))
+SINGLEFLIGHT_POLL_INTERVAL = float(os.getenv("SINGLEFLIGHT_POLL_INTERVAL", "0.25"))
+
+SINGLEFLIGHT_KEY_PREFIX = "tracker:singleflight"
+
+# Only delete the lock if we still own it
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one upstream call.
+
+    Within a worker, callers for a key in flight await the same task. With
+    SINGLEFLIGHT_REDIS_LOCK enabled, the first worker to take the Redis lock
+    for a key does the work; other workers wait for the lock to be released
+    and then pick up the result through `wait_result` (usually a cache read).
+    """
+
+    def __init__(self):
+        self.redis = None
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    def init(self, redis_client) -> None:
+        if SINGLEFLIGHT_REDIS_LOCK:
+            self.redis = redis_client
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        wait_result: Optional[Callable[[], Awaitable[Optional[T]]]] = None,
+    ) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run(key, fn, wait_result))
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # Shield the shared task so one caller going away doesn't cancel it for
+        # everyone else waiting on the same key
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Retrieve the exception so an abandoned failed task isn't logged
+        if not task.cancelled():
+            task.exception()
+
+    async def _run(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        wait_result: Optional[Callable[[], Awaitable[Optional[T]]]],
+    ) -> T:
+        if self.redis is None:
+            return await fn()
+
+        lock_key = f"{SINGLEFLIGHT_KEY_PREFIX}:{key}"
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self.redis.set(
+                lock_key, token, nx=True, px=int(SINGLEFLIGHT_LOCK_TTL * 1000)
+            )
+        except RedisError as e:
+            print(f"Single-flight lock failed for {key}: {e}")
+            return await fn()
+
+        if acquired:
+            try:
+                return await fn()
+            finally:
+                try:
+                    await self.redis.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+                except RedisError as e:
+                    print(f"Single-flight unlock failed for {key}: {e}")
+
+        # Another worker is fetching, wait for it to finish and reuse its result
+        deadline = time.monotonic() + SINGLEFLIGHT_LOCK_TTL
+        try:
+            while time.monotonic() < deadline and await self.redis.exists(lock_key):
+                await asyncio.sleep(SINGLEFLIGHT_POLL_INTERVAL)
+        except RedisError as e:
+            print(f"Single-flight wait failed for {key}: {e}")
+
+        if wait_result is not None:
+            result = await wait_result()
+            if result is not None:
+                return result
+        return await fn()
@@ -0,0 +1,29 @@
+from flaresolverr_sessions import is_challenge
+
+# The beacon Cloudflare adds to ordinary pages on protected sites
+BEACON_PAGE = (
+    "<html><head><title>Tracker</title></head><body>stats"
+    '<script src="/cdn-cgi/challenge-platform/scripts/jsd/main.js"></script>'
+    "</body></html>"
+)
+CHALLENGE_PAGE = (
+    "<html><head><title>Just a moment...</title>"
+    "<script>window._cf_chl_opt={cType:'managed'};</script></head></html>"
+)
+
+
+def test_page_with_challenge_platform_beacon_is_not_a_challenge():
+    assert not is_challenge(200, {}, BEACON_PAGE)
+
+
+def test_challenge_page_with_challenge_status():
+    assert is_challenge(403, {}, CHALLENGE_PAGE)
+    assert is_challenge(503, {}, CHALLENGE_PAGE)
+
+
+def test_cf_mitigated_header_marks_a_challenge():
+    assert is_challenge(403, {"cf-mitigated": "challenge"}, "")
+
+
+def test_plain_error_status_is_not_a_challenge():
+    assert not is_challenge(503, {}, "<html><title>Service Unavailable</title></html>")
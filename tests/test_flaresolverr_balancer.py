@@ -0,0 +1,47 @@
+import asyncio
+from collections import Counter
+from contextlib import AsyncExitStack
+
+from flaresolverr_balancer import FlareSolverrBalancer
+
+URLS = [f"http://fs-{number}:8191/v1" for number in range(3)]
+
+
+async def not_called(url: str, payload: dict) -> dict:
+    raise AssertionError("No FlareSolverr command should be sent")
+
+
+def hold_picks(balancer: FlareSolverrBalancer, count: int) -> Counter:
+    """Pick an instance `count` times, keeping every request in flight."""
+
+    async def run() -> Counter:
+        picked = Counter()
+        async with AsyncExitStack() as stack:
+            for _ in range(count):
+                instance = balancer.pick()
+                picked[instance.name] += 1
+                await stack.enter_async_context(balancer.track(instance))
+        return picked
+
+    return asyncio.run(run())
+
+
+def test_concurrent_picks_spread_across_cold_instances():
+    balancer = FlareSolverrBalancer(URLS, not_called)
+
+    picked = hold_picks(balancer, 9)
+
+    assert picked == {name: 3 for name in balancer.instances}
+
+
+def test_failing_instance_is_not_preferred_over_measured_ones():
+    balancer = FlareSolverrBalancer(URLS, not_called)
+    failing, *healthy = balancer.instances.values()
+    failing.record_failure()
+    for instance in healthy:
+        instance.record_latency(2.0)
+
+    picked = hold_picks(balancer, 4)
+
+    assert failing.name not in picked
+    assert picked == {instance.name: 2 for instance in healthy}
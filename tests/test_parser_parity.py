@@ -0,0 +1,56 @@
+from pathlib import Path
+
+import pytest
+
+from scrapers.parsers import get_parser_backend
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / "benchmarks" / "fixtures"
+USERNAME = "Parity#0001"
+
+# Which backend function parses each fixture, by file name prefix
+PARSERS = {"valorant": "parse_valorant", "tft": "parse_tft"}
+
+# Values each fixture is known to hold, so a parser that reads nothing from
+# both backends alike still fails
+EXPECTED = {
+    "tft.html": {"current_rank": "Diamond II", "lp": 1054, "wins": 84},
+    "valorant_all.html": {"current_rank": "Rating Ascendant 1", "kills": 27155},
+    "valorant_current.html": {"current_rank": "Rating Ascendant 1", "kills": 5431},
+    "valorant_dom.html": {"current_rank": "Rating Ascendant 1", "kills": 5431},
+}
+
+
+def fixture_pages():
+    pages = sorted(FIXTURES_DIR.glob("*.html"))
+    assert pages, f"No HTML fixtures in {FIXTURES_DIR}"
+    return pages
+
+
+@pytest.fixture(scope="module")
+def backends():
+    lxml_backend = get_parser_backend("lxml")
+    bs4_backend = get_parser_backend("bs4")
+    # get_parser_backend falls back to bs4 if lxml is missing, which would
+    # compare the bs4 backend with itself
+    assert lxml_backend is not bs4_backend, "lxml is not installed"
+    return bs4_backend, lxml_backend
+
+
+@pytest.mark.parametrize("page", fixture_pages(), ids=lambda page: page.name)
+def test_backends_parse_fixture_identically(backends, page):
+    bs4_backend, lxml_backend = backends
+    parse = PARSERS[page.name.split("_", 1)[0].split(".", 1)[0]]
+    html = page.read_text(encoding="utf-8")
+
+    expected = getattr(bs4_backend, parse)(html, USERNAME)
+    actual = getattr(lxml_backend, parse)(html, USERNAME)
+
+    assert expected is not None
+    assert actual.model_dump() == expected.model_dump()
+
+    assert expected.username == USERNAME
+    for field, value in EXPECTED[page.name].items():
+        assert getattr(expected, field) == value, field
+    if page.name.startswith("valorant"):
+        assert expected.top_weapons
+        assert expected.top_weapons[0].weapon_name == "Vandal"
@@ -0,0 +1,37 @@
+from pathlib import Path
+
+import pytest
+
+from scrapers.parsers import get_parser_backend
+from scrapers.parsers.valorant_state import parse_valorant_state
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / "benchmarks" / "fixtures"
+USERNAME = "Parity#0001"
+
+# Pages that carry both the embedded state and the rendered markup
+PAGES = ("valorant_current.html", "valorant_all.html")
+
+
+@pytest.mark.parametrize("name", PAGES)
+def test_json_and_dom_paths_agree_on_ranks(name):
+    html = (FIXTURES_DIR / name).read_text(encoding="utf-8")
+    season = "all" if name == "valorant_all.html" else "current"
+
+    from_state = parse_valorant_state(html, USERNAME, season)
+    from_dom = get_parser_backend("lxml").parse_valorant(html, USERNAME)
+
+    assert from_state is not None
+    assert from_state.current_rank == from_dom.current_rank == "Rating Ascendant 1"
+    assert from_state.peak_rank == from_dom.peak_rank
+    assert from_state.peak_rank_episode == from_dom.peak_rank_episode
+
+
+@pytest.mark.parametrize("name", PAGES)
+def test_json_path_lists_as_many_entries_as_the_overview_renders(name):
+    html = (FIXTURES_DIR / name).read_text(encoding="utf-8")
+
+    from_state = parse_valorant_state(html, USERNAME, "current")
+    from_dom = get_parser_backend("lxml").parse_valorant(html, USERNAME)
+
+    for field in ("top_weapons", "top_maps", "roles"):
+        assert len(getattr(from_state, field)) == len(getattr(from_dom, field))
@@ -0,0 +1,125 @@
+import os
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Awaitable, Callable, Iterator, Mapping, TypeVar
+
+from dotenv import load_dotenv
+
+try:
+    from opentelemetry import propagate, trace
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+        OTLPSpanExporter,
+    )
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+except ImportError:
+    trace = None
+
+load_dotenv()
+
+# Export spans over OTLP/HTTP to OTEL_EXPORTER_OTLP_ENDPOINT (by default a
+# collector on localhost:4318). Needs the opentelemetry-sdk and
+# opentelemetry-exporter-otlp-proto-http packages.
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+
+# Share of requests traced, unless the caller's traceparent already decided
+TRACING_SAMPLE_RATIO = float(os.getenv("TRACING_SAMPLE_RATIO", "1.0"))
+
+TRACING_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "tracker-api")
+
+T = TypeVar("T")
+
+
+class NoopSpan:
+    """Stands in for a span when tracing is off or not installed."""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Mapping[str, Any]) -> None:
+        pass
+
+    def update_name(self, name: str) -> None:
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+_provider = None
+
+
+def tracing_active() -> bool:
+    return _provider is not None
+
+
+def start_tracing() -> None:
+    """Install the OTLP exporter, if tracing is enabled and installed."""
+    global _provider
+    if not TRACING_ENABLED or _provider is not None:
+        return
+    if trace is None:
+        print("TRACING_ENABLED is set but OpenTelemetry isn't installed.")
+        return
+    _provider = TracerProvider(
+        resource=Resource.create({"service.name": TRACING_SERVICE_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(TRACING_SAMPLE_RATIO)),
+    )
+    _provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(_provider)
+
+
+def stop_tracing() -> None:
+    """Flush the spans still buffered and stop exporting."""
+    global _provider
+    if _provider is not None:
+        _provider.shutdown()
+        _provider = None
+
+
+@contextmanager
+def span(name: str, context=None, **attributes) -> Iterator[Any]:
+    """
+    Run the block in a child span of the current one, yielding the span so
+    attributes learned along the way can be added. Exceptions are recorded on
+    the span and re-raised.
+    """
+    if _provider is None:
+        yield NOOP_SPAN
+        return
+    tracer = trace.get_tracer(__name__)
+    with tracer.start_as_current_span(
+        name, context=context, attributes=attributes
+    ) as current:
+        yield current
+
+
+def traced(
+    name: str, **attributes
+) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Run every call of an async function in its own span."""
+
+    def decorator(fn: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @wraps(fn)
+        async def wrapper(*args, **kwargs) -> T:
+            with span(name, **attributes):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def current_span() -> Any:
+    """The span the caller is running in, to add attributes to."""
+    if _provider is None:
+        return NOOP_SPAN
+    return trace.get_current_span()
+
+
+def extract_context(headers: Mapping[str, str]):
+    """The trace context a caller sent in its traceparent header, if any."""
+    if _provider is None:
+        return None
+    return propagate.extract(headers)
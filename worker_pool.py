@@ -0,0 +1,50 @@
+import asyncio
+import os
+from typing import AsyncIterator, Awaitable, Callable, Iterable, TypeVar
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# How many FlareSolverr navigations batch lookups may run at once
+FLARESOLVERR_WORKERS = int(os.getenv("FLARESOLVERR_WORKERS", "4"))
+
+T = TypeVar("T")
+
+
+class WorkerPool:
+    """
+    Bounded pool for upstream work, shared by every request in the worker.
+
+    At most `size` jobs run at once; the rest wait their turn in FIFO order.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._semaphore = asyncio.Semaphore(size)
+
+    async def run(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run one job once a worker slot is free."""
+        async with self._semaphore:
+            return await fn()
+
+
+async def stream_as_completed(
+    jobs: Iterable[Callable[[], Awaitable[T]]],
+) -> AsyncIterator[T]:
+    """
+    Start every job and yield their results as each one finishes.
+
+    Jobs still running are cancelled if the consumer stops early, e.g. when a
+    streaming client disconnects.
+    """
+    tasks = [asyncio.ensure_future(job()) for job in jobs]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+flaresolverr_pool = WorkerPool(FLARESOLVERR_WORKERS)